@@ -0,0 +1,91 @@
+"""Per-tick cost of the detector at large process counts.
+
+Feeds the same synthetic samples to the old three-walk detector (over a
+dict of deques) and to the vectorized RuleEngine, and reports the time
+spent per tick once the history is full. Run from the repo root:
+
+    python bench/detector.py --procs 10000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shol"))
+from history import ColumnarHistory  # noqa: E402
+from rules import Rule, RuleEngine  # noqa: E402
+
+HISTORY_LEN = 60
+RULES = (
+    Rule("unresponsive", "cpu", "==", 0, min_count=4, window=None),
+    Rule("high_memory", "mem", ">", 60),
+    Rule("high_cpu", "cpu", ">", 90),
+)
+
+
+def synthetic_tick(rng, procs):
+    cpu = rng.choice([0.0, 0.5, 12.0, 95.0], size=procs, p=[0.05, 0.6, 0.34, 0.01])
+    mem = rng.uniform(0, 62, size=procs)
+    return cpu.astype(np.float32), mem.astype(np.float32)
+
+
+def legacy_detect(hist):
+    issues = []
+    for pid, dq in hist.items():
+        if dq and sum(1 for s in dq if s.get("cpu_percent", 0) == 0) >= 4:
+            issues.append((pid, "unresponsive", dq[-1]))
+    for pid, dq in hist.items():
+        if dq and (dq[-1].get("memory_percent") or 0) > 60:
+            issues.append((pid, "high_memory", dq[-1]))
+    for pid, dq in hist.items():
+        if dq and (dq[-1].get("cpu_percent") or 0) > 90:
+            issues.append((pid, "high_cpu", dq[-1]))
+    return issues
+
+
+def run(procs, ticks, seed=0):
+    rng = np.random.default_rng(seed)
+    ticks_data = [synthetic_tick(rng, procs) for _ in range(HISTORY_LEN + ticks)]
+
+    hist = defaultdict(lambda: deque(maxlen=HISTORY_LEN))
+    store = ColumnarHistory(HISTORY_LEN, capacity=procs)
+    slots = np.array([store.slot_for(pid, 1.0, "proc", ()) for pid in range(procs)])
+    engine = RuleEngine(store, RULES)
+
+    legacy_times, engine_times = [], []
+    for i, (cpu, mem) in enumerate(ticks_data):
+        measured = i >= HISTORY_LEN
+        t0 = time.perf_counter()
+        cpu_l, mem_l = cpu.tolist(), mem.tolist()
+        for pid in range(procs):
+            hist[pid].append({"pid": pid, "cpu_percent": cpu_l[pid], "memory_percent": mem_l[pid]})
+        legacy = legacy_detect(hist)
+        t1 = time.perf_counter()
+        store.append_many(slots, float(i), cpu, mem, np.ones(procs, np.uint8))
+        found = engine.evaluate()
+        t2 = time.perf_counter()
+        if measured:
+            legacy_times.append(t1 - t0)
+            engine_times.append(t2 - t1)
+    expected = sorted((pid, issue) for pid, issue, _ in legacy)
+    got = sorted((int(store.pid[s]), issue) for s, issue in found)
+    assert expected == got, "detector results differ"
+    return np.median(legacy_times), np.median(engine_times), len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+    legacy, engine, n = run(args.procs, args.ticks)
+    print(f"{args.procs} processes, {HISTORY_LEN}-sample history, {n} issues per tick")
+    print(f"legacy detect_all : {legacy * 1000:8.2f} ms/tick")
+    print(f"rule engine       : {engine * 1000:8.2f} ms/tick  ({legacy / engine:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Collector cost per agent in multi-host mode.
+
+Encodes a stream of synthetic snapshots per simulated agent the way
+agent.py does (delta + zlib), then times decompressing and merging every
+frame into the collector's FleetStore on one core, and reports how many
+agents at one snapshot per second that core can absorb. Run from the repo
+root:
+
+    python bench/fleet.py --agents 200 --procs 2000 --ticks 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shol"))
+from collector import FleetStore  # noqa: E402
+from sources import SyntheticSource  # noqa: E402
+from wire import HEADER_SIZE, SNAPSHOT, SnapshotEncoder, body, frame  # noqa: E402
+
+
+def agent_frames(seed, procs, ticks):
+    src, enc = SyntheticSource(procs, seed=seed), SnapshotEncoder()
+    return [frame(SNAPSHOT, enc.encode(src.sample())) for _ in range(ticks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--procs", type=int, default=2000, help="processes per agent")
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+
+    streams = {f"host{i:04d}": agent_frames(i, args.procs, args.ticks) for i in range(args.agents)}
+    key_bytes = sum(len(f[0]) for f in streams.values()) / args.agents
+    delta_bytes = sum(len(b) for f in streams.values() for b in f[1:]) / (args.agents * (args.ticks - 1))
+
+    store = FleetStore()
+    t0 = time.process_time()
+    for tick in range(args.ticks):
+        for host, frames in streams.items():
+            table = store.table(host)
+            table.apply(body(frames[tick][HEADER_SIZE:]))
+    cost = (time.process_time() - t0) / (args.agents * args.ticks)
+
+    print(f"{args.agents} agents x {args.procs} processes, {args.ticks} ticks")
+    print(f"keyframe {key_bytes / 1024:8.1f} KiB   delta {delta_bytes / 1024:8.1f} KiB (compressed, per agent)")
+    print(f"merge    {cost * 1e3:8.3f} ms CPU/frame -> ~{int(1 / cost)} agents per core at 1 snapshot/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Memory footprint of the per-pid sample history.
+
+Compares the old dict-of-deques-of-dicts layout with ColumnarHistory for a
+synthetic host. Run from the repo root:
+
+    python bench/history_memory.py --procs 5000 --samples 60
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shol"))
+from history import ColumnarHistory, status_code  # noqa: E402
+
+
+def fake_info(pid, tick):
+    name = f"worker-{pid % 97}.exe"
+    cmdline = [f"C:\\Program Files\\App{pid % 97}\\{name}", "--type=renderer",
+               f"--lang=en-US", f"--instance={pid}"]
+    return {
+        "pid": pid,
+        "name": name,
+        "cmdline": cmdline,
+        "create_time": 1_700_000_000.0 + pid,
+        "cpu_percent": float((pid * 7 + tick) % 100),
+        "memory_percent": float(pid % 13) / 10.0,
+        "status": "running" if tick % 3 else "sleeping",
+    }
+
+
+def build_legacy(procs, samples):
+    hist = defaultdict(lambda: deque(maxlen=samples))
+    for tick in range(samples):
+        now = time.time()
+        for pid in range(procs):
+            info = fake_info(pid, tick)
+            info["sample_ts"] = now
+            info["cmdline_str"] = " ".join(info["cmdline"])
+            hist[pid].append(info)
+    return hist
+
+
+def build_columnar(procs, samples):
+    store = ColumnarHistory(samples)
+    for tick in range(samples):
+        now = time.time()
+        slots, cpu, mem, status = [], [], [], []
+        for pid in range(procs):
+            info = fake_info(pid, tick)
+            slots.append(store.slot_for(pid, info["create_time"], info["name"], info["cmdline"]))
+            cpu.append(info["cpu_percent"])
+            mem.append(info["memory_percent"])
+            status.append(status_code(info["status"]))
+        store.append_many(slots, now, cpu, mem, status)
+    return store
+
+
+def measure(builder, procs, samples):
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = builder(procs, samples)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    objects = len(gc.get_objects()) - objects_before
+    del result
+    return {"bytes": current, "peak_bytes": peak, "gc_objects": objects, "build_s": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=60)
+    args = parser.parse_args()
+
+    rows = [("dict-of-deques", measure(build_legacy, args.procs, args.samples)),
+            ("columnar", measure(build_columnar, args.procs, args.samples))]
+    print(f"{args.procs} processes x {args.samples} samples")
+    print(f"{'layout':<16}{'retained MiB':>14}{'peak MiB':>12}{'gc objects':>12}{'build s':>10}")
+    for label, r in rows:
+        print(f"{label:<16}{r['bytes'] / 2**20:>14.1f}{r['peak_bytes'] / 2**20:>12.1f}"
+              f"{r['gc_objects']:>12}{r['build_s']:>10.2f}")
+    legacy, columnar = rows[0][1], rows[1][1]
+    print(f"\nmemory ratio: {legacy['bytes'] / max(columnar['bytes'], 1):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
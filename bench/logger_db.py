@@ -0,0 +1,70 @@
+"""Event logging throughput (events/sec) into the SQLite events table.
+
+Compares the old log_event path (new connection and one committed INSERT
+per event) with the batched EventWriter. Run from the repo root:
+
+    python bench/logger_db.py --events 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TMP = tempfile.mkdtemp(prefix="shol-bench-")
+os.environ["SHOL_DB_PATH"] = os.path.join(TMP, "import.db")  # keep the real DB untouched
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "shol"))
+
+from sqlalchemy import create_engine  # noqa: E402
+from shol.logger_db import EventWriter, enable_sqlite_wal, events, metadata  # noqa: E402
+from shol.utils import now_str  # noqa: E402
+
+
+def row(i):
+    return dict(ts=time.time(), timestr=now_str(), pid=1000 + i % 500, proc_name=f"proc{i % 50}.exe",
+                issue="high_cpu", detail="{'cpu_percent': 97.0}", action="")
+
+
+def legacy(n):
+    engine = create_engine(f"sqlite:///{os.path.join(TMP, 'legacy.db')}")
+    metadata.create_all(engine)
+    t0 = time.perf_counter()
+    for i in range(n):
+        conn = engine.connect()
+        conn.execute(events.insert().values(**row(i)))
+        conn.commit()
+        conn.close()
+    return n / (time.perf_counter() - t0), None
+
+
+def batched(n):
+    engine = enable_sqlite_wal(create_engine(f"sqlite:///{os.path.join(TMP, 'batched.db')}",
+                                             connect_args={"check_same_thread": False}))
+    metadata.create_all(engine)
+    writer = EventWriter(engine)
+    t0 = time.perf_counter()
+    for i in range(n):
+        writer.put(row(i))
+    enqueue = time.perf_counter() - t0
+    writer.flush()
+    total = time.perf_counter() - t0
+    writer.close()
+    return n / total, enqueue / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+    old, _ = legacy(args.events)
+    new, put_cost = batched(args.events)
+    print(f"{args.events} events")
+    print(f"per-event connection : {old:10.0f} events/s")
+    print(f"batched writer       : {new:10.0f} events/s  ({new / old:.0f}x), "
+          f"caller cost {put_cost * 1e6:.1f} us/event")
+
+
+if __name__ == "__main__":
+    main()
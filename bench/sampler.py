@@ -0,0 +1,65 @@
+"""CPU cost of one process-table scan.
+
+Compares the old process_iter scan (name + cmdline every tick) with
+Sampler on the psutil path and on the Linux /proc fast path. Use --spawn to
+add idle child processes on a quiet machine. Run from the repo root:
+
+    python bench/sampler.py --ticks 20 --spawn 2000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shol"))
+from sampler import HAS_PROCFS, Sampler  # noqa: E402
+
+
+def legacy_scan():
+    out = []
+    for p in psutil.process_iter(['pid', 'name', 'cmdline', 'cpu_percent', 'memory_percent', 'status']):
+        info = p.info
+        info['cmdline_str'] = " ".join(info.get('cmdline') or [])
+        out.append(info)
+    return out
+
+
+def cpu_per_tick(fn, ticks):
+    fn()  # warm caches (psutil's process table, the sampler's static cache)
+    t0 = time.process_time()
+    for _ in range(ticks):
+        fn()
+    return (time.process_time() - t0) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--spawn", type=int, default=0, help="idle child processes to start first")
+    args = parser.parse_args()
+
+    children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(3600)"])
+                for _ in range(args.spawn)]
+    try:
+        time.sleep(1 if children else 0)
+        n = len(psutil.pids())
+        rows = [("process_iter (old)", cpu_per_tick(legacy_scan, args.ticks)),
+                ("Sampler psutil", cpu_per_tick(Sampler(fast=False).sample, args.ticks))]
+        if HAS_PROCFS:
+            rows.append(("Sampler /proc", cpu_per_tick(Sampler(fast=True).sample, args.ticks)))
+        print(f"{n} processes, {args.ticks} ticks")
+        base = rows[0][1]
+        for label, cost in rows:
+            print(f"{label:<20}{cost * 1000:9.2f} ms CPU/tick  {base / cost:6.1f}x")
+    finally:
+        for c in children:
+            c.kill()
+        for c in children:
+            c.wait()
+
+
+if __name__ == "__main__":
+    main()
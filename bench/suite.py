@@ -0,0 +1,213 @@
+"""SHOL hot-path benchmark suite with JSON results and regression gates.
+
+Runs every benchmark at each requested size on synthetic data (no live
+processes, no real event log or database), so runs are repeatable and
+work offline:
+
+    history_sample   ProcessHistory.sample on a SyntheticSource  (--procs)
+    detect_all       Detector.detect_all over a full history     (--procs)
+    log_event        logger_db.log_event throughput incl. commit (--events)
+    parse_log        dashboard parse_log_for_metrics on a log    (--log-lines)
+    api_procs        GET /api/procs, full body and 304 revalidation (--procs)
+
+Save a baseline, then compare a later run against it; the comparison exits
+with status 1 when any benchmark got worse by more than --threshold.
+Run from the repo root:
+
+    python bench/suite.py --procs 1000,10000 --out bench-base.json
+    python bench/suite.py --procs 1000,10000 --compare bench-base.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TMP = tempfile.mkdtemp(prefix="shol-bench-")
+os.environ["SHOL_DB_PATH"] = os.path.join(TMP, "events.db")  # keep the real DB untouched
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "shol"))
+
+from log_analytics import parse_lines  # noqa: E402
+from monitor import HISTORY_LEN, ProcessHistory  # noqa: E402
+from sources import ProcessSource, SyntheticSource  # noqa: E402
+
+DEFAULT_THRESHOLD = 0.2   # fractional slowdown tolerated by --compare
+
+
+class FrameSource(ProcessSource):
+    """Replays pre-generated snapshots, so generating them is not timed."""
+
+    def __init__(self, frames):
+        super().__init__()
+        self.frames = frames
+        self.i = 0
+
+    def sample(self):
+        snap = self.frames[self.i % len(self.frames)]
+        self.i += 1
+        self.last = snap
+        return snap
+
+
+def synthetic_frames(procs, ticks, seed=0):
+    src = SyntheticSource(procs, seed=seed)
+    return [src.sample() for _ in range(ticks)]
+
+
+def timed(fn, repeat):
+    """Median wall time of `repeat` calls of fn(), in seconds."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def result(value, unit, better="lower"):
+    return {"value": round(value, 6), "unit": unit, "better": better}
+
+
+# ---------------- benchmarks ----------------
+def bench_history_sample(procs, repeat):
+    # one distinct frame per timed call, so every call appends a sample
+    ph = ProcessHistory(source=FrameSource(synthetic_frames(procs, HISTORY_LEN + repeat)))
+    for _ in range(HISTORY_LEN):
+        ph.sample()  # fill the ring buffer first: steady-state cost
+    return result(timed(ph.sample, repeat) * 1000, "ms/tick")
+
+
+def bench_detect_all(procs, repeat):
+    from shol.detector import Detector
+    from shol.monitor import ProcessHistory as PackageHistory
+    ph = PackageHistory(source=FrameSource(synthetic_frames(procs, HISTORY_LEN)))
+    det = Detector(ph)
+    for _ in range(HISTORY_LEN):
+        ph.sample()
+    return result(timed(det.detect_all, repeat) * 1000, "ms/call")
+
+
+def bench_log_event(events, repeat):
+    from shol.logger_db import log_event, writer
+
+    def run():
+        for i in range(events):
+            log_event(1000 + i % 500, f"proc{i % 50}.exe", "high_cpu", detail="{'cpu_percent': 97.0}")
+        writer.flush()
+    return result(events / timed(run, repeat), "events/s", better="higher")
+
+
+def fake_log(lines, seed=0):
+    rng = random.Random(seed)
+    names = [f"app{i}.exe" for i in range(40)]
+    out = []
+    for i in range(lines):
+        stamp = f"[2024-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}]"
+        if rng.random() < 0.2:
+            out.append(f"{stamp}  Attempting to heal process: {rng.choice(names)} (PID {rng.randint(100, 60000)})")
+        else:
+            out.append(f"{stamp}  Healer heartbeat | scanned {rng.randint(100, 5000)} processes")
+    return "\n".join(out)
+
+
+def bench_parse_log(lines, repeat):
+    # web/dashboard.parse_log_for_metrics is exactly this; importing it would open the GUI
+    text = fake_log(lines)
+    return result(timed(lambda: parse_lines(text.splitlines()), repeat) * 1000, "ms/parse")
+
+
+def bench_api_procs(procs, repeat):
+    from shol import api_server
+    from shol.monitor import ProcessHistory as PackageHistory
+    from shol.snapshot_cache import SnapshotCache
+    api_server.cache = SnapshotCache(PackageHistory(source=SyntheticSource(procs)))
+    api_server.cache.refresh()  # published once, as the background thread would
+    client = api_server.app.test_client()
+    etag = client.get("/api/procs").headers["ETag"]
+    full = timed(lambda: client.get("/api/procs").data, repeat)
+    cached = timed(lambda: client.get("/api/procs", headers={"If-None-Match": etag}).data, repeat)
+    return {"full": result(full * 1000, "ms/request"), "not_modified": result(cached * 1000, "ms/request")}
+
+
+BENCHMARKS = {
+    "history_sample": (bench_history_sample, "procs"),
+    "detect_all": (bench_detect_all, "procs"),
+    "log_event": (bench_log_event, "events"),
+    "parse_log": (bench_parse_log, "log_lines"),
+    "api_procs": (bench_api_procs, "procs"),
+}
+
+
+def run(args):
+    results = {}
+    for name, (fn, param) in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        for size in getattr(args, param):
+            out = fn(size, args.repeat)
+            rows = out.items() if "value" not in out else [(None, out)]
+            for sub, res in rows:
+                key = f"{name}{'.' + sub if sub else ''}[{param}={size}]"
+                results[key] = res
+                print(f"{key:<44}{res['value']:14.3f} {res['unit']}", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every benchmark present in both; returns the regressed keys."""
+    regressed = []
+    print(f"\n{'benchmark':<44}{'base':>12}{'now':>12}{'change':>9}")
+    for key, res in results.items():
+        old = baseline.get(key)
+        if old is None or not old["value"]:
+            continue
+        ratio = res["value"] / old["value"]
+        worse = ratio - 1 if res["better"] == "lower" else 1 / ratio - 1 if ratio else float("inf")
+        flag = ""
+        if worse > threshold:
+            regressed.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<44}{old['value']:12.3f}{res['value']:12.3f}{(ratio - 1) * 100:+8.1f}%{flag}")
+    return regressed
+
+
+def sizes(text):
+    return [int(s) for s in text.split(",") if s]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=sizes, default=[1000, 10000], help="comma-separated process counts")
+    parser.add_argument("--events", type=sizes, default=[5000], help="comma-separated event counts")
+    parser.add_argument("--log-lines", type=sizes, default=[10000, 100000], help="comma-separated log sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (median is kept)")
+    parser.add_argument("--only", type=lambda s: s.split(","), help="comma-separated benchmark names")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --out")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a benchmark is worse than the baseline by more than this fraction")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"ts": time.time(), "python": platform.python_version(),
+                                "machine": platform.machine(), "repeat": args.repeat},
+                       "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
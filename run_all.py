@@ -1,5 +1,3 @@
-import subprocess
-import time
 import os
 import sys
 
@@ -8,37 +6,25 @@ os.environ["PYTHONUTF8"] = "1"
 if sys.stdout.encoding.lower() != "utf-8":
     sys.stdout.reconfigure(encoding="utf-8")
 
-# Paths to scripts
-MONITOR_PATH = os.path.join("shol", "monitor.py")
-HEALER_PATH = os.path.join("shol", "healer.py")
-DASHBOARD_PATH = os.path.join("web", "dashboard.py")
-
-# Start monitor
-print("Starting Monitor...")
-monitor_proc = subprocess.Popen(["python", MONITOR_PATH])
-
-# Wait a moment to let it start cleanly
-time.sleep(2)
-
-# Start healer
-print("Starting Healer...")
-healer_proc = subprocess.Popen(["python", HEALER_PATH])
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "shol"))
+from supervisor import Service, Supervisor
 
-# Wait again before opening dashboard
-time.sleep(2)
-
-# Start dashboard
-print("Opening Dashboard...")
-dashboard_proc = subprocess.Popen(["python", DASHBOARD_PATH])
-
-print("\n[OK] All systems running. Press Ctrl+C to stop everything.\n")
-
-try:
-    # Keep script running while processes are alive
-    while True:
-        time.sleep(1)
-except KeyboardInterrupt:
-    print("\n Shutting down all processes...")
-    monitor_proc.terminate()
-    healer_proc.terminate()
-    dashboard_proc.terminate()
+# Paths to scripts
+SAMPLER_PATH = os.path.join(BASE_DIR, "shol", "sampler_service.py")
+MONITOR_PATH = os.path.join(BASE_DIR, "shol", "monitor.py")
+HEALER_PATH = os.path.join(BASE_DIR, "shol", "healer.py")
+DASHBOARD_PATH = os.path.join(BASE_DIR, "web", "dashboard.py")
+
+# The shared sampler gates the services that read its snapshots; the
+# monitor doesn't, so it starts alongside the sampler. Each service reports
+# ready itself (readiness.notify_ready), crashed ones are restarted.
+SERVICES = [
+    Service("sampler", [sys.executable, SAMPLER_PATH]),
+    Service("monitor", [sys.executable, MONITOR_PATH]),
+    Service("healer", [sys.executable, HEALER_PATH], after=["sampler"]),
+    Service("dashboard", [sys.executable, DASHBOARD_PATH], after=["sampler"]),
+]
+
+if __name__ == "__main__":
+    Supervisor(SERVICES).run()
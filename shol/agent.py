@@ -0,0 +1,199 @@
+import argparse
+import socket
+import threading
+import time
+from collections import deque
+import psutil
+from logtail import LogFollower
+from sources import open_source
+from utils import LOG_FILE
+from wire import EVENTS, HELLO, PROTOCOL_VERSION, SNAPSHOT, SnapshotEncoder, frame, json_frame, parse_address
+
+# Agent end of multi-host mode: samples this host (or any ProcessSource) and
+# ships snapshots plus new events.log lines to a collector (collector.py).
+# Sampling never waits on the network: a background sender drains an
+# outbox, and while the collector is slow or unreachable only the newest
+# snapshot is kept (deltas are encoded against what was actually sent) and
+# events queue up to `max_events`, oldest dropped first.
+
+SAMPLE_INTERVAL = 1.0
+MAX_EVENTS = 10000          # events buffered while disconnected
+EVENTS_PER_FRAME = 500
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 30.0
+CONNECT_TIMEOUT = 5.0
+
+
+class Outbox:
+    """What the sender still has to ship: the latest snapshot and pending events."""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.max_events = max_events
+        self.snapshot = None     # (Snapshot, sys_stats) or None
+        self.events = deque()
+        self.dropped_snapshots = 0
+        self.dropped_events = 0
+        self.cond = threading.Condition()
+
+    def put_snapshot(self, snap, sys_stats):
+        with self.cond:
+            if self.snapshot is not None:
+                self.dropped_snapshots += 1  # superseded before it was sent
+            self.snapshot = (snap, sys_stats)
+            self.cond.notify()
+
+    def put_events(self, rows):
+        with self.cond:
+            self.events.extend(rows)
+            self._trim()
+            self.cond.notify()
+
+    def _trim(self):
+        while len(self.events) > self.max_events:
+            self.events.popleft()
+            self.dropped_events += 1
+
+    def take(self, timeout):
+        """(snapshot or None, [events]) once something is pending, or after `timeout`."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.snapshot is not None or self.events, timeout)
+            snap, self.snapshot = self.snapshot, None
+            events = [self.events.popleft() for _ in range(len(self.events))]
+            return snap, events
+
+    def give_back(self, snap, events):
+        """Requeue what a failed send took, unless newer data replaced it."""
+        with self.cond:
+            if self.snapshot is None:
+                self.snapshot = snap
+            self.events.extendleft(reversed(events))
+            self._trim()
+
+
+class Agent:
+    """Samples `source` every `interval` seconds and ships it to the collector at `address`."""
+
+    def __init__(self, address, host=None, source=None, interval=SAMPLE_INTERVAL, events=True,
+                 max_events=MAX_EVENTS):
+        self.address = address
+        self.host = host or socket.gethostname()
+        self.source = source or open_source("live")
+        self.interval = interval
+        self.follower = LogFollower(str(LOG_FILE), backlog_bytes=0) if events else None
+        self.outbox = Outbox(max_events)
+        self.encoder = SnapshotEncoder()
+        self.sock = None
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.connects = 0
+        self._stop = threading.Event()
+
+    # ---------------- sender ----------------
+    def _connect(self):
+        family, addr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(addr)
+            sock.settimeout(None)  # sends block: that's the collector's backpressure
+            if family != socket.AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.sendall(json_frame(HELLO, {"host": self.host, "version": PROTOCOL_VERSION,
+                                            "interval": self.interval}))
+        except OSError:
+            sock.close()
+            raise
+        self.encoder.reset()  # the collector starts this host over: next snapshot is a keyframe
+        self.sock = sock
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def _send_loop(self):
+        backoff = RECONNECT_MIN
+        while not self._stop.is_set():
+            if self.sock is None:
+                try:
+                    self._connect()
+                    backoff = RECONNECT_MIN
+                except OSError as e:
+                    print(f"[agent] collector {self.address} unreachable ({e}); retry in {backoff:.1f}s")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, RECONNECT_MAX)
+                    continue
+                self.connects += 1
+            snap, events = self.outbox.take(timeout=1.0)
+            if snap is None and not events:
+                continue
+            # one sendall per round: every pending event batch plus the snapshot
+            frames = [json_frame(EVENTS, events[i:i + EVENTS_PER_FRAME])
+                      for i in range(0, len(events), EVENTS_PER_FRAME)]
+            if snap is not None:
+                frames.append(frame(SNAPSHOT, self.encoder.encode(*snap)))
+            data = b"".join(frames)
+            try:
+                self.sock.sendall(data)
+            except OSError as e:
+                print(f"[agent] lost collector {self.address}: {e}")
+                self._disconnect()
+                self.outbox.give_back(snap, events)
+                continue
+            self.sent_frames += len(frames)
+            self.sent_bytes += len(data)
+
+    # ---------------- sampler ----------------
+    def _sys_stats(self):
+        if not self.source.live:
+            return None
+        return [psutil.cpu_percent(interval=None), psutil.virtual_memory().percent]
+
+    def run(self):
+        """Sample and enqueue every `interval` seconds until stop()."""
+        sender = threading.Thread(target=self._send_loop, name="agent-sender", daemon=True)
+        sender.start()
+        if self.source.live:
+            psutil.cpu_percent(interval=None)  # prime system-wide CPU counter
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    snap = self.source.sample()
+                except EOFError:
+                    break  # replay finished
+                self.outbox.put_snapshot(snap, self._sys_stats())
+                if self.follower is not None:
+                    lines, _ = self.follower.poll()
+                    if lines:
+                        now = time.time()
+                        self.outbox.put_events([{"ts": now, "line": ln.rstrip("\n")} for ln in lines])
+                self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            self._stop.set()
+            sender.join(timeout=CONNECT_TIMEOUT)
+            self._disconnect()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {"sent_frames": self.sent_frames, "sent_bytes": self.sent_bytes, "connects": self.connects,
+                "dropped_snapshots": self.outbox.dropped_snapshots, "dropped_events": self.outbox.dropped_events}
+
+
+if __name__ == "__main__":
+    # several agents on one machine: give each its own --host and a synthetic source
+    parser = argparse.ArgumentParser(description="SHOL fleet agent")
+    parser.add_argument("--connect", default="tcp://127.0.0.1:7070", help="tcp://HOST:PORT or unix:///PATH")
+    parser.add_argument("--host", help="host id reported to the collector (default: hostname)")
+    parser.add_argument("--source", default="live",
+                        help="live | synthetic[:N] | replay:PATH | replay-loop:PATH | record:PATH")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL)
+    parser.add_argument("--no-events", action="store_true", help="don't ship events.log lines")
+    args = parser.parse_args()
+    agent = Agent(args.connect, args.host, open_source(args.source), args.interval, events=not args.no_events)
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        agent.stop()
@@ -1,19 +1,35 @@
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, abort, jsonify, render_template, request, stream_with_context
+import json
+import os
+import time
 from .monitor import ProcessHistory
-from .logger_db import engine, events
-import psutil
+from .logger_db import query_events, query_hourly, events_after, last_event_id
 from .utils import BASE_DIR
-from .logger_db import session
-from sqlalchemy import select
+from .optimization_store import default_store
+from .snapshot_cache import SnapshotCache
+from .proc_diff import DEFAULT_EPSILON, ProcessDiff
+from .tsdb import MAX_POINTS, MetricStore
+from .metrics import collect, render
+from .collector import Collector
 
 app = Flask(__name__, template_folder=str(BASE_DIR / "web" / "templates"))
 ph = ProcessHistory()
+# one background sampler feeds every request; requests never scan processes
+cache = SnapshotCache(ph)
+# long-term rollups written by sampler_service (data/tsdb)
+metrics_store = MetricStore(readonly=True)
+# multi-host mode: SHOL_COLLECTOR=tcp://0.0.0.0:7070 (or unix:///path) accepts agents
+fleet = Collector(os.environ["SHOL_COLLECTOR"]).start_in_thread() if os.environ.get("SHOL_COLLECTOR") else None
+
+def current_snapshot():
+    snap = cache.get()
+    if snap is None:
+        abort(503, description="no process snapshot yet")
+    return snap
 
 @app.route("/")
 def index():
-    # update a fresh sample for demo simplicity
-    ph.sample()
-    latest = ph.get_all_latest()
+    latest = current_snapshot().procs
     # convert to simple JSON-friendly objects
     procs = []
     for p in latest:
@@ -26,22 +42,152 @@ def index():
             "status": p.get('status')
         })
     # fetch last 30 events
-    with engine.connect() as conn:
-        res = conn.execute(select([events]).order_by(events.c.ts.desc()).limit(30))
-        logs = [dict(r) for r in res]
+    logs = query_events(limit=30)
     return render_template("index.html", procs=procs, logs=logs)
 
 @app.route("/api/procs")
 def api_procs():
-    ph.sample()
-    return jsonify(ph.get_all_latest())
+    snap = current_snapshot()
+    if request.if_none_match.contains(snap.etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(snap.body, mimetype="application/json")
+    resp.set_etag(snap.etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+STREAM_HEARTBEAT = 15.0   # seconds of silence before a keep-alive comment
+
+def _sse(event, data, id=None):
+    head = f"id: {id}\n" if id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+@app.route("/api/stream")
+def api_stream():
+    # Server-Sent Events: `snapshot` (all processes) on connect, then per tick
+    # `delta` (added / removed pids / changed fields) and `events` (new rows
+    # of the events table). ?eps= cpu/mem change threshold, ?events=0 to skip events
+    eps = max(0.0, request.args.get("eps", DEFAULT_EPSILON, type=float))
+    with_events = request.args.get("events", 1, type=int) != 0
+    # before the stream starts: once the 200 is sent, abort(503) can't reach the client
+    first = current_snapshot()
+
+    def generate(snap):
+        diff = ProcessDiff(eps)
+        after_id = last_event_id() if with_events else 0
+        yield _sse("snapshot", {"seq": snap.seq, "ts": snap.ts, "procs": diff.full(snap.procs)}, snap.seq)
+        quiet_since = time.monotonic()
+        while True:
+            nxt = cache.wait_newer(snap.seq, timeout=cache.interval * 2)
+            if nxt is not None and nxt.seq > snap.seq:
+                snap = nxt
+                delta = diff.diff(snap.procs)
+                if delta["added"] or delta["removed"] or delta["changed"]:
+                    delta.update(seq=snap.seq, ts=snap.ts)
+                    yield _sse("delta", delta, snap.seq)
+                    quiet_since = time.monotonic()
+            if with_events:
+                rows = events_after(after_id)
+                if rows:
+                    after_id = rows[-1]["id"]
+                    yield _sse("events", rows)
+                    quiet_since = time.monotonic()
+            if time.monotonic() - quiet_since > STREAM_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                quiet_since = time.monotonic()
+
+    resp = Response(stream_with_context(generate(first)), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
 
 @app.route("/api/logs")
 def api_logs():
-    with engine.connect() as conn:
-        res = conn.execute(select([events]).order_by(events.c.ts.desc()).limit(100))
-        logs = [dict(r) for r in res]
+    # newest first; next page: ?before_ts=<ts>&before_id=<id> of the last row
+    # filters: ?proc=<proc_name>&issue=<issue>, page size: ?limit= (max 1000)
+    logs = query_events(
+        limit=max(1, min(request.args.get("limit", 100, type=int), 1000)),
+        before_ts=request.args.get("before_ts", type=float),
+        before_id=request.args.get("before_id", type=int),
+        proc_name=request.args.get("proc"),
+        issue=request.args.get("issue"),
+    )
     return jsonify(logs)
 
+@app.route("/api/logs/hourly")
+def api_logs_hourly():
+    # compacted history: event counts per hour/process/issue
+    rows = query_hourly(
+        since=request.args.get("since", type=float),
+        proc_name=request.args.get("proc"),
+        issue=request.args.get("issue"),
+        limit=max(1, min(request.args.get("limit", 1000, type=int), 10000)),
+    )
+    return jsonify(rows)
+
+@app.route("/api/history/series")
+def api_history_series():
+    # names of the stored time series (system.cpu, proc.<name>.mem, ...)
+    return jsonify(metrics_store.names())
+
+@app.route("/api/history")
+def api_history():
+    # ?series=system.cpu&start=<ts>&end=<ts>&points=<max points>; the
+    # resolution (1 s / 1 min / 1 h) is picked to fit the range
+    name = request.args.get("series", "system.cpu")
+    result = metrics_store.query(
+        name,
+        start=request.args.get("start", type=float),
+        end=request.args.get("end", type=float),
+        max_points=max(1, min(request.args.get("points", MAX_POINTS, type=int), 10000)),
+    )
+    if result is None:
+        abort(404, description=f"unknown series {name}")
+    return jsonify(result)
+
+@app.route("/api/optimizations")
+def api_optimizations():
+    # newest records from the shared append-only store (?n=, max 500)
+    n = max(0, min(request.args.get("n", 10, type=int), 500))
+    return jsonify(default_store().last(n))
+
+def fleet_store():
+    if fleet is None:
+        abort(404, description="collector not enabled (set SHOL_COLLECTOR)")
+    return fleet.store
+
+@app.route("/api/hosts")
+def api_hosts():
+    # one summary per agent host: connected, last_seen, process count, system cpu/mem
+    return jsonify(fleet_store().summaries())
+
+@app.route("/api/hosts/<host>/procs")
+def api_host_procs(host):
+    procs = fleet_store().procs(host)
+    if procs is None:
+        abort(404, description=f"unknown host {host}")
+    return jsonify(procs)
+
+@app.route("/api/hosts/<host>/events")
+def api_host_events(host):
+    # newest events.log lines shipped by the host's agent (?n=, max 1000)
+    rows = fleet_store().events(host, max(0, min(request.args.get("n", 100, type=int), 1000)))
+    if rows is None:
+        abort(404, description=f"unknown host {host}")
+    return jsonify(rows)
+
+@app.route("/api/fleet/top")
+def api_fleet_top():
+    # busiest processes across every host: ?by=cpu|mem&n= (max 500)
+    by = "mem" if request.args.get("by") == "mem" else "cpu"
+    n = max(1, min(request.args.get("n", 20, type=int), 500))
+    return jsonify(fleet_store().top(n, by))
+
+@app.route("/metrics")
+def prometheus_metrics():
+    # Prometheus text format: this process plus every service that published
+    # to data/metrics/ recently, told apart by the `service` label
+    return Response(render(collect("api_server")), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+import numpy as np
+from history import STATUS_NAMES
+from wire import (CPU_SCALE, CPU_TIME_SCALE, DEFAULT_PORT, EVENTS, HEADER_SIZE, HELLO, MEM_SCALE, PROTOCOL_VERSION,
+                  Q_CPU, Q_CPU_TIME, Q_MEM, Q_PPID, Q_RSS, Q_STATUS, RSS_SHIFT, SNAPSHOT, WireError,
+                  body, decode_snapshot, parse_address, parse_header)
+
+# Central end of multi-host mode: agents (agent.py) connect and stream
+# delta-encoded snapshots and events.log lines; everything is merged into
+# one FleetStore that api_server queries across hosts. One asyncio loop
+# handles all agents; applying a delta is a handful of NumPy operations, so
+# a single core keeps up with hundreds of agents (bench/fleet.py).
+
+EVENTS_PER_HOST = 1000
+
+
+class HostTable:
+    """Latest process table of one host, columnar and sorted by pid.
+
+    Values stay in their quantized wire form; `procs()` converts on read.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.reset()
+        self.events = deque(maxlen=EVENTS_PER_HOST)
+        self.connected = False
+        self.last_seen = None
+        self.frames = 0
+
+    def reset(self):
+        self.pid = np.empty(0, np.int64)
+        self.create_time = np.empty(0, np.float64)
+        self.q = np.empty((0, 6), np.int64)
+        self.static = {}   # (pid, create_time) -> (name, cmdline tuple)
+        self.ts = None
+        self.sys = None
+
+    def apply(self, raw):
+        """Merge one SNAPSHOT body; raises WireError if it doesn't fit our state."""
+        head, removed, cols = decode_snapshot(raw)
+        if head["key"]:
+            self.reset()
+        if len(removed):
+            drop = np.isin(self.pid, removed)
+            for key in zip(self.pid[drop].tolist(), self.create_time[drop].tolist()):
+                self.static.pop(key, None)
+            keep = ~drop
+            self.pid, self.create_time, self.q = self.pid[keep], self.create_time[keep], self.q[keep]
+        new = cols["new"]
+        upd = ~new
+        if upd.any():
+            pos = np.searchsorted(self.pid, cols["pid"][upd])
+            if len(self.pid) == 0 or pos.max() >= len(self.pid) or (self.pid[pos] != cols["pid"][upd]).any():
+                raise WireError("delta updates a process this host table doesn't have")
+            self.q[pos] = cols["q"][upd]
+        if new.any():
+            add_pid, add_ct = cols["pid"][new], cols["create_time"][new]
+            for key, (name, cmdline) in zip(zip(add_pid.tolist(), add_ct.tolist()), head["new"]):
+                self.static[key] = (name, tuple(cmdline))
+            pid = np.concatenate([self.pid, add_pid])
+            order = np.argsort(pid, kind="stable")
+            self.pid = pid[order]
+            self.create_time = np.concatenate([self.create_time, add_ct])[order]
+            self.q = np.concatenate([self.q, cols["q"][new]])[order]
+        if len(self.pid) != head["n"]:
+            raise WireError(f"host {self.host}: {len(self.pid)} rows after delta, agent has {head['n']}")
+        self.ts = head["ts"]
+        self.sys = head.get("sys")
+        self.frames += 1
+
+    def _row(self, i):
+        q = self.q[i]
+        name, cmdline = self.static.get((int(self.pid[i]), float(self.create_time[i])), (None, ()))
+        return {
+            "host": self.host,
+            "pid": int(self.pid[i]),
+            "name": name,
+            "cmdline": " ".join(cmdline),
+            "cpu": int(q[Q_CPU]) / CPU_SCALE,
+            "mem": int(q[Q_MEM]) / MEM_SCALE,
+            "status": STATUS_NAMES[q[Q_STATUS]] if q[Q_STATUS] < len(STATUS_NAMES) else "unknown",
+            "cpu_time": int(q[Q_CPU_TIME]) / CPU_TIME_SCALE,
+            "rss": int(q[Q_RSS]) << RSS_SHIFT,
+            "ppid": int(q[Q_PPID]),
+        }
+
+    def procs(self):
+        return [self._row(i) for i in range(len(self.pid))]
+
+    def top(self, n, by="cpu"):
+        col = self.q[:, Q_CPU if by == "cpu" else Q_MEM]
+        if len(col) > n:
+            idx = np.argpartition(col, -n)[-n:]
+        else:
+            idx = np.arange(len(col))
+        return [self._row(i) for i in idx[np.argsort(-col[idx], kind="stable")].tolist()]
+
+    def summary(self):
+        return {
+            "host": self.host,
+            "connected": self.connected,
+            "last_seen": self.last_seen,
+            "ts": self.ts,
+            "procs": len(self.pid),
+            "sys_cpu": self.sys[0] if self.sys else None,
+            "sys_mem": self.sys[1] if self.sys else None,
+            "cpu_sum": round(float(self.q[:, Q_CPU].sum()) / CPU_SCALE, 1),
+        }
+
+
+class FleetStore:
+    """Every host's HostTable; readers in other threads take `lock`."""
+
+    def __init__(self):
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def table(self, host):
+        t = self.hosts.get(host)
+        if t is None:
+            t = self.hosts[host] = HostTable(host)
+        return t
+
+    def summaries(self):
+        with self.lock:
+            return [t.summary() for t in self.hosts.values()]
+
+    def procs(self, host):
+        with self.lock:
+            t = self.hosts.get(host)
+            return None if t is None else t.procs()
+
+    def events(self, host, n=100):
+        with self.lock:
+            t = self.hosts.get(host)
+            return None if t is None else list(t.events)[-n:]
+
+    def top(self, n=20, by="cpu"):
+        """The `n` busiest processes across all hosts."""
+        key = "cpu" if by == "cpu" else "mem"
+        with self.lock:
+            rows = [r for t in self.hosts.values() for r in t.top(n, by)]
+        rows.sort(key=lambda r: r[key], reverse=True)
+        return rows[:n]
+
+
+class Collector:
+    """Accepts agent connections on `address` (tcp://host:port or unix:///path)."""
+
+    def __init__(self, address, store=None):
+        self.address = address
+        self.store = store or FleetStore()
+        self.connections = 0
+        self.frames = 0
+        self.bytes = 0
+        self.errors = 0
+        self.loop = None
+        self._server = None
+
+    async def start(self):
+        family, addr = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(addr):
+                os.unlink(addr)  # left over from a previous run
+            self._server = await asyncio.start_unix_server(self._handle, addr)
+        else:
+            self._server = await asyncio.start_server(self._handle, *addr)
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def start_in_thread(self):
+        """Run the collector on its own event loop in a daemon thread."""
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.start())
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, name="fleet-collector", daemon=True).start()
+        ready.wait()
+        return self
+
+    async def _read(self, reader):
+        size, kind = parse_header(await reader.readexactly(HEADER_SIZE))
+        payload = await reader.readexactly(size)
+        self.frames += 1
+        self.bytes += HEADER_SIZE + size
+        return kind, body(payload)
+
+    async def _handle(self, reader, writer):
+        # not reading while we apply is the backpressure: a slow collector
+        # fills the socket buffers and the agent's send blocks
+        table = None
+        self.connections += 1
+        try:
+            kind, raw = await self._read(reader)
+            hello = json.loads(raw) if kind == HELLO else None
+            if not hello or hello.get("version") != PROTOCOL_VERSION:
+                raise WireError("expected HELLO with a supported protocol version")
+            with self.store.lock:
+                table = self.store.table(str(hello["host"]))
+                table.connected = True
+                table.reset()  # the agent starts over with a keyframe
+            while True:
+                kind, raw = await self._read(reader)
+                with self.store.lock:
+                    if kind == SNAPSHOT:
+                        table.apply(raw)
+                    elif kind == EVENTS:
+                        table.events.extend(json.loads(raw))
+                    table.last_seen = time.time()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # agent went away; it reconnects and resends a keyframe
+        except (WireError, ValueError, KeyError) as e:
+            self.errors += 1
+            print(f"[collector] dropping agent {table.host if table else '?'}: {e}")
+        finally:
+            self.connections -= 1
+            if table is not None:
+                with self.store.lock:
+                    table.connected = False
+            writer.close()
+
+    def stats(self):
+        return {"connections": self.connections, "frames": self.frames, "bytes": self.bytes,
+                "errors": self.errors, "hosts": len(self.store.hosts)}
+
+
+async def _report(collector, every):
+    while True:
+        await asyncio.sleep(every)
+        print(f"[collector] {collector.stats()}", flush=True)
+
+
+async def _main(args):
+    collector = Collector(args.listen)
+    await collector.start()
+    print(f"[collector] listening on {args.listen}", flush=True)
+    await _report(collector, args.report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SHOL fleet collector")
+    parser.add_argument("--listen", default=f"tcp://0.0.0.0:{DEFAULT_PORT}", help="tcp://HOST:PORT or unix:///PATH")
+    parser.add_argument("--report", type=float, default=10.0, help="seconds between stats lines")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
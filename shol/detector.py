@@ -1,49 +1,63 @@
-from .monitor import ProcessHistory
-from .logger_db import log_event
-from .utils import ts
+from monitor import ProcessHistory
+from rules import Rule, RuleEngine
+from metrics import DETECT_SECONDS
 
 UNRESPONSIVE_SEC = 20
 HIGH_MEM_PERCENT = 60
 HIGH_CPU_PERCENT = 90
+# whole same-program families (e.g. chrome.exe and its children), summed over the tree
+TREE_CPU_PERCENT = HIGH_CPU_PERCENT
+TREE_MEM_PERCENT = HIGH_MEM_PERCENT
+
+DEFAULT_RULES = (
+    # CPU == 0 in 4+ samples of the history (depending on poll interval this is a flag)
+    Rule('unresponsive', 'cpu', '==', 0, min_count=4, window=None),
+    Rule('high_memory', 'mem', '>', HIGH_MEM_PERCENT),
+    Rule('high_cpu', 'cpu', '>', HIGH_CPU_PERCENT),
+)
 
 class Detector:
-    def __init__(self, ph: ProcessHistory):
+    def __init__(self, ph: ProcessHistory, rules=DEFAULT_RULES):
         self.ph = ph
+        # counters are seeded from the current history, then follow every ph.sample()
+        self.engine = RuleEngine(ph.store, rules)
+
+    def add_rule(self, rule: Rule):
+        self.engine.add_rule(rule)
+
+    def _issues(self, issues=None):
+        store = self.ph.store
+        return [(int(store.pid[slot]), issue, store.latest(slot))
+                for slot, issue in self.engine.evaluate(issues)]
 
     def check_unresponsive(self):
-        issues = []
-        for pid, dq in self.ph.hist.items():
-            if not dq: continue
-            # if last N samples have CPU == 0
-            cpu_zero_count = sum(1 for s in dq if s.get('cpu_percent',0) == 0)
-            # if zero for large fraction of history (approx)
-            if cpu_zero_count >= 4:  # depending on poll interval this is a flag
-                # ensure process is still running
-                issues.append((pid, 'unresponsive', dq[-1]))
-        return issues
+        return self._issues(('unresponsive',))
 
     def check_high_memory(self):
-        issues = []
-        for pid, dq in self.ph.hist.items():
-            if not dq: continue
-            mem = dq[-1].get('memory_percent') or 0
-            if mem > HIGH_MEM_PERCENT:
-                issues.append((pid, 'high_memory', dq[-1]))
-        return issues
+        return self._issues(('high_memory',))
 
     def check_high_cpu(self):
-        issues = []
-        for pid, dq in self.ph.hist.items():
-            if not dq: continue
-            cpu = dq[-1].get('cpu_percent') or 0
-            if cpu > HIGH_CPU_PERCENT:
-                issues.append((pid, 'high_cpu', dq[-1]))
-        return issues
+        return self._issues(('high_cpu',))
+
+    def check_trees(self):
+        """Families whose rolled-up CPU or memory is too high, as (root pid, issue, info).
+
+        info is the root's latest sample plus a "tree" entry with the subtree
+        size, cpu, mem and pids, so a healer can act on every member.
+        """
+        store, tree = self.ph.store, self.ph.tree
+        out = []
+        with store.lock:
+            for slot, roll in tree.heavy_families(cpu=TREE_CPU_PERCENT, mem=TREE_MEM_PERCENT):
+                info = store.latest(slot)
+                if info is None:
+                    continue
+                info["tree"] = dict(roll, pids=[int(store.pid[s]) for s in tree.subtree_slots(slot)])
+                issue = 'tree_high_cpu' if roll["cpu"] > TREE_CPU_PERCENT else 'tree_high_memory'
+                out.append((int(store.pid[slot]), issue, info))
+        return out
 
     def detect_all(self):
-        # run all detectors and return list of issues
-        issues = []
-        issues.extend(self.check_unresponsive())
-        issues.extend(self.check_high_memory())
-        issues.extend(self.check_high_cpu())
-        return issues
+        # run every rule in one pass and return list of (pid, issue, info)
+        with DETECT_SECONDS.time():
+            return self._issues() + self.check_trees()
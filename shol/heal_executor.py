@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from utils import log_event
+from impact import SETTLE_TIMEOUT
+from metrics import REGISTRY
+
+MAX_CONCURRENT_HEALS = 4
+# seconds a single heal may take: two impact measures (soft, then hard
+# recovery), the 5 s terminate and descendant waits, and some slack
+HEAL_TIMEOUT = 2 * SETTLE_TIMEOUT + 20.0
+
+HEAL_QUEUED = REGISTRY.gauge("shol_heal_queued", "Heals waiting for a concurrency slot.")
+HEAL_RUNNING = REGISTRY.gauge("shol_heal_running", "Heals currently running.")
+
+
+class HealExecutor:
+    """Runs heal coroutines on a private asyncio loop in a background thread.
+
+    `submit()` returns immediately, so the caller's scan keeps going while
+    heals are in flight. At most `max_concurrent` heals run at once; the rest
+    wait in the queue. A heal that exceeds `timeout` is cancelled. A key
+    (normally the pid) can only be queued or running once at a time.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_HEALS, timeout=HEAL_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="heal-executor", daemon=True)
+        self._ready = threading.Event()
+        self._sem = None
+        self._lock = threading.Lock()
+        self._keys = set()
+        # counters (written from the loop thread only)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._sem = asyncio.Semaphore(self.max_concurrent)
+        self._ready.set()
+        self.loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+        self._publish()
+        return self
+
+    def submit(self, key, make_coro):
+        """Schedule `make_coro()` unless `key` is already queued or running.
+
+        Returns False when the key was already in flight.
+        """
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+        self.loop.call_soon_threadsafe(self._enqueue, key, make_coro)
+        return True
+
+    def _publish(self):
+        HEAL_QUEUED.set(self.queued)
+        HEAL_RUNNING.set(self.running)
+
+    def _enqueue(self, key, make_coro):
+        self.queued += 1
+        self._publish()
+        self.loop.create_task(self._run(key, make_coro))
+
+    async def _run(self, key, make_coro):
+        try:
+            async with self._sem:
+                self.queued -= 1
+                self.running += 1
+                self._publish()
+                try:
+                    await asyncio.wait_for(make_coro(), self.timeout)
+                    self.completed += 1
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    log_event(f" Healing timed out after {self.timeout:.0f}s", f"key={key}")
+                except Exception as e:
+                    self.failed += 1
+                    log_event(" Healing task failed", f"key={key} -> {e}")
+                finally:
+                    self.running -= 1
+                    self._publish()
+        finally:
+            with self._lock:
+                self._keys.discard(key)
+
+    def queue_depth(self):
+        """Heals waiting for a concurrency slot."""
+        return self.queued
+
+    def in_flight(self):
+        return self.queued + self.running
+
+    def stats(self):
+        """Counters of this executor; queued/running are also exported as the
+        shol_heal_queued / shol_heal_running gauges."""
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self, timeout=None):
+        """Wait up to `timeout` seconds for in-flight heals, then stop the loop."""
+        async def drain():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if tasks:
+                await asyncio.wait(tasks, timeout=timeout)
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(drain(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
@@ -1,17 +1,38 @@
-import psutil, time, subprocess, json, os
-from utils import log_event, ts
+import psutil, time, subprocess, json, os, asyncio, argparse
+from utils import log_event, ts, use_dry_run_log
+from monitor import ProcessHistory
+from sources import open_source
+from metrics import HEAL_SECONDS, start_publisher
+from scheduler import SLOW_INTERVAL, AdaptiveScheduler
+from readiness import notify_ready
+from heal_executor import HealExecutor
+from impact import ImpactMeter
+from optimization_store import default_store
+from whitelist import ProcessMatcher, ignore_list, whitelist as shared_whitelist
+from detector import TREE_CPU_PERCENT, TREE_MEM_PERCENT
 
 # ----------------------------------------
 # 🔒 System-level Ignore List
 # ----------------------------------------
-IGNORE = [
-    "System", "Registry", "svchost.exe", "smss.exe",
-    "wininit.exe", "lsass.exe", "csrss.exe", "services.exe"
-]
+# data/ignore.json, or whitelist.DEFAULT_IGNORE when that file doesn't exist
+IGNORE = ignore_list()
 
 # ----------------------------------------
 # 🧠 Restart Mapping
 # ----------------------------------------
+# opt-in: families whose rolled-up cpu%/mem% (process tree rollups) exceed
+# detector.TREE_CPU_PERCENT / TREE_MEM_PERCENT are healed as a whole, so a forking offender can't just
+# respawn its children. Idle "unresponsive" processes are always healed alone.
+HEAL_WHOLE_TREE = False
+
+# soft recovery counts as a success when the tree's CPU drops by SOFT_CPU_DROP
+# of its baseline; a baseline below SOFT_MIN_CPU (idle, the unresponsive
+# case) can't drop, so there success means working again: at least
+# SOFT_ACTIVE_CPU and not stopped
+SOFT_CPU_DROP = 0.3
+SOFT_MIN_CPU = 1.0
+SOFT_ACTIVE_CPU = 0.5
+
 RESTART_MAP = {
     "notepad.exe": ["notepad.exe"],
     "calc.exe": ["calc.exe"],
@@ -20,80 +41,158 @@ RESTART_MAP = {
 # ----------------------------------------
 # 📜 Whitelist Config
 # ----------------------------------------
-WHITELIST_FILE = "whitelist.json"
-
 def load_whitelist():
-    """Safely load user whitelist (case-insensitive)."""
-    try:
-        if os.path.exists(WHITELIST_FILE):
-            with open(WHITELIST_FILE, "r") as f:
-                data = json.load(f)
-                # normalize case
-                return [str(p).strip().lower() for p in data]
-    except Exception as e:
-        log_event(f" Failed to read whitelist.json: {e}")
-    return []
+    """Shared compiled whitelist (data/whitelist.json); re-reads the file only when it changed."""
+    return shared_whitelist()
 
-def is_whitelisted(name: str, whitelist: list):
-    """Check if process name matches any whitelisted entry (case-insensitive)."""
+def is_whitelisted(name: str, whitelist, cmdline=()):
+    """Check if process name (or cmdline) matches any whitelisted entry (case-insensitive)."""
+    if isinstance(whitelist, ProcessMatcher):
+        return whitelist.matches(name, cmdline)
     return name.lower().strip() in whitelist
 
 # ----------------------------------------
 # ⚙️ Optimization Data Tracking
 # ----------------------------------------
-OPTIMIZATION_FILE = "optimization_data.json"
+# shared append-only store (data/optimizations/), also read by dashboard and API
+
+def record_optimization(process_name, impact, recovery_type=None):
+    """Store the measured impact of a heal (see impact.ImpactMeter).
 
-def record_optimization(process_name, cpu_before, mem_before, cpu_after, mem_after):
-    cpu_gain = max(0, cpu_before - cpu_after)
-    mem_gain = max(0, mem_before - mem_after)
+    cpu_gain / mem_gain keep their old meaning, percent of the whole
+    machine, but now count only the healed process tree.
+    """
+    cpu_gain = max(0.0, impact["cpu_rate_before"] - impact["cpu_rate_after"]) * 100 / (psutil.cpu_count() or 1)
+    mem_gain = impact["bytes_freed"] * 100 / psutil.virtual_memory().total
     optimization_score = (cpu_gain + mem_gain) / 2
 
     try:
-        data = []
-        if os.path.exists(OPTIMIZATION_FILE):
-            with open(OPTIMIZATION_FILE, "r") as f:
-                data = json.load(f)
-        data.append({
+        default_store().append({
             "timestamp": ts(),
             "process": process_name,
+            "recovery": recovery_type,
             "cpu_gain": round(cpu_gain, 2),
             "mem_gain": round(mem_gain, 2),
-            "optimization_score": round(optimization_score, 2)
+            "optimization_score": round(optimization_score, 2),
+            "cpu_seconds_saved": impact["cpu_seconds_saved"],
+            "bytes_freed": impact["bytes_freed"],
+            "pids": impact["pids"],
         })
-        with open(OPTIMIZATION_FILE, "w") as f:
-            json.dump(data[-50:], f, indent=2)
         log_event(f" Optimization for {process_name}: {optimization_score:.2f}%")
     except Exception as e:
         log_event(f" Failed to record optimization for {process_name}: {e}")
+    return optimization_score
 
 # ----------------------------------------
 # 🧩 Responsiveness & Healing Logic
 # ----------------------------------------
-def is_process_unresponsive(proc):
+def is_process_unresponsive(proc, cpu_table=None):
+    """cpu_table: optional {pid: cpu%} from Sampler.measure_cpu(); without it
+    this blocks 0.1 s measuring the process on its own."""
     try:
-        if proc.cpu_percent(interval=0.1) == 0 and proc.memory_percent() < 1:
+        if cpu_table is not None:
+            cpu = cpu_table.get(proc.pid)
+            if cpu is None:
+                return False  # exited during the measurement
+        else:
+            cpu = proc.cpu_percent(interval=0.1)
+        if cpu == 0 and proc.memory_percent() < 1:
             return True
         return False
     except (psutil.NoSuchProcess, psutil.AccessDenied):
         return False
 
+def soft_recovered(proc, cpu_before, cpu_after):
+    """Did soft recovery work? cpu_before / cpu_after are the tree's CPU % from ImpactMeter."""
+    if cpu_before >= SOFT_MIN_CPU:
+        return cpu_after < cpu_before * (1 - SOFT_CPU_DROP)
+    try:
+        status = proc.status()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+    return cpu_after >= SOFT_ACTIVE_CPU and status not in (psutil.STATUS_STOPPED, psutil.STATUS_ZOMBIE,
+                                                           psutil.STATUS_DEAD)
+
 def heal_process(proc, whitelist):
-    import os  # ensure os is available locally
+    """Blocking wrapper around heal_process_async() for one-off callers."""
+    ph = ProcessHistory()
+    ph.sample()
+    return asyncio.run(heal_process_async(proc, whitelist, ImpactMeter(ph.store, refresh=ph.sample, tree=ph.tree)))
+
+def _protected_pids():
+    """SHOL's own pid, its ancestors (shell, supervisor, ...) and its descendants."""
+    me = psutil.Process()
+    pids = {me.pid}
+    for group in (me.parents, lambda: me.children(recursive=True)):
+        try:
+            pids.update(p.pid for p in group())
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return pids
+
+async def _terminate_descendants(baseline, whitelist, timeout=5):
+    """Terminate the baseline's tree members below the root; returns their pids.
+
+    Members come from the sampled tree, so no children() walk is needed;
+    each is checked against its recorded create_time before it is touched.
+    """
+    procs = []
+    protected = _protected_pids()
+    for pid, create_time, _slot in baseline.members[1:]:
+        if pid in protected:
+            continue
+        try:
+            p = psutil.Process(pid)
+            if abs(p.create_time() - create_time) >= 1.0:
+                continue  # pid was reused
+            name = p.name()
+            if IGNORE.matches(name) or is_whitelisted(name, whitelist):
+                continue
+            p.terminate()
+            procs.append(p)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    if not procs:
+        return []
+    _gone, alive = await asyncio.to_thread(psutil.wait_procs, procs, timeout)
+    for p in alive:
+        try:
+            p.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return [p.pid for p in procs]
+
+async def heal_process_async(proc, whitelist, meter, whole_tree=False):
+    """Soft, then hard recovery of `proc`; `meter` measures what it freed.
+
+    Returns the recovery that worked ("Soft Recovery" / "Hard Recovery"), or
+    None when the process was skipped or could not be stopped.
+
+    With `whole_tree` (for families flagged by their tree rollups), hard
+    recovery also terminates the process's sampled descendants. SHOL itself,
+    its ancestors and its descendants are never touched.
+    """
+    started = time.perf_counter()
     try:
         name = proc.name()
         pid = proc.pid
     except (psutil.NoSuchProcess, psutil.AccessDenied):
         return
 
+    if pid in _protected_pids():
+        log_event(f" Skipped SHOL-related process: {name} (PID {pid})")
+        return
+
     # 🔒 Skip whitelisted apps
     if is_whitelisted(name, whitelist):
         log_event(f" Skipped whitelisted process: {name} (PID {pid})")
         return
 
     try:
-        # ✅ Capture system usage before healing
-        cpu_before = psutil.cpu_percent(interval=0.8)
-        mem_before = psutil.virtual_memory().percent
+        # ✅ Baseline of the process tree, straight from the sampled history
+        baseline = meter.begin(pid)
+        if baseline is None:
+            log_event(f" No history for {name} (PID {pid}); impact will not be measured")
 
         log_event(f" Attempting to heal process: {name} (PID {pid})")
 
@@ -150,19 +249,21 @@ def heal_process(proc, whitelist):
                     except Exception as e:
                         raise e
 
-            # Wait briefly and recheck system CPU to judge effectiveness
-            time.sleep(2.5)
-            cpu_after_soft = psutil.cpu_percent(interval=0.8)
-
-            # If CPU usage improved significantly (here threshold: 30% drop), consider success
-            if cpu_after_soft < cpu_before * 0.7:
-                log_event(f" [Soft Recovery Success] {name}: CPU improved {cpu_before:.2f}% → {cpu_after_soft:.2f}%")
-                mem_after_soft = psutil.virtual_memory().percent
-                record_optimization(name, cpu_before, mem_before, cpu_after_soft, mem_after_soft)
-                log_event(f" {recovery_type} successful for {name} (PID {pid})")
-                return
-            else:
-                log_event(f" [Soft Recovery Ineffective] {name} still high usage ({cpu_after_soft:.2f}%)")
+            # Wait for the next samples of the tree to judge effectiveness
+            if baseline is not None:
+                impact = await meter.measure(baseline)
+                cpu_before = baseline.cpu_rate * 100
+                cpu_after_soft = impact["cpu_rate_after"] * 100
+
+                # busy tree: CPU dropped enough; idle tree: it is working again
+                if soft_recovered(proc, cpu_before, cpu_after_soft):
+                    HEAL_SECONDS.observe(time.perf_counter() - started, recovery="soft")
+                    log_event(f" [Soft Recovery Success] {name}: CPU {cpu_before:.2f}% → {cpu_after_soft:.2f}%")
+                    record_optimization(name, impact, recovery_type)
+                    log_event(f" {recovery_type} successful for {name} (PID {pid})")
+                    return recovery_type
+                else:
+                    log_event(f" [Soft Recovery Ineffective] {name}: CPU {cpu_before:.2f}% → {cpu_after_soft:.2f}%")
 
         except Exception as e:
             # Log the specific soft-recovery error (this prevents WinError 87 from crashing the function)
@@ -174,7 +275,7 @@ def heal_process(proc, whitelist):
         recovery_type = "Hard Recovery"
         try:
             proc.terminate()
-            proc.wait(timeout=5)
+            await asyncio.to_thread(proc.wait, 5)
             log_event(f" [Hard Recovery] Terminated unresponsive process: {name} (PID {pid})")
         except Exception as tere:
             # if terminate fails, try kill as last resort (but log it)
@@ -185,6 +286,13 @@ def heal_process(proc, whitelist):
                 log_event(f" Termination/Kill failed for {name} (PID {pid}) -> {e}")
                 # can't proceed to optimization recording if kill failed; return
                 return
+        exited = [pid]
+        if whole_tree and baseline is not None and len(baseline.members) > 1:
+            children = await _terminate_descendants(baseline, whitelist)
+            if children:
+                exited.extend(children)
+                log_event(f" [Hard Recovery] Terminated {len(children)} descendant(s) of {name} (PID {pid})")
+        HEAL_SECONDS.observe(time.perf_counter() - started, recovery="hard")
 
         # 🔁 Optional restart
         if name.lower() in RESTART_MAP:
@@ -194,23 +302,21 @@ def heal_process(proc, whitelist):
             except Exception as e:
                 log_event(f" Restart failed for {name} -> {e}")
 
-        # ✅ Wait for system to stabilize
-        time.sleep(1.5)
-        cpu_after = psutil.cpu_percent(interval=0.8)
-        mem_after = psutil.virtual_memory().percent
+        if baseline is None:
+            return recovery_type
 
-        # Calculate optimization
-        cpu_gain = max(0, cpu_before - cpu_after)
-        mem_gain = max(0, mem_before - mem_after)
-        optimization_score = round((cpu_gain + mem_gain) / 2, 2)
-
-        record_optimization(name, cpu_before, mem_before, cpu_after, mem_after)
+        # ✅ Terminated processes count as freed at once; only surviving
+        # members of the tree need fresh samples
+        impact = await meter.measure(baseline, exited=exited)
+        optimization_score = record_optimization(name, impact, recovery_type)
 
         # Log summary for dashboard
         if optimization_score > 0.05:
-            log_event(f" [{recovery_type}] Optimization for {name}: {optimization_score:.2f}% (CPU↓ {cpu_gain:.2f}%, MEM↓ {mem_gain:.2f}%)")
+            log_event(f" [{recovery_type}] Optimization for {name}: {optimization_score:.2f}% "
+                      f"(CPU↓ {impact['cpu_seconds_saved']:.2f}s, MEM↓ {impact['bytes_freed'] / 1048576:.1f} MB)")
         else:
             log_event(f"ℹ [{recovery_type}] Minimal optimization for {name}: <0.1%")
+        return recovery_type
 
     except Exception as e:
         log_event(f" Healing failed for {name} (PID {pid}) -> {e}")
@@ -220,29 +326,109 @@ def heal_process(proc, whitelist):
 # ----------------------------------------
 # 🧠 Main Loop
 # ----------------------------------------
-def main():
-    log_event(" Healer service started", f"Timestamp: {ts()}")
+def _heal_heavy_families(ph, whitelist, ignore, executor, meter, dry_run):
+    """Queue a whole-tree heal for every family over the tree limits."""
+    store = ph.store
+    with store.lock:
+        heavy = [(int(store.pid[slot]), store.names[slot], store.cmdlines[slot], roll)
+                 for slot, roll in ph.tree.heavy_families(cpu=TREE_CPU_PERCENT, mem=TREE_MEM_PERCENT)]
+    protected = _protected_pids()
+    for pid, pname, cmdline, roll in heavy:
+        if pid in protected or not pname or ignore.matches(pname) or whitelist.matches(pname, cmdline):
+            continue
+        if dry_run:
+            log_event(f" [Dry Run] Would heal process tree: {pname} (PID {pid})",
+                      f"{roll['size']} processes, cpu {roll['cpu']:.1f}%, mem {roll['mem']:.1f}%")
+            continue
+        try:
+            proc = psutil.Process(pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        executor.submit(pid, lambda proc=proc, wl=whitelist: heal_process_async(proc, wl, meter, whole_tree=True))
+
+def main(source=None, dry_run=False):
+    """Scan and heal forever.
+
+    source: a sources.ProcessSource (default: this host). Anything but a live
+    source runs in dry-run mode, since its pids aren't processes here; a dry
+    run logs the heals it would start to logs/dry_run.log instead of touching
+    any process.
+    """
+    ph = ProcessHistory(source=source)
+    dry_run = dry_run or not ph.source.live
+    if dry_run:
+        use_dry_run_log()
+    log_event(" Healer service started", f"Timestamp: {ts()}" + (" (dry run)" if dry_run else ""))
+    start_publisher("healer")  # served by api_server's /metrics
+
+    # heals run concurrently in the background; the scan never waits for them
+    executor = HealExecutor().start()
+    # heals measure their impact from ph's history, so keep it sampled while they run
+    meter = ImpactMeter(ph.store, tree=ph.tree)
+    # heal decisions are made on full scans; hot processes are refreshed in
+    # between. Recorded/simulated sources scan every frame, paced by the source
+    sched = AdaptiveScheduler(slow=SLOW_INTERVAL if ph.source.live else 0.0)
 
     while True:
-        whitelist = load_whitelist()  # 🔁 Always refresh dynamically
+        try:
+            kind = sched.poll(ph)
+            if kind != "scan" and executor.in_flight():
+                ph.sample()  # impact is measured on the whole table, not just the hot rows
+        except EOFError:
+            log_event(" Healer stopped: end of recorded process data")
+            executor.shutdown()
+            return
+        if kind != "scan":
+            sched.wait(busy=executor.in_flight())
+            continue
+
+        whitelist = load_whitelist()  # 🔁 reloads only if the file changed
+        ignore = ignore_list()
+        snap = ph.last
+        candidates = []
+        for pid, pname, cmdline in zip(snap.pid.tolist(), snap.names, snap.cmdlines):
+            if not pname or ignore.matches(pname):
+                continue
 
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                pname = proc.info.get("name", "")
-                if not pname or pname in IGNORE:
-                    continue
+            # Skip whitelisted user-defined processes
+            if whitelist.matches(pname, cmdline):
+                continue
 
-                # Skip whitelisted user-defined processes
-                if is_whitelisted(pname, whitelist):
-                    continue
+            candidates.append(pid)
 
-                if is_process_unresponsive(proc):
-                    heal_process(proc, whitelist)
+        # one shared 0.1 s window for the whole scan instead of 0.1 s per process
+        cpu_table = ph.source.measure_cpu(candidates, interval=0.1)
 
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        if dry_run:
+            mem = dict(zip(snap.pid.tolist(), snap.mem.tolist()))
+            names = dict(zip(snap.pid.tolist(), snap.names))
+            for pid in candidates:
+                # same test as is_process_unresponsive(), on the sampled values
+                if cpu_table.get(pid) == 0 and mem.get(pid, 100.0) < 1:
+                    log_event(f" [Dry Run] Would heal unresponsive process: {names[pid]} (PID {pid})")
+        else:
+            for pid in candidates:
+                if cpu_table.get(pid) != 0:
+                    continue  # busy (or gone): not unresponsive
+                try:
+                    proc = psutil.Process(pid)
+                    if is_process_unresponsive(proc, cpu_table):
+                        executor.submit(pid, lambda proc=proc, wl=whitelist: heal_process_async(proc, wl, meter))
+
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+
+        if HEAL_WHOLE_TREE:
+            _heal_heavy_families(ph, whitelist, ignore, executor, meter, dry_run)
 
-        time.sleep(10)
+        ph.cleanup_dead()
+        notify_ready()  # first scan done (only the first call does anything)
+        sched.wait(busy=executor.in_flight())
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="SHOL healer service")
+    parser.add_argument("--source", default="live",
+                        help="live | synthetic[:N] | replay:PATH | replay-loop:PATH | record:PATH")
+    parser.add_argument("--dry-run", action="store_true", help="log heals instead of acting on processes")
+    args = parser.parse_args()
+    main(open_source(args.source), args.dry_run)
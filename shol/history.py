@@ -0,0 +1,237 @@
+import sys
+import threading
+from collections.abc import Mapping
+import numpy as np
+
+# psutil status strings -> compact uint8 codes (index in this tuple)
+STATUS_NAMES = (
+    "unknown", "running", "sleeping", "disk-sleep", "stopped", "tracing-stop",
+    "zombie", "dead", "wake-kill", "waking", "idle", "locked", "waiting",
+    "suspended", "parked",
+)
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+
+def status_code(status):
+    return STATUS_CODES.get(status, 0)
+
+
+class ColumnarHistory:
+    """Fixed-size ring buffer of per-process samples.
+
+    Every metric is one 2-D NumPy array of shape (slots, history_len); a
+    process owns one row ("slot") for its whole lifetime. Slots are keyed by
+    (pid, create_time) so a recycled pid never inherits someone else's
+    history. Static attributes (name, cmdline) are stored once per slot and
+    interned, instead of once per sample.
+
+    `cpu_time` (cumulative CPU seconds) and `rss` (bytes) keep the raw
+    counters next to the percentages, so deltas between any two samples can
+    be computed after the fact; `ppid` holds each slot's latest parent pid.
+    Writers hold `lock`; readers in other threads take it for consistent
+    multi-array reads.
+    """
+
+    def __init__(self, history_len=60, capacity=256):
+        self.history_len = history_len
+        self.capacity = 0
+        self.index = {}        # (pid, create_time) -> slot
+        self.pid_slot = {}     # pid -> slot of its current incarnation
+        self._free = []
+        self._listeners = []
+        self._release_listeners = []
+        self.seq = 0           # bumped on every append batch
+        self.lock = threading.RLock()
+        self._alloc(capacity)
+
+    # ---------------- storage ----------------
+    def _alloc(self, capacity):
+        """Grow every array to `capacity` slots, keeping existing data."""
+        old = self.capacity
+        L = self.history_len
+
+        def grow(arr, shape, dtype):
+            new = np.zeros(shape, dtype=dtype)
+            if arr is not None:
+                new[:old] = arr
+            return new
+
+        self.cpu = grow(getattr(self, "cpu", None), (capacity, L), np.float32)
+        self.mem = grow(getattr(self, "mem", None), (capacity, L), np.float32)
+        self.status = grow(getattr(self, "status", None), (capacity, L), np.uint8)
+        self.sample_ts = grow(getattr(self, "sample_ts", None), (capacity, L), np.float64)
+        self.cpu_time = grow(getattr(self, "cpu_time", None), (capacity, L), np.float64)
+        self.rss = grow(getattr(self, "rss", None), (capacity, L), np.int64)
+        self.ppid = grow(getattr(self, "ppid", None), capacity, np.int64)
+        self.pid = grow(getattr(self, "pid", None), capacity, np.int64)
+        self.create_time = grow(getattr(self, "create_time", None), capacity, np.float64)
+        self.head = grow(getattr(self, "head", None), capacity, np.int32)    # next column to write
+        self.count = grow(getattr(self, "count", None), capacity, np.int32)  # valid samples (<= L)
+        self.alive = grow(getattr(self, "alive", None), capacity, np.bool_)
+        self.names = getattr(self, "names", []) + [None] * (capacity - old)
+        self.cmdlines = getattr(self, "cmdlines", []) + [None] * (capacity - old)
+        self.cmdline_strs = getattr(self, "cmdline_strs", []) + [None] * (capacity - old)
+        self._free.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def slot_for(self, pid, create_time, name=None, cmdline=None):
+        """Return the slot of (pid, create_time), allocating one if needed."""
+        create_time = float(create_time or 0.0)
+        key = (pid, create_time)
+        slot = self.index.get(key)
+        if slot is not None:
+            return slot
+        # same pid with a different create_time: the old process is gone
+        old = self.pid_slot.get(pid)
+        if old is not None:
+            self.release(old)
+        if not self._free:
+            self._alloc(max(self.capacity * 2, 16))
+        slot = self._free.pop()
+        self.index[key] = slot
+        self.pid_slot[pid] = slot
+        self.pid[slot] = pid
+        self.create_time[slot] = create_time
+        self.head[slot] = 0
+        self.count[slot] = 0
+        self.ppid[slot] = 0
+        self.alive[slot] = True
+        cmdline = tuple(cmdline or ())
+        self.names[slot] = sys.intern(name) if name else name
+        self.cmdlines[slot] = cmdline
+        self.cmdline_strs[slot] = sys.intern(" ".join(cmdline))
+        return slot
+
+    def release(self, slot):
+        if not self.alive[slot]:
+            return
+        for listener in self._release_listeners:
+            listener(self, slot)
+        pid = int(self.pid[slot])
+        self.index.pop((pid, float(self.create_time[slot])), None)
+        if self.pid_slot.get(pid) == slot:
+            del self.pid_slot[pid]
+        self.alive[slot] = False
+        self.count[slot] = 0
+        self.names[slot] = self.cmdlines[slot] = self.cmdline_strs[slot] = None
+        self._free.append(slot)
+
+    def subscribe(self, listener):
+        """Register `listener(history, slots, cols, values)`.
+
+        It is called before a batch is written, so the listener can still
+        read the samples that are about to be overwritten.
+        """
+        self._listeners.append(listener)
+
+    def subscribe_release(self, listener):
+        """Register `listener(history, slot)`, called just before a slot is freed."""
+        self._release_listeners.append(listener)
+
+    def append_many(self, slots, ts, cpu, mem, status, cpu_time=None, rss=None, ppid=None):
+        """Write one sample for each slot in `slots` (all taken at `ts`).
+
+        Counters that are not given are stored as zeros.
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        if slots.size == 0:
+            return
+        cols = self.head[slots]
+        values = {"cpu": np.asarray(cpu, dtype=np.float32),
+                  "mem": np.asarray(mem, dtype=np.float32),
+                  "status": np.asarray(status, dtype=np.uint8)}
+        if ppid is not None:
+            values["ppid"] = np.asarray(ppid, dtype=np.int64)
+        for listener in self._listeners:
+            listener(self, slots, cols, values)
+        self.cpu[slots, cols] = values["cpu"]
+        self.mem[slots, cols] = values["mem"]
+        self.status[slots, cols] = values["status"]
+        self.sample_ts[slots, cols] = ts
+        self.cpu_time[slots, cols] = 0.0 if cpu_time is None else cpu_time
+        self.rss[slots, cols] = 0 if rss is None else rss
+        if ppid is not None:
+            self.ppid[slots] = ppid
+        self.head[slots] = (cols + 1) % self.history_len
+        self.count[slots] = np.minimum(self.count[slots] + 1, self.history_len)
+        self.seq += 1
+
+    def append(self, pid, create_time, name, cmdline, cpu, mem, status, ts):
+        slot = self.slot_for(pid, create_time, name, cmdline)
+        self.append_many([slot], ts, [cpu or 0.0], [mem or 0.0], [status_code(status)])
+        return slot
+
+    # ---------------- reads ----------------
+    def active_slots(self):
+        return np.flatnonzero(self.alive & (self.count > 0))
+
+    def last_cols(self, slots):
+        return (self.head[slots] - 1) % self.history_len
+
+    def series(self, slot, metric="cpu"):
+        """Samples of one slot in chronological order (oldest first)."""
+        arr = getattr(self, metric)[slot]
+        n = int(self.count[slot])
+        if n < self.history_len:
+            return arr[:n].copy()
+        return np.roll(arr, -int(self.head[slot]))
+
+    def sample(self, slot, col):
+        """Materialize one sample as a dict shaped like psutil's `p.info`."""
+        return {
+            "pid": int(self.pid[slot]),
+            "name": self.names[slot],
+            "cmdline": list(self.cmdlines[slot]),
+            "cpu_percent": float(self.cpu[slot, col]),
+            "memory_percent": float(self.mem[slot, col]),
+            "status": STATUS_NAMES[self.status[slot, col]],
+            "sample_ts": float(self.sample_ts[slot, col]),
+            "cmdline_str": self.cmdline_strs[slot],
+        }
+
+    def samples(self, slot):
+        """All samples of one slot as dicts, oldest first."""
+        L = self.history_len
+        n = int(self.count[slot])
+        start = (int(self.head[slot]) - n) % L
+        return [self.sample(slot, (start + i) % L) for i in range(n)]
+
+    def latest(self, slot):
+        if not self.alive[slot] or self.count[slot] == 0:
+            return None
+        return self.sample(slot, (int(self.head[slot]) - 1) % self.history_len)
+
+    def latest_all(self):
+        return [self.latest(int(s)) for s in self.active_slots()]
+
+    def retain(self, pids):
+        """Drop every slot whose pid is not in `pids`."""
+        pids = set(pids)
+        for pid, slot in list(self.pid_slot.items()):
+            if pid not in pids:
+                self.release(slot)
+
+    def __len__(self):
+        return len(self.pid_slot)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.cpu, self.mem, self.status, self.sample_ts,
+                                      self.cpu_time, self.rss, self.ppid, self.pid, self.create_time, self.head,
+                                      self.count, self.alive))
+
+
+class HistoryView(Mapping):
+    """Read-only pid -> [sample dicts] view for code written against the old
+    dict-of-deques layout. Samples are materialized on access only."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, pid):
+        return self.store.samples(self.store.pid_slot[pid])
+
+    def __iter__(self):
+        return iter(list(self.store.pid_slot))
+
+    def __len__(self):
+        return len(self.store.pid_slot)
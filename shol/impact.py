@@ -0,0 +1,174 @@
+import asyncio
+import time
+import numpy as np
+import psutil
+
+BASELINE_SAMPLES = 5    # history samples before the action used for the "before" rate
+AFTER_SAMPLES = 2       # samples a surviving process needs after the action
+SETTLE_TIMEOUT = 15.0   # give up waiting for samples after this many seconds
+POLL_INTERVAL = 0.5
+
+
+class Baseline:
+    """State of a process tree just before an action, taken from history."""
+
+    __slots__ = ("root", "ts", "members", "cpu_rate", "rss", "window")
+
+    def __init__(self, root, ts, members, cpu_rate, rss, window):
+        self.root = root
+        self.ts = ts
+        self.members = members    # [(pid, create_time, slot)], root first
+        self.cpu_rate = cpu_rate  # CPU seconds per second, summed over the tree
+        self.rss = rss            # bytes, summed over the tree
+        self.window = window      # seconds covered by the before samples
+
+
+class ImpactMeter:
+    """Attributes CPU time and memory changes to the process tree that was acted on.
+
+    Everything comes from the counters the sampler already stores in
+    ColumnarHistory (cumulative cpu_time and rss per sample), so taking a
+    baseline is a lookup and the "after" side only waits for the normal
+    sampling ticks; nothing sleeps to measure. Unlike system-wide
+    cpu_percent/virtual_memory, the numbers are not disturbed by unrelated
+    processes.
+    """
+
+    def __init__(self, store, baseline_samples=BASELINE_SAMPLES, after_samples=AFTER_SAMPLES, refresh=None,
+                 tree=None):
+        # refresh: optional callable that appends a sample to `store`, for
+        # callers with no loop of their own keeping the history current;
+        # tree: the ProcessTree over `store`, if the caller maintains one
+        self.store = store
+        self.tree = tree
+        self.baseline_samples = baseline_samples
+        self.after_samples = after_samples
+        self.refresh = refresh
+
+    def tree_slots(self, pid):
+        """Slots of `pid` and all its descendants (root first)."""
+        store = self.store
+        root = store.pid_slot.get(pid)
+        if root is None:
+            return []
+        if self.tree is not None:
+            return self.tree.subtree_slots(root)
+        alive = np.flatnonzero(store.alive)
+        children = {}
+        for slot, parent in zip(alive.tolist(), store.ppid[alive].tolist()):
+            children.setdefault(parent, []).append(slot)
+        out, stack = [], [root]
+        while stack:
+            slot = stack.pop()
+            out.append(slot)
+            stack.extend(s for s in children.get(int(store.pid[slot]), ()) if s != slot)
+        return out
+
+    def _window(self, slot, after_ts=None, before_ts=None):
+        """(sample times, cpu_time, rss) of one slot, restricted to a time range."""
+        store = self.store
+        t = store.series(slot, "sample_ts")
+        mask = np.ones(len(t), np.bool_)
+        if after_ts is not None:
+            mask &= t > after_ts
+        if before_ts is not None:
+            mask &= t <= before_ts
+        return t[mask], store.series(slot, "cpu_time")[mask], store.series(slot, "rss")[mask]
+
+    @staticmethod
+    def _rate(t, cpu_time):
+        if len(t) < 2 or t[-1] <= t[0]:
+            return 0.0, 0.0
+        return max(0.0, float(cpu_time[-1] - cpu_time[0]) / float(t[-1] - t[0])), float(t[-1] - t[0])
+
+    def begin(self, pid, ts=None):
+        """Baseline for `pid`'s tree as of now; None if the pid has no history."""
+        ts = time.time() if ts is None else ts
+        store = self.store
+        with store.lock:
+            slots = self.tree_slots(pid)
+            if not slots:
+                return None
+            members, cpu_rate, rss, window = [], 0.0, 0, 0.0
+            for slot in slots:
+                t, cpu_time, mem = self._window(slot, before_ts=ts)
+                t, cpu_time, mem = (t[-self.baseline_samples:], cpu_time[-self.baseline_samples:],
+                                    mem[-self.baseline_samples:])
+                rate, span = self._rate(t, cpu_time)
+                cpu_rate += rate
+                window = max(window, span)
+                rss += int(mem[-1]) if len(mem) else 0
+                members.append((int(store.pid[slot]), float(store.create_time[slot]), slot))
+        return Baseline(pid, ts, members, cpu_rate, rss, window)
+
+    def result(self, baseline, exited=(), final=False):
+        """Impact of the action, or None while survivors lack enough new samples.
+
+        `exited` lists pids known to be gone (e.g. the one just terminated).
+        Members without new samples that no longer exist count as exited;
+        with `final`, the rest are measured on whatever samples they have.
+        """
+        store = self.store
+        exited = set(exited)
+        cpu_rate, rss, pending = 0.0, 0, []
+        with store.lock:
+            for pid, create_time, slot in baseline.members:
+                if pid in exited or store.index.get((pid, create_time)) != slot:
+                    continue  # gone: uses nothing any more
+                t, cpu_time, mem = self._window(slot, after_ts=baseline.ts)
+                if len(t) < self.after_samples:
+                    pending.append((pid, create_time, t, cpu_time, mem))
+                    continue
+                cpu_rate += self._rate(t, cpu_time)[0]
+                rss += int(mem[-1])
+        # a member without new samples may simply have exited; one stat() tells
+        pending = [m for m in pending if _still_running(m[0], m[1])]
+        if pending and not final:
+            return None
+        for pid, create_time, t, cpu_time, mem in pending:
+            cpu_rate += self._rate(t, cpu_time)[0]
+            rss += int(mem[-1]) if len(mem) else 0
+        return _impact(baseline, cpu_rate, rss, complete=not pending)
+
+    async def measure(self, baseline, exited=(), timeout=SETTLE_TIMEOUT, poll=POLL_INTERVAL):
+        """Await the impact without blocking the event loop.
+
+        Returns as soon as every surviving member has `after_samples` new
+        samples (immediately when the whole tree exited), or after `timeout`
+        with whatever was seen.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.refresh is not None:
+                self.refresh()
+            impact = self.result(baseline, exited)
+            if impact is not None:
+                return impact
+            if time.monotonic() >= deadline:
+                return self.result(baseline, exited, final=True)
+            await asyncio.sleep(poll)
+
+
+def _still_running(pid, create_time):
+    try:
+        return abs(psutil.Process(pid).create_time() - create_time) < 1.0
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        return True
+
+
+def _impact(baseline, cpu_rate, rss, complete):
+    # CPU the tree would have used over the baseline window, minus what it uses now
+    window = baseline.window
+    return {
+        "pids": [m[0] for m in baseline.members],
+        "cpu_rate_before": round(baseline.cpu_rate, 4),
+        "cpu_rate_after": round(cpu_rate, 4),
+        "window_s": round(window, 2),
+        "cpu_seconds_saved": round(max(0.0, baseline.cpu_rate - cpu_rate) * window, 3),
+        "rss_before": baseline.rss,
+        "rss_after": rss,
+        "bytes_freed": max(0, baseline.rss - rss),
+        "complete": complete,
+    }
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+from collections import Counter
+from logtail import LogFollower
+
+HEAL_MARKERS = ("Healing", "Terminated", "Attempting to heal", "✅", "Attempting")
+_PROC = re.compile(r'Process:\s*([\w\.\-]+)')
+_PROC_ANY_CASE = re.compile(r'process:\s*([\w\.\-]+)', re.IGNORECASE)
+_TIME = re.compile(r'\[(.*?)\]')
+
+
+def parse_line(ln):
+    """(offender, timestamp) for a healing line, None for any other line."""
+    if not any(k in ln for k in HEAL_MARKERS):
+        return None
+    m = _PROC.search(ln) or _PROC_ANY_CASE.search(ln)
+    t = _TIME.match(ln)
+    return (m.group(1) if m else None), (t.group(1) if t else None)
+
+
+def parse_lines(lines):
+    """healings, offenders, times over `lines` (the dashboard's original metrics)."""
+    healings, offenders, times = [], [], []
+    for ln in lines:
+        hit = parse_line(ln)
+        if hit is None:
+            continue
+        healings.append(ln)
+        if hit[0]:
+            offenders.append(hit[0])
+        if hit[1]:
+            times.append(hit[1])
+    return healings, offenders, times
+
+
+class LogAggregator:
+    """Running healing counts over events.log, updated from appended bytes only.
+
+    State (file identity, offset of the last parsed line, totals) is saved
+    to `checkpoint_path` after every update that changed it, so a restart
+    resumes where the last run stopped instead of rescanning the log. At
+    most `max_chunks` reads of READ_CHUNK bytes are parsed per update, which
+    bounds update latency however far behind the checkpoint is.
+    """
+
+    def __init__(self, log_path, checkpoint_path=None, max_chunks=4):
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path
+        self.max_chunks = max_chunks
+        self.total = 0
+        self.offenders = Counter()
+        self.last_time = None
+        self.follower = LogFollower(log_path)
+        self._load()
+
+    def _load(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                cp = json.load(f)
+            self.follower = LogFollower(self.log_path, offset=int(cp["offset"]),
+                                        file_id=tuple(cp["file_id"]) if cp.get("file_id") else None)
+            self.total = int(cp["total"])
+            self.offenders = Counter(cp.get("offenders", {}))
+            self.last_time = cp.get("last_time")
+        except (OSError, ValueError, KeyError, TypeError):
+            self.follower = LogFollower(self.log_path)  # unreadable checkpoint: rescan
+
+    def _save(self):
+        if not self.checkpoint_path:
+            return
+        cp = {
+            "file_id": list(self.follower.file_id) if self.follower.file_id else None,
+            "offset": self.follower.line_offset,
+            "total": self.total,
+            "offenders": dict(self.offenders),
+            "last_time": self.last_time,
+        }
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cp, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def update(self):
+        """Parse what was appended since the last call; returns True if counts changed."""
+        changed = False
+        for _ in range(self.max_chunks):
+            resumed = self.follower.file_id is not None
+            lines, reset = self.follower.poll()
+            if reset and resumed:
+                # rotated or truncated: counts describe the new file only
+                self.total, self.offenders, self.last_time = 0, Counter(), None
+                changed = True
+            if not lines:
+                break
+            for ln in lines:
+                hit = parse_line(ln)
+                if hit is None:
+                    continue
+                self.total += 1
+                if hit[0]:
+                    self.offenders[hit[0]] += 1
+                if hit[1]:
+                    self.last_time = hit[1]
+            changed = True
+        if changed:
+            self._save()
+        return changed
+
+    def top(self, n=5):
+        return self.offenders.most_common(n)
@@ -1,12 +1,27 @@
-from sqlalchemy import create_engine, Column, Integer, Float, String, Text, Table, MetaData
+from sqlalchemy import create_engine, event, select, func, cast, and_, or_, Column, Integer, Float, String, Text, Table, MetaData, Index
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
-import os
-from .utils import BASE_DIR, now_str
+import atexit, os, queue, threading, time
+from .utils import BASE_DIR, now_str, log_event as log_line
+from .metrics import DB_BATCH_SIZE, DB_ERRORS, DB_EVENTS_DROPPED, DB_EVENTS_WRITTEN, DB_WRITE_SECONDS
 
-DB_PATH = os.path.join(BASE_DIR, "shol_events.db")
+DB_PATH = os.environ.get("SHOL_DB_PATH") or os.path.join(BASE_DIR, "shol_events.db")
 engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
 metadata = MetaData()
 
+def enable_sqlite_wal(engine):
+    """WAL lets readers (the API) run while the writer commits; synchronous=NORMAL
+    fsyncs at checkpoints instead of on every commit."""
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.close()
+    return engine
+
+enable_sqlite_wal(engine)
+
 events = Table('events', metadata,
     Column('id', Integer, primary_key=True),
     Column('ts', Float),
@@ -15,15 +30,240 @@ events = Table('events', metadata,
     Column('proc_name', String),
     Column('issue', String),
     Column('detail', Text),
-    Column('action', String)
+    Column('action', String),
+    # keyset pagination walks (ts, id) newest first, optionally per process or issue
+    Index('ix_events_ts', 'ts'),
+    Index('ix_events_proc_ts', 'proc_name', 'ts'),
+    Index('ix_events_issue_ts', 'issue', 'ts'),
+)
+
+# rows older than RETENTION_DAYS are rolled up here, one row per hour/process/issue
+events_hourly = Table('events_hourly', metadata,
+    Column('hour', Float, primary_key=True),       # epoch seconds at the start of the hour
+    Column('proc_name', String, primary_key=True),
+    Column('issue', String, primary_key=True),
+    Column('count', Integer, nullable=False),
+    Column('first_ts', Float),
+    Column('last_ts', Float),
 )
 
 metadata.create_all(engine)
+# create_all skips indexes of tables that already exist
+for _ix in events.indexes:
+    _ix.create(engine, checkfirst=True)
 Session = sessionmaker(bind=engine)
 session = Session()
 
+FLUSH_SIZE = 500       # max rows per transaction
+FLUSH_LATENCY = 0.25   # max seconds an event waits in the queue before it is written
+MAX_QUEUE = 100000     # beyond this, new events are dropped (and counted) rather than blocking
+RETENTION_DAYS = 14    # raw events kept this long, then compacted into events_hourly
+COMPACT_INTERVAL = 3600
+
+def compact_events(retention_days=RETENTION_DAYS, now=None, conn=None):
+    """Roll events older than the retention window into hourly summaries.
+
+    Adds their counts to events_hourly (merging with earlier runs) and
+    deletes the raw rows, in one transaction. Returns the number of rows
+    compacted.
+    """
+    cutoff = (now or time.time()) - retention_days * 86400
+    if conn is None:
+        with engine.begin() as conn:
+            return compact_events(retention_days, now, conn)
+    hour = (cast(events.c.ts / 3600, Integer) * 3600).label('hour')
+    proc = func.coalesce(events.c.proc_name, '').label('proc_name')
+    issue = func.coalesce(events.c.issue, '').label('issue')
+    rows = conn.execute(
+        select(hour, proc, issue, func.count().label('count'),
+               func.min(events.c.ts).label('first_ts'), func.max(events.c.ts).label('last_ts'))
+        .where(events.c.ts < cutoff)
+        .group_by(hour, proc, issue)
+    ).mappings().all()
+    if not rows:
+        return 0
+    ins = sqlite_insert(events_hourly)
+    conn.execute(ins.on_conflict_do_update(
+        index_elements=['hour', 'proc_name', 'issue'],
+        set_=dict(count=events_hourly.c.count + ins.excluded.count,
+                  first_ts=func.min(events_hourly.c.first_ts, ins.excluded.first_ts),
+                  last_ts=func.max(events_hourly.c.last_ts, ins.excluded.last_ts)),
+    ), [dict(r) for r in rows])
+    conn.execute(events.delete().where(events.c.ts < cutoff))
+    return sum(r['count'] for r in rows)
+
+def query_events(limit=100, before_ts=None, before_id=None, proc_name=None, issue=None, conn=None):
+    """Newest-first page of events.
+
+    Keyset pagination: pass the (ts, id) of the last row of the previous page
+    as before_ts/before_id to get the next one. Each page is an index range
+    scan, so its cost does not grow with the size of the table.
+    """
+    q = select(events)
+    if proc_name:
+        q = q.where(events.c.proc_name == proc_name)
+    if issue:
+        q = q.where(events.c.issue == issue)
+    if before_ts is not None:
+        if before_id is not None:
+            q = q.where(or_(events.c.ts < before_ts, and_(events.c.ts == before_ts, events.c.id < before_id)))
+        else:
+            q = q.where(events.c.ts < before_ts)
+    q = q.order_by(events.c.ts.desc(), events.c.id.desc()).limit(limit)
+    if conn is None:
+        with engine.connect() as conn:
+            return [dict(r) for r in conn.execute(q).mappings()]
+    return [dict(r) for r in conn.execute(q).mappings()]
+
+def events_after(after_id, limit=500):
+    """Events with id > after_id, oldest first (for followers of the table)."""
+    q = select(events).where(events.c.id > after_id).order_by(events.c.id).limit(limit)
+    with engine.connect() as conn:
+        return [dict(r) for r in conn.execute(q).mappings()]
+
+def last_event_id():
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(events.c.id))).scalar() or 0
+
+def query_hourly(since=None, proc_name=None, issue=None, limit=1000):
+    """Hourly event counts from compacted history, newest first."""
+    q = select(events_hourly)
+    if since is not None:
+        q = q.where(events_hourly.c.hour >= since)
+    if proc_name:
+        q = q.where(events_hourly.c.proc_name == proc_name)
+    if issue:
+        q = q.where(events_hourly.c.issue == issue)
+    q = q.order_by(events_hourly.c.hour.desc()).limit(limit)
+    with engine.connect() as conn:
+        return [dict(r) for r in conn.execute(q).mappings()]
+
+_STOP = object()
+
+class EventWriter:
+    """Background thread that writes queued events in executemany batches.
+
+    put() never blocks the caller. A batch is committed when it reaches
+    `flush_size` rows or its oldest row is `flush_latency` seconds old.
+    Every `compact_interval` seconds the same thread runs compact_events(),
+    so retention never competes with inserts for the write lock.
+    """
+
+    def __init__(self, engine, flush_size=FLUSH_SIZE, flush_latency=FLUSH_LATENCY, max_queue=MAX_QUEUE,
+                 compact_interval=COMPACT_INTERVAL):
+        self.engine = engine
+        self.compact_interval = compact_interval
+        self._next_compact = time.monotonic()
+        self.flush_size = flush_size
+        self.flush_latency = flush_latency
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self.failed = 0    # rows of batches that could not be committed
+        self.written = 0
+        self.batches = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                    self._thread.start()
+
+    def put(self, row):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            DB_EVENTS_DROPPED.inc()
+
+    def _run(self):
+        q = self.queue
+        while True:
+            try:
+                first = q.get(timeout=max(0.0, self._next_compact - time.monotonic()) if self.compact_interval else None)
+            except queue.Empty:
+                self._compact()
+                continue
+            batch, stop = [], first is _STOP
+            if not stop:
+                batch.append(first)
+                deadline = time.monotonic() + self.flush_latency
+                while len(batch) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        row = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is _STOP:
+                        stop = True
+                        break
+                    batch.append(row)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                q.task_done()
+            if stop:
+                return
+            if self.compact_interval and time.monotonic() >= self._next_compact:
+                self._compact()
+
+    def _compact(self):
+        self._next_compact = time.monotonic() + self.compact_interval
+        try:
+            with self.engine.begin() as conn:
+                compact_events(conn=conn)
+        except Exception as e:
+            # the writer thread runs unattended: the file log still works when the DB doesn't
+            DB_ERRORS.inc(op="compact")
+            log_line(" Event compaction failed", str(e).splitlines()[0])
+
+    def _write(self, batch):
+        try:
+            t0 = time.perf_counter()
+            with self.engine.begin() as conn:
+                conn.execute(events.insert(), batch)
+            DB_WRITE_SECONDS.observe(time.perf_counter() - t0)
+            DB_BATCH_SIZE.observe(len(batch))
+            DB_EVENTS_WRITTEN.inc(len(batch))
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            DB_ERRORS.inc(op="write")
+            log_line(" Event write failed", f"{len(batch)} events lost -> {str(e).splitlines()[0]}")
+
+    def flush(self):
+        """Block until everything queued so far is committed."""
+        if self._thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread (registered with atexit)."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
+
+writer = EventWriter(engine)
+atexit.register(writer.close)
+
+DRY_RUN_DB_PATH = os.path.join(BASE_DIR, "shol_dry_run.db")
+
+def use_dry_run_database():
+    """Send this process's log_event() rows to shol_dry_run.db (unless
+    SHOL_DB_PATH chose a database), keeping dry runs out of the events table."""
+    global writer
+    if os.environ.get("SHOL_DB_PATH"):
+        return
+    dry = enable_sqlite_wal(create_engine(f"sqlite:///{DRY_RUN_DB_PATH}", connect_args={"check_same_thread": False}))
+    metadata.create_all(dry)
+    writer.close()
+    writer = EventWriter(dry)
+    atexit.register(writer.close)
+
 def log_event(pid, proc_name, issue, detail="", action=""):
-    ins = events.insert().values(ts=__import__('time').time(), timestr=now_str(), pid=pid, proc_name=proc_name, issue=issue, detail=detail, action=action)
-    conn = engine.connect()
-    conn.execute(ins)
-    conn.close()
+    # queued; the writer thread commits it within FLUSH_LATENCY seconds
+    writer.put(dict(ts=time.time(), timestr=now_str(), pid=pid, proc_name=proc_name, issue=issue, detail=detail, action=action))
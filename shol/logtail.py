@@ -0,0 +1,71 @@
+import os
+
+READ_CHUNK = 1 << 20   # max bytes consumed per poll, keeps one poll short after a long pause
+
+
+class LogFollower:
+    """Incremental `tail -F` for a text log.
+
+    Remembers the byte offset of the last complete line it returned and
+    reads only what was appended since. Rotation (a new inode at the same
+    path) and truncation (the file shrank below the offset) restart from the
+    beginning of the new content and are reported as a reset.
+    """
+
+    def __init__(self, path, backlog_bytes=None, offset=0, file_id=None):
+        # backlog_bytes: on first poll start this many bytes before EOF
+        # (None = from `offset`), so a huge log isn't replayed on startup
+        self.path = path
+        self.backlog_bytes = backlog_bytes
+        self.offset = offset
+        self.file_id = file_id     # (st_dev, st_ino) of the file being followed
+        self._partial = b""
+
+    def _reset(self, file_id, offset):
+        self.file_id = file_id
+        self.offset = offset
+        self._partial = b""
+
+    def poll(self):
+        """Return (new complete lines, reset) since the previous poll.
+
+        `reset` is True when the caller should discard what it has shown
+        (first poll, rotation or truncation).
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+        file_id = (st.st_dev, st.st_ino)
+        reset = False
+        if self.file_id is None:
+            start = self.offset if self.offset <= st.st_size else 0
+            if self.backlog_bytes is not None:
+                start = max(0, st.st_size - self.backlog_bytes)
+            self._reset(file_id, start)
+            reset = True
+        elif file_id != self.file_id or st.st_size < self.offset:
+            self._reset(file_id, 0)   # rotated or truncated
+            reset = True
+        if st.st_size == self.offset:
+            return [], reset
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(READ_CHUNK)
+            if reset and self.offset > 0:
+                # started mid-file: drop the partial first line
+                nl = data.find(b"\n")
+                data = data[nl + 1:] if nl >= 0 else b""
+                self.offset = f.tell() - len(data)
+        self.offset += len(data)
+        data = self._partial + data
+        cut = data.rfind(b"\n") + 1
+        self._partial = data[cut:]
+        lines = data[:cut].decode("utf-8", errors="ignore").splitlines(keepends=True)
+        return lines, reset
+
+    @property
+    def line_offset(self):
+        """Offset just past the last complete line returned (safe to checkpoint)."""
+        return self.offset - len(self._partial)
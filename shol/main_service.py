@@ -1,30 +1,77 @@
 from .monitor import ProcessHistory
 from .detector import Detector
-from .healer import restart_proc
-from .logger_db import log_event
+from .healer import heal_process, load_whitelist
+from .logger_db import log_event, use_dry_run_database
 from .notifier import notify
-import time
+from .sources import open_source
+# the registry monitor, detector and scheduler record into (shol/ is on sys.path)
+from metrics import start_publisher
+from .scheduler import SLOW_INTERVAL, AdaptiveScheduler
+from .detector import HIGH_CPU_PERCENT, HIGH_MEM_PERCENT
+import argparse
+import psutil
 
-POLL_INTERVAL = 3
+def restart_proc(proc_info):
+    """Heal a flagged process with the healer's soft-then-hard recovery (which
+    also restarts it when it is in healer.RESTART_MAP).
 
-def run_forever():
-    ph = ProcessHistory()
+    Returns the recovery that worked, or None.
+    """
+    try:
+        proc = psutil.Process(proc_info['pid'])
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+    return heal_process(proc, load_whitelist())
+
+def run_forever(source=None, dry_run=False):
+    # any source but the live host is simulated or recorded: never restart from it
+    ph = ProcessHistory(source=source)
+    dry_run = dry_run or not ph.source.live
+    if dry_run:
+        use_dry_run_database()
     det = Detector(ph)
+    # full scans every SLOW_INTERVAL, processes near a threshold or trending up
+    # in between; recorded/simulated sources scan every frame (the source
+    # paces them, see sources.SIM_SPEEDUP)
+    sched = AdaptiveScheduler(slow=SLOW_INTERVAL if ph.source.live else 0.0,
+                              cpu_threshold=HIGH_CPU_PERCENT, mem_threshold=HIGH_MEM_PERCENT)
+    start_publisher("main_service")
+    # (pid, issue) pairs firing as of the last poll; hot polls run every
+    # second, so only new issues are acted on between full scans
+    firing = set()
     while True:
-        ph.sample()
+        try:
+            kind = sched.poll(ph)
+        except EOFError:
+            return  # replay finished
+        if kind is None:
+            sched.wait()
+            continue
         issues = det.detect_all()
+        seen, firing = firing, {(pid, issue_type) for pid, issue_type, _ in issues}
         for pid, issue_type, proc_info in issues:
+            if kind != "scan" and (pid, issue_type) in seen:
+                continue
             # basic policy: only restart if mapped and auto_restart true
             # but log every issue
             log_event(pid, proc_info.get('name') or proc_info.get('cmdline_str'), issue_type, detail=str(proc_info))
             # try restart for certain issue types
             if issue_type in ('unresponsive','high_memory'):
-                restarted = restart_proc(proc_info)
-                if restarted:
-                    log_event(pid, proc_info.get('name') or proc_info.get('cmdline_str'), 'action', detail='restarted')
+                if dry_run:
+                    log_event(pid, proc_info.get('name') or proc_info.get('cmdline_str'), 'action', detail='dry-run: would restart')
+                    continue
+                recovery = restart_proc(proc_info)
+                if recovery:
+                    log_event(pid, proc_info.get('name') or proc_info.get('cmdline_str'), 'action', detail=recovery)
         # cleanup
-        ph.cleanup_dead()
-        time.sleep(POLL_INTERVAL)
+        if kind == "scan":
+            ph.cleanup_dead()
+        sched.wait()
 
 if __name__ == "__main__":
-    run_forever()
+    parser = argparse.ArgumentParser(description="SHOL detection service")
+    parser.add_argument("--source", default="live",
+                        help="live | synthetic[:N] | replay:PATH | replay-loop:PATH | record:PATH")
+    parser.add_argument("--dry-run", action="store_true", help="log restarts instead of performing them")
+    args = parser.parse_args()
+    run_forever(open_source(args.source), args.dry_run)
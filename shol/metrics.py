@@ -0,0 +1,254 @@
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import psutil
+
+# Low-overhead self-instrumentation. Each SHOL process updates its own
+# registry; services publish it to data/metrics/ and api_server serves them
+# all, in Prometheus text format, from /metrics.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+METRICS_DIR = BASE_DIR / "data" / "metrics"
+PUBLISH_INTERVAL = 10.0   # seconds between a service's metric files
+STALE_AFTER = 3 * PUBLISH_INTERVAL   # files older than this belong to a stopped service
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HEAL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0)
+BATCH_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+
+
+class Metric:
+    """One metric family; a series per distinct set of label values."""
+
+    kind = None
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.series = {}   # sorted label items tuple -> value
+        self.lock = threading.Lock()
+
+    def state(self):
+        with self.lock:
+            return {"type": self.kind, "help": self.help,
+                    "series": [[dict(k), self._dump(v)] for k, v in self.series.items()]}
+
+    @staticmethod
+    def _dump(value):
+        return value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def set(self, total, **labels):
+        """For counters mirrored from a cumulative value kept elsewhere (e.g. the OS)."""
+        self.series[tuple(sorted(labels.items()))] = total
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.series[tuple(sorted(labels.items()))] = value
+
+
+class Histogram(Metric):
+    """Fixed buckets; observe() is a bisect and two additions under a lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            h = self.series.get(key)
+            if h is None:
+                h = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def state(self):
+        out = super().state()
+        out["buckets"] = list(self.buckets)
+        return out
+
+    @staticmethod
+    def _dump(value):
+        return {"counts": list(value[0]), "sum": value[1]}
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help, *args):
+        with self.lock:
+            m = self.metrics.get(name)
+            if m is None:
+                m = self.metrics[name] = cls(name, help, *args)
+            return m
+
+    def counter(self, name, help):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def state(self):
+        update_process_metrics()
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {m.name: m.state() for m in metrics}
+
+
+# scripts in shol/ import this as `metrics`, package code as `shol.metrics`;
+# both names must share one registry within a process
+_twin = sys.modules.get("shol.metrics" if __name__ == "metrics" else "metrics")
+REGISTRY = getattr(_twin, "REGISTRY", None) or Registry()
+
+# --- SHOL's own metric families ---
+SAMPLE_SECONDS = REGISTRY.histogram("shol_sample_duration_seconds", "Time to take one process-table sample.")
+PROCESSES_SCANNED = REGISTRY.gauge("shol_processes_scanned", "Processes in the latest sample.")
+DETECT_SECONDS = REGISTRY.histogram("shol_detector_duration_seconds", "Time of one detector rule pass.")
+HEAL_SECONDS = REGISTRY.histogram("shol_heal_duration_seconds",
+                                  "Time from the start of a heal to its successful recovery action.", HEAL_BUCKETS)
+DB_WRITE_SECONDS = REGISTRY.histogram("shol_db_write_duration_seconds", "Time to commit one batch of events.")
+DB_BATCH_SIZE = REGISTRY.histogram("shol_db_batch_size", "Events per committed batch.", BATCH_BUCKETS)
+DB_EVENTS_WRITTEN = REGISTRY.counter("shol_db_events_written_total", "Events committed to the events table.")
+DB_EVENTS_DROPPED = REGISTRY.counter("shol_db_events_dropped_total", "Events dropped because the write queue was full.")
+DB_ERRORS = REGISTRY.counter("shol_db_errors_total", "Failed event batch writes (op=write) and compactions (op=compact).")
+LOG_BYTES = REGISTRY.counter("shol_log_bytes_written_total", "Bytes appended to logs/events.log.")
+PROCESS_RSS = REGISTRY.gauge("shol_process_resident_memory_bytes", "Resident memory of this SHOL process.")
+PROCESS_CPU = REGISTRY.counter("shol_process_cpu_seconds_total", "User and system CPU time of this SHOL process.")
+
+_self = None
+
+
+def update_process_metrics():
+    """Refresh this process's own RSS and CPU time (done on every export)."""
+    global _self
+    if _self is None:
+        _self = psutil.Process()
+    try:
+        with _self.oneshot():
+            cpu = _self.cpu_times()
+            PROCESS_RSS.set(_self.memory_info().rss)
+            PROCESS_CPU.set(round(cpu.user + cpu.system, 3))
+    except psutil.Error:
+        pass
+
+
+# --- export ---
+def publish(service, path=METRICS_DIR):
+    """Write this process's metrics to <path>/<service>.json for the API to serve."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f".{service}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"service": service, "pid": os.getpid(), "ts": time.time(), "metrics": REGISTRY.state()}, f)
+    os.replace(tmp, path / f"{service}.json")
+
+
+def start_publisher(service, interval=PUBLISH_INTERVAL, path=METRICS_DIR):
+    """Publish every `interval` seconds from a daemon thread."""
+    def run():
+        while True:
+            try:
+                publish(service, path)
+            except OSError:
+                pass  # next round retries; metrics must never break the service
+            time.sleep(interval)
+    thread = threading.Thread(target=run, name="metrics-publisher", daemon=True)
+    thread.start()
+    return thread
+
+
+def collect(own_service, path=METRICS_DIR, now=None):
+    """{service: state} for this process plus every recently published service."""
+    now = time.time() if now is None else now
+    states = {own_service: REGISTRY.state()}
+    for f in sorted(Path(path).glob("*.json")) if Path(path).is_dir() else ():
+        try:
+            doc = json.loads(f.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if doc.get("service") != own_service and now - doc.get("ts", 0) <= STALE_AFTER:
+            states[doc["service"]] = doc["metrics"]
+    return states
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render(states):
+    """Prometheus text exposition (format 0.0.4); each series gets a `service` label."""
+    families = {}
+    for service, state in states.items():
+        for name, m in state.items():
+            families.setdefault(name, (m, []))[1].append((service, m))
+    lines = []
+    for name in sorted(families):
+        first, parts = families[name]
+        lines.append(f"# HELP {name} {first['help']}")
+        lines.append(f"# TYPE {name} {first['type']}")
+        for service, m in parts:
+            for labels, value in m["series"]:
+                labels = {"service": service, **labels}
+                if m["type"] != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {_num(value)}")
+                    continue
+                running = 0
+                for bound, count in zip(m["buckets"] + ["+Inf"], value["counts"]):
+                    running += count
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {running}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(value['sum'])}")
+                lines.append(f"{name}_count{_labels(labels)} {running}")
+    return "\n".join(lines) + "\n"
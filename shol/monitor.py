@@ -1,44 +1,73 @@
 import psutil, time, os, datetime, subprocess
-from collections import deque, defaultdict
-from utils import ts
+from history import ColumnarHistory, HistoryView
+from proctree import ProcessTree
+from sources import LiveSource
+from metrics import PROCESSES_SCANNED, SAMPLE_SECONDS
+from watchdog import CrashWatcher
+from readiness import notify_ready
 # keep short history per pid
 HISTORY_LEN = 60   # samples (~60 * poll interval)
 
 class ProcessHistory:
-    def __init__(self):
-        # pid -> deque of dict snapshots
-        self.hist = defaultdict(lambda: deque(maxlen=HISTORY_LEN))
+    def __init__(self, shared=True, source=None):
+        # columnar ring buffer: one row per (pid, create_time), one column per sample
+        self.store = ColumnarHistory(HISTORY_LEN)
+        # parent/child index and subtree rollups, maintained as samples arrive
+        self.tree = ProcessTree(self.store)
+        # live host by default (sampler_service's shared snapshots, else a local
+        # scan); sources.py also has recorded, replayed and synthetic sources
+        self.source = source or LiveSource(shared=shared)
+        self.last = None
+
+    @property
+    def hist(self):
+        # pid -> list of sample dicts (materialized lazily, kept for old callers)
+        return HistoryView(self.store)
+
+    def _append(self, snap):
+        store = self.store
+        with store.lock:
+            slots = [store.slot_for(pid, ct, name, cmdline)
+                     for pid, ct, name, cmdline in zip(snap.pid.tolist(), snap.create_time.tolist(), snap.names, snap.cmdlines)]
+            store.append_many(slots, snap.ts, snap.cpu, snap.mem, snap.status,
+                              snap.cpu_time, snap.rss, snap.ppid)
 
     def sample(self):
-        snapshot_time = ts()
-        for p in psutil.process_iter(['pid','name','cmdline','cpu_percent','memory_percent','status']):
-            try:
-                info = p.info
-                info['sample_ts'] = snapshot_time
-                # normalize cmdline to string
-                info['cmdline_str'] = " ".join(info.get('cmdline') or [])
-                self.hist[info['pid']].append(info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                # process died or permission
-                continue
+        t0 = time.perf_counter()
+        snap = self.source.sample()
+        if snap is self.last:
+            return snap  # nothing new published since the last call
+        self._append(snap)
+        self.last = snap
+        SAMPLE_SECONDS.observe(time.perf_counter() - t0, scope="full")
+        PROCESSES_SCANNED.set(len(snap))
+        return snap
+
+    def sample_pids(self, pids):
+        """Append a sample for just `pids` (hot processes between full scans).
+
+        Returns the partial snapshot, or None if the source can't sample
+        single processes. `last` keeps pointing at the latest full snapshot.
+        """
+        t0 = time.perf_counter()
+        snap = self.source.sample_pids(pids)
+        if snap is None or len(snap) == 0:
+            return snap
+        self._append(snap)
+        SAMPLE_SECONDS.observe(time.perf_counter() - t0, scope="hot")
+        return snap
 
     def get_latest(self, pid):
-        h = self.hist.get(pid)
-        return h[-1] if h else None
+        slot = self.store.pid_slot.get(pid)
+        return self.store.latest(slot) if slot is not None else None
 
     def get_all_latest(self):
-        results = []
-        for pid, dq in self.hist.items():
-            if dq:
-                results.append(dq[-1])
-        return results
+        return self.store.latest_all()
 
     def cleanup_dead(self):
-        # remove pids not present in current system
-        current_pids = set(p.pid for p in psutil.process_iter())
-        for pid in list(self.hist.keys()):
-            if pid not in current_pids:
-                del self.hist[pid]
+        # remove pids not present in current system (the last scan saw them all)
+        with self.store.lock:
+            self.store.retain(self.last.pid.tolist() if self.last is not None else psutil.pids())
 
 
 # --- 1️⃣ Create log folder and file path ---
@@ -57,11 +86,13 @@ def log_event(process_name, cause="Unknown"):
 # --- 3️⃣ Function to restart crashed processes ---
 def restart_process(exe_path, process_name, cause="Unknown"):
     try:
-        subprocess.Popen(exe_path)   # Launch the process again
+        proc = subprocess.Popen(exe_path)   # Launch the process again
         log_event(process_name, cause)
         print(f"✅ Restarted {process_name}")
+        return proc
     except Exception as e:
         print(f"❌ Failed to restart {process_name}: {e}")
+        return None
 
 
 # --- 4️⃣ Core monitoring loop (sample demo) ---
@@ -69,13 +100,11 @@ def monitor_system():
     watched_processes = {
         "notepad.exe": r"C:\Windows\System32\notepad.exe",  # Example
     }
-
-    while True:
-        for pname, path in watched_processes.items():
-            running = any(p.info['name'].lower() == pname.lower() for p in psutil.process_iter(['name']))
-            if not running:
-                restart_process(path, pname, cause="Process not found / crashed")
-        time.sleep(5)  # check every 5 seconds
+    # event-driven: restarts as soon as a watched process exits, no periodic scans
+    watcher = CrashWatcher(watched_processes, restart_process)
+    watcher.start()
+    notify_ready()
+    watcher.exits.run()
 
 
 def check_process(proc):
@@ -1,41 +1,28 @@
-import json
-import os
 import time
 import psutil
-from collections import deque
-
-WHITELIST_FILE = os.path.join(os.path.dirname(__file__), "whitelist.json")
-OPTIMIZATION_LOG = deque(maxlen=10)  # Store last 10 optimizations
+from optimization_store import default_store
+from whitelist import whitelist as shared_whitelist
 
 # ------------------ Whitelist Management ------------------
+# same compiled matcher and file (data/whitelist.json) as healer and dashboard
 
-whitelist = set()
+whitelist = shared_whitelist()
 
 def load_whitelist():
     global whitelist
-    if os.path.exists(WHITELIST_FILE):
-        with open(WHITELIST_FILE, "r") as f:
-            try:
-                whitelist = set(json.load(f))
-            except:
-                whitelist = set()
-    else:
-        whitelist = set()
+    whitelist = shared_whitelist()  # re-reads only if the file changed
 
 def save_whitelist():
-    with open(WHITELIST_FILE, "w") as f:
-        json.dump(list(whitelist), f, indent=2)
+    whitelist.save(whitelist.entries)
 
 def add_to_whitelist(process_name: str):
     whitelist.add(process_name)
-    save_whitelist()
 
 def remove_from_whitelist(process_name: str):
-    whitelist.discard(process_name)
-    save_whitelist()
+    whitelist.remove(process_name)
 
 def is_whitelisted(process_name: str) -> bool:
-    return process_name in whitelist
+    return shared_whitelist().matches(process_name)
 
 # ------------------ Optimization Tracking ------------------
 
@@ -49,18 +36,18 @@ def record_optimization(proc_name, cpu_before, mem_before):
         mem_gain = max(0, mem_before - mem_after)
         gain = round((cpu_gain * 0.6 + mem_gain * 0.4), 2)
 
-        OPTIMIZATION_LOG.append({
+        default_store().append({
+            "timestamp": time.time(),
             "process": proc_name,
             "cpu_gain": cpu_gain,
             "mem_gain": mem_gain,
-            "optimization": gain,
-            "timestamp": time.strftime("%H:%M:%S")
+            "optimization_score": gain
         })
         return gain
 
     except Exception:
         return 0.0
 
-def get_recent_optimizations():
+def get_recent_optimizations(n=10):
     """Return the last few optimization records."""
-    return list(OPTIMIZATION_LOG)
+    return default_store().last(n)
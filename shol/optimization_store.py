@@ -0,0 +1,157 @@
+import json
+import os
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_DIR = BASE_DIR / "data" / "optimizations"
+# older per-service files, imported once into an empty store
+LEGACY_FILES = (BASE_DIR / "optimization_data.json", BASE_DIR / "data" / "optimization_log.json")
+LEGACY_MARKER = ".legacy-import"   # in the store directory; created by the one process that imports
+
+SEGMENT_BYTES = 1 << 20   # start a new segment file past this size
+MAX_SEGMENTS = 16         # oldest segments beyond this are deleted
+_TAIL_BLOCK = 8192
+
+
+class OptimizationStore:
+    """Append-only store of heal/optimization records (JSON lines).
+
+    Records live in numbered segment files. append() is one O_APPEND write
+    of one complete line, so concurrent writers in different processes never
+    interleave and readers never need a lock; it does not read or rewrite
+    existing data. last(n) reads backwards from the end of the newest
+    segment, so its cost depends on n, not on how much history is stored.
+    """
+
+    def __init__(self, path=STORE_DIR, segment_bytes=SEGMENT_BYTES, max_segments=MAX_SEGMENTS):
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _segments(self):
+        """Segment paths, oldest first."""
+        return sorted(self.path.glob("seg-*.jsonl"))
+
+    def _segment_name(self, n):
+        return self.path / f"seg-{n:06d}.jsonl"
+
+    def _active_segment(self):
+        segs = self._segments()
+        if not segs:
+            return self._segment_name(1)
+        last = segs[-1]
+        try:
+            if last.stat().st_size < self.segment_bytes:
+                return last
+        except FileNotFoundError:
+            return last
+        nxt = self._segment_name(int(last.stem.split("-")[1]) + 1)
+        for old in segs[:max(0, len(segs) + 1 - self.max_segments)]:
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass  # another writer rotated first
+        return nxt
+
+    def append(self, record):
+        """Atomically append one record (a dict); adds `timestamp` if missing."""
+        record.setdefault("timestamp", time.time())
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(self._active_segment(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def last(self, n=10):
+        """The newest `n` records, oldest first."""
+        out = []
+        for seg in reversed(self._segments()):
+            try:
+                lines = self._tail_lines(seg, n - len(out))
+            except FileNotFoundError:
+                continue
+            out[:0] = lines
+            if len(out) >= n:
+                break
+        return out[-n:] if n else []
+
+    def _tail_lines(self, seg, n):
+        records = []
+        with open(seg, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            buf = b""
+            while pos > 0 and buf.count(b"\n") <= n:
+                step = min(_TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+        lines = buf.split(b"\n")
+        if pos > 0:
+            lines = lines[1:]  # first piece may be a partial line
+        for raw in reversed(lines):
+            if len(records) >= n:
+                break
+            if not raw.strip():
+                continue
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                continue  # torn line from a crashed writer
+        records.reverse()
+        return records
+
+    def version(self):
+        """Cheap change token: differs whenever a record was appended."""
+        segs = self._segments()
+        if not segs:
+            return None
+        try:
+            st = segs[-1].stat()
+        except FileNotFoundError:
+            return None
+        return (segs[-1].name, st.st_size, st.st_mtime_ns)
+
+    def import_legacy(self, paths=LEGACY_FILES):
+        """Seed an empty store from the old JSON array files.
+
+        Runs once per store: services start in parallel, so only the process
+        that creates the marker file (O_EXCL) imports, and it re-checks that
+        the store is still empty first.
+        """
+        try:
+            fd = os.open(self.path / LEGACY_MARKER, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return 0
+        os.close(fd)
+        if self._segments():
+            return 0
+        records = []
+        for p in paths:
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            records.extend(r for r in data if isinstance(r, dict))
+        records.sort(key=lambda r: r.get("timestamp") if isinstance(r.get("timestamp"), (int, float)) else 0)
+        self.extend(records)
+        return len(records)
+
+
+_default = None
+
+def default_store():
+    """Process-wide store at data/optimizations, migrating legacy files once."""
+    global _default
+    if _default is None:
+        _default = OptimizationStore()
+        _default.import_legacy()
+    return _default
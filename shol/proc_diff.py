@@ -0,0 +1,62 @@
+DEFAULT_EPSILON = 0.5   # percentage points of cpu/mem below which a change is not sent
+
+
+def stream_row(p):
+    """Compact client row for one sample dict (same fields as the index page)."""
+    return {
+        "pid": p["pid"],
+        "name": p.get("name"),
+        "cmdline": p.get("cmdline_str"),
+        "cpu": round(p.get("cpu_percent") or 0.0, 2),
+        "mem": round(p.get("memory_percent") or 0.0, 2),
+        "status": p.get("status"),
+    }
+
+
+class ProcessDiff:
+    """Tracks what one client has been sent and computes compact deltas.
+
+    cpu/mem are compared against the value last *sent*, not the previous
+    tick, so slow drift below `epsilon` per tick is still delivered once it
+    adds up. Other fields are sent whenever they differ.
+    """
+
+    def __init__(self, epsilon=DEFAULT_EPSILON):
+        self.epsilon = epsilon
+        self.sent = {}   # pid -> row as the client has it
+
+    def full(self, procs):
+        """Reset to `procs` and return every row (initial snapshot)."""
+        rows = [stream_row(p) for p in procs]
+        self.sent = {r["pid"]: r for r in rows}
+        return rows
+
+    def diff(self, procs):
+        """{"added": [rows], "removed": [pids], "changed": [partial rows]}."""
+        eps = self.epsilon
+        sent = self.sent
+        added, changed = [], []
+        seen = set()
+        for p in procs:
+            pid = p["pid"]
+            seen.add(pid)
+            old = sent.get(pid)
+            row = stream_row(p)
+            if old is None:
+                added.append(row)
+                sent[pid] = row
+                continue
+            delta = {}
+            for k in ("cpu", "mem"):
+                if abs(row[k] - old[k]) > eps:
+                    delta[k] = old[k] = row[k]
+            for k in ("name", "cmdline", "status"):
+                if row[k] != old[k]:
+                    delta[k] = old[k] = row[k]
+            if delta:
+                delta["pid"] = pid
+                changed.append(delta)
+        removed = [pid for pid in sent if pid not in seen]
+        for pid in removed:
+            del sent[pid]
+        return {"added": added, "removed": removed, "changed": changed}
@@ -0,0 +1,178 @@
+import numpy as np
+
+MAX_DEPTH = 256   # guards the rollup against a parent cycle in bad input
+
+
+class ProcessTree:
+    """Parent/child index over the slots of a ColumnarHistory.
+
+    Kept up to date from the history's own events: each appended batch
+    relinks only the rows that are new or whose ppid changed, and a freed
+    slot is unlinked (its children become roots until a later sample shows
+    their new parent). A parent must be at least as old as its child, so a
+    recycled parent pid never adopts someone else's children.
+
+    Subtree rollups (latest cpu% and mem% summed over each process and all
+    its descendants, plus the subtree size) are rebuilt at most once per
+    appended batch, in one vectorized pass per tree level; after that,
+    `rollup()` is an O(1) lookup and `subtree_slots()` costs only the size
+    of the subtree. Readers in other threads hold `store.lock`.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.parent = np.full(0, -1, np.int64)    # slot -> parent slot, -1 for roots
+        self.linked_ppid = np.full(0, -1, np.int64)  # ppid each slot was linked with, -1 = unlinked
+        self.children = []                          # slot -> set of child slots
+        self.waiting = {}                           # ppid without a slot yet -> {child slots}
+        self.version = 0                            # bumped on every structural change
+        self._rollup_key = None
+        self._ensure_capacity()
+        store.subscribe(self._on_append)
+        store.subscribe_release(self._on_release)
+        slots = store.active_slots()
+        if slots.size:
+            self._link(slots, store.ppid[slots])
+
+    def _ensure_capacity(self):
+        cap = self.store.capacity
+        old = len(self.parent)
+        if old < cap:
+            self.parent = np.concatenate([self.parent, np.full(cap - old, -1, np.int64)])
+            self.linked_ppid = np.concatenate([self.linked_ppid, np.full(cap - old, -1, np.int64)])
+            self.children.extend(set() for _ in range(cap - old))
+
+    # ---------------- maintenance ----------------
+    def _on_append(self, store, slots, cols, values):
+        self._ensure_capacity()
+        ppid = values.get("ppid")
+        if ppid is None:
+            return
+        moved = self.linked_ppid[slots] != ppid
+        if moved.any():
+            self._link(slots[moved], ppid[moved])
+
+    def _link(self, slots, ppids):
+        store = self.store
+        for slot, ppid in zip(slots.tolist(), ppids.tolist()):
+            self._detach(slot)
+            self.linked_ppid[slot] = ppid
+            pid = int(store.pid[slot])
+            # children that were waiting for this pid to show up
+            for child in self.waiting.pop(pid, ()):
+                if self.linked_ppid[child] == pid and self.parent[child] < 0 and self._older(slot, child):
+                    self.parent[child] = slot
+                    self.children[slot].add(child)
+            parent = store.pid_slot.get(ppid) if ppid != pid else None
+            if parent is not None and parent != slot and self._older(parent, slot):
+                self.parent[slot] = parent
+                self.children[parent].add(slot)
+            elif ppid > 0 and ppid != pid and parent is None:
+                self.waiting.setdefault(ppid, set()).add(slot)
+        self.version += 1
+
+    def _older(self, parent, child):
+        return self.store.create_time[parent] <= self.store.create_time[child]
+
+    def _detach(self, slot):
+        parent = self.parent[slot]
+        if parent >= 0:
+            self.children[parent].discard(slot)
+            self.parent[slot] = -1
+        else:
+            waiting = self.waiting.get(int(self.linked_ppid[slot]))
+            if waiting is not None:
+                waiting.discard(slot)
+
+    def _on_release(self, store, slot):
+        if slot >= len(self.parent):
+            return
+        self._detach(slot)
+        for child in self.children[slot]:
+            self.parent[child] = -1  # orphaned: relinked when its new ppid is sampled
+            self.linked_ppid[child] = -1
+        self.children[slot] = set()
+        self.linked_ppid[slot] = -1
+        self.version += 1
+
+    # ---------------- queries ----------------
+    def subtree_slots(self, slot):
+        """`slot` and all its descendants, root first."""
+        out, stack = [], [slot]
+        while stack:
+            s = stack.pop()
+            out.append(s)
+            stack.extend(self.children[s])
+        return out
+
+    def subtree_pids(self, pid):
+        """Pids of `pid`'s process tree (root first); [] if the pid is unknown."""
+        slot = self.store.pid_slot.get(pid)
+        if slot is None:
+            return []
+        return [int(self.store.pid[s]) for s in self.subtree_slots(slot)]
+
+    def family_root(self, slot):
+        """Topmost ancestor of `slot` running the same program (e.g. the first chrome.exe)."""
+        names = self.store.names
+        while self.parent[slot] >= 0 and names[self.parent[slot]] == names[slot]:
+            slot = int(self.parent[slot])
+        return slot
+
+    def _rollups(self):
+        key = (self.store.seq, self.version)
+        if self._rollup_key == key:
+            return self._rolled
+        store = self.store
+        self._ensure_capacity()
+        cap = store.capacity
+        slots = store.active_slots()
+        last = store.last_cols(slots)
+        cpu, mem, size = np.zeros(cap), np.zeros(cap), np.zeros(cap, np.int64)
+        cpu[slots] = store.cpu[slots, last]
+        mem[slots] = store.mem[slots, last]
+        size[slots] = 1
+        # depth of every slot by pointer jumping, then fold levels bottom-up
+        parent = self.parent[:cap]
+        depth = np.zeros(len(slots), np.int64)
+        up = parent[slots]
+        for _ in range(MAX_DEPTH):
+            has = up >= 0
+            if not has.any():
+                break
+            depth += has
+            up = np.where(has, parent[np.maximum(up, 0)], -1)
+        for d in range(int(depth.max()) if len(depth) else 0, 0, -1):
+            level = slots[depth == d]
+            for arr in (cpu, mem, size):
+                np.add.at(arr, parent[level], arr[level])
+        self._rolled = (cpu, mem, size)
+        self._rollup_key = key
+        return self._rolled
+
+    def rollup(self, slot):
+        """{"size", "cpu", "mem"} of the subtree rooted at `slot`."""
+        cpu, mem, size = self._rollups()
+        return {"size": int(size[slot]), "cpu": float(cpu[slot]), "mem": float(mem[slot])}
+
+    def family_roots(self):
+        """Slots that start a same-program family with more than one member."""
+        names = self.store.names
+        out = []
+        for slot in np.flatnonzero(self._rollups()[2] > 1).tolist():
+            parent = self.parent[slot]
+            if parent >= 0 and names[parent] == names[slot]:
+                continue  # inside a family, not its root
+            if any(names[c] == names[slot] for c in self.children[slot]):
+                out.append(slot)
+        return out
+
+    def heavy_families(self, cpu=None, mem=None):
+        """[(root slot, rollup)] for families whose subtree cpu% or mem% exceeds the limit."""
+        cpu_sum, mem_sum, size = self._rollups()
+        out = []
+        for slot in self.family_roots():
+            if (cpu is not None and cpu_sum[slot] > cpu) or (mem is not None and mem_sum[slot] > mem):
+                out.append((slot, {"size": int(size[slot]), "cpu": float(cpu_sum[slot]),
+                                   "mem": float(mem_sum[slot])}))
+        return out
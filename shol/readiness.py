@@ -0,0 +1,27 @@
+import os
+import socket
+
+# Service side of the supervisor's readiness handshake (supervisor.py). A
+# supervised service gets SHOL_READY=<host:port> and a per-launch token in
+# its environment and calls notify_ready() once it can do useful work, e.g.
+# the sampler after publishing its first snapshot. Without a supervisor
+# (script started by hand) notify_ready() does nothing.
+
+READY_ENV = "SHOL_READY"
+TOKEN_ENV = "SHOL_READY_TOKEN"
+CONNECT_TIMEOUT = 2.0
+
+
+def notify_ready():
+    """Tell the supervisor this service is up; True if it was told. Safe to call repeatedly."""
+    addr = os.environ.pop(READY_ENV, None)  # once only, and not inherited by our own children
+    token = os.environ.pop(TOKEN_ENV, "")
+    if not addr:
+        return False
+    host, _, port = addr.rpartition(":")
+    try:
+        with socket.create_connection((host, int(port)), CONNECT_TIMEOUT) as s:
+            s.sendall(f"READY {token}\n".encode("ascii"))
+    except (OSError, ValueError):
+        return False
+    return True
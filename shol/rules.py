@@ -0,0 +1,119 @@
+import operator
+import numpy as np
+from history import status_code
+
+OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class Rule:
+    """Flag a process when `metric <op> threshold` held for at least
+    `min_count` of its last `window` samples.
+
+    `metric` is a ColumnarHistory column ("cpu", "mem" or "status"); status
+    thresholds may be given by name, e.g. Rule("zombie", "status", "==", "zombie").
+    A `window` of None means the whole history.
+    """
+
+    def __init__(self, issue, metric, op, threshold, min_count=1, window=1):
+        if op not in OPS:
+            raise ValueError(f"unknown operator {op!r}")
+        if metric == "status" and isinstance(threshold, str):
+            threshold = status_code(threshold)
+        self.issue = issue
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.min_count = min_count
+        self.window = window
+
+    def test(self, values):
+        return OPS[self.op](values, self.threshold)
+
+    def __repr__(self):
+        return (f"Rule({self.issue!r}, {self.metric!r}, {self.op!r}, {self.threshold!r}, "
+                f"min_count={self.min_count}, window={self.window})")
+
+
+class RuleEngine:
+    """Evaluates every Rule against a ColumnarHistory in one vectorized pass.
+
+    Each rule keeps a per-slot counter of matching samples inside its window.
+    Counters are built once from the full history matrix when the engine
+    attaches, then updated from each appended batch (+1 for a matching new
+    sample, -1 for a matching sample sliding out of the window), so a tick
+    costs O(new samples) and evaluation is a single comparison per slot.
+    """
+
+    def __init__(self, store, rules=()):
+        self.store = store
+        self.rules = []
+        self.counts = np.zeros((0, store.capacity), dtype=np.int32)
+        for rule in rules:
+            self.add_rule(rule)
+        store.subscribe(self._on_append)
+
+    def _window(self, rule):
+        L = self.store.history_len
+        return L if rule.window is None else max(1, min(rule.window, L))
+
+    def _ensure_capacity(self):
+        cap = self.store.capacity
+        if self.counts.shape[1] < cap:
+            grown = np.zeros((self.counts.shape[0], cap), dtype=np.int32)
+            grown[:, :self.counts.shape[1]] = self.counts
+            self.counts = grown
+
+    def add_rule(self, rule):
+        """Add a rule and seed its counters from the history matrix."""
+        self._ensure_capacity()
+        store = self.store
+        w = self._window(rule)
+        L = store.history_len
+        # age of every column relative to the newest sample (0 = newest)
+        cols = np.arange(L)
+        age = (store.head[:, None] - 1 - cols[None, :]) % L
+        valid = age < np.minimum(store.count, w)[:, None]
+        matrix = getattr(store, rule.metric)
+        row = np.count_nonzero(rule.test(matrix) & valid, axis=1).astype(np.int32)
+        self.rules.append(rule)
+        self.counts = np.vstack([self.counts, row[None, :]])
+
+    def _on_append(self, store, slots, cols, values):
+        self._ensure_capacity()
+        # slots with no samples yet are fresh processes (or recycled slots)
+        fresh = store.count[slots] == 0
+        if fresh.any():
+            self.counts[:, slots[fresh]] = 0
+        L = store.history_len
+        for r, rule in enumerate(self.rules):
+            delta = rule.test(values[rule.metric]).astype(np.int32)
+            w = self._window(rule)
+            leaving = store.count[slots] >= w
+            if leaving.any():
+                out_slots = slots[leaving]
+                out_cols = (cols[leaving] - w) % L
+                old = getattr(store, rule.metric)[out_slots, out_cols]
+                delta[leaving] -= rule.test(old).astype(np.int32)
+            self.counts[r, slots] += delta
+
+    def evaluate(self, issues=None):
+        """Return [(slot, issue)] for every rule that fires, in rule order."""
+        slots = self.store.active_slots()
+        if not self.rules or slots.size == 0:
+            return []
+        self._ensure_capacity()
+        thresholds = np.array([rule.min_count for rule in self.rules], dtype=np.int32)
+        hits = self.counts[:, slots] >= thresholds[:, None]
+        out = []
+        for r, rule in enumerate(self.rules):
+            if issues is not None and rule.issue not in issues:
+                continue
+            out.extend((int(s), rule.issue) for s in slots[hits[r]])
+        return out
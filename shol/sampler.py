@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+import numpy as np
+import psutil
+from history import status_code
+
+# /proc/<pid>/stat state letters -> psutil status names
+PROC_STATES = {
+    "R": "running", "S": "sleeping", "D": "disk-sleep", "T": "stopped",
+    "t": "tracing-stop", "Z": "zombie", "X": "dead", "x": "dead",
+    "K": "wake-kill", "W": "waking", "I": "idle", "P": "parked",
+}
+PROC_STATE_CODES = {k: status_code(v) for k, v in PROC_STATES.items()}
+
+HAS_PROCFS = sys.platform.startswith("linux") and os.path.isdir("/proc/self")
+
+
+def _cpu_percent(total, now, last):
+    """CPU % since the previous (total cpu seconds, monotonic time) reading."""
+    if last is None or now <= last[1]:
+        return 0.0
+    return max(0.0, (total - last[0]) / (now - last[1]) * 100.0)
+
+
+class Snapshot:
+    """One tick of process samples, column-oriented.
+
+    `names` and `cmdlines` hold the cached static attributes of each row, so
+    building a snapshot allocates no new strings for known processes.
+    `cpu_time` (cumulative user+system seconds), `rss` (bytes) and `ppid`
+    are the raw counters behind cpu/mem; they default to zeros for sources
+    that don't provide them.
+    """
+
+    __slots__ = ("ts", "pid", "create_time", "cpu", "mem", "status", "names", "cmdlines",
+                 "cpu_time", "rss", "ppid")
+
+    def __init__(self, ts, pid, create_time, cpu, mem, status, names, cmdlines,
+                 cpu_time=None, rss=None, ppid=None):
+        self.ts = ts
+        self.pid = np.asarray(pid, dtype=np.int64)
+        self.create_time = np.asarray(create_time, dtype=np.float64)
+        self.cpu = np.asarray(cpu, dtype=np.float32)
+        self.mem = np.asarray(mem, dtype=np.float32)
+        self.status = np.asarray(status, dtype=np.uint8)
+        self.names = names
+        self.cmdlines = cmdlines
+        n = len(self.pid)
+        self.cpu_time = np.zeros(n, np.float64) if cpu_time is None else np.asarray(cpu_time, dtype=np.float64)
+        self.rss = np.zeros(n, np.int64) if rss is None else np.asarray(rss, dtype=np.int64)
+        self.ppid = np.zeros(n, np.int64) if ppid is None else np.asarray(ppid, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.pid)
+
+
+class Sampler:
+    """Samples the process table, reading static attributes only once.
+
+    name and cmdline are the most expensive /proc reads and almost never
+    change, so they are cached per (pid, create_time) and only fetched for
+    processes that appeared since the last tick. Every tick re-reads just
+    cpu, memory and status (plus the CPU-time, RSS and ppid counters).
+
+    On Linux the fast path (`fast=True`, the default when /proc is present)
+    skips psutil for the dynamic fields and parses /proc/<pid>/stat directly:
+    one read per process yields state, CPU times, start time and RSS (the
+    same resident-page count statm reports).
+
+    `sample_pids()` refreshes just a few processes between full scans (see
+    scheduler.AdaptiveScheduler); CPU% is computed per process from the CPU
+    time and clock of its own previous reading, so partial and full samples
+    can be mixed freely.
+    """
+
+    def __init__(self, fast=None):
+        self.fast = HAS_PROCFS if fast is None else (fast and HAS_PROCFS)
+        self.static = {}    # (pid, create_time) -> (name, cmdline tuple)
+        self._prev = {}     # (pid, create_time) -> (total cpu seconds, monotonic time) at last reading
+        if self.fast:
+            self._clk_tck = os.sysconf("SC_CLK_TCK")
+            self._page = os.sysconf("SC_PAGE_SIZE")
+            self._boot = psutil.boot_time()
+            self._total_mem = psutil.virtual_memory().total
+
+    def _static_for(self, key, proc=None):
+        st = self.static.get(key)
+        if st is None:
+            try:
+                proc = proc or psutil.Process(key[0])
+                with proc.oneshot():
+                    name = proc.name()
+                    try:
+                        cmdline = tuple(proc.cmdline())
+                    except (psutil.AccessDenied, psutil.ZombieProcess):
+                        cmdline = ()
+                st = (name, cmdline)
+            except psutil.AccessDenied:
+                st = (None, ())
+            self.static[key] = st
+        return st
+
+    def sample(self):
+        return self._sample_procfs() if self.fast else self._sample_psutil()
+
+    def _sample_psutil(self):
+        snapshot_time = time.time()
+        pid, ctime, cpu, mem, status, names, cmdlines = [], [], [], [], [], [], []
+        cpu_time, rss, ppid = [], [], []
+        static = {}
+        attrs = ['create_time', 'cpu_percent', 'memory_percent', 'status', 'cpu_times', 'memory_info', 'ppid']
+        for p in psutil.process_iter(attrs):
+            try:
+                info = p.info
+                key = (p.pid, info['create_time'] or 0.0)
+                name, cmdline = self._static_for(key, p)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            static[key] = (name, cmdline)
+            pid.append(key[0])
+            ctime.append(key[1])
+            cpu.append(info['cpu_percent'] or 0.0)
+            mem.append(info['memory_percent'] or 0.0)
+            status.append(status_code(info['status']))
+            names.append(name)
+            cmdlines.append(cmdline)
+            t = info['cpu_times']
+            cpu_time.append(t.user + t.system if t else 0.0)
+            rss.append(info['memory_info'].rss if info['memory_info'] else 0)
+            ppid.append(info['ppid'] or 0)
+        now = time.monotonic()
+        self._prev = {key: (total, now) for key, total in zip(zip(pid, ctime), cpu_time)}
+        self.static = static  # forget processes that are gone
+        return Snapshot(snapshot_time, pid, ctime, cpu, mem, status, names, cmdlines, cpu_time, rss, ppid)
+
+    def _read_stat(self, pid):
+        # raw os.read: no buffered file object per process
+        fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+        try:
+            data = os.read(fd, 4096)
+        finally:
+            os.close(fd)
+        # comm may contain spaces and parentheses: split after the last ')'
+        return data[data.rfind(b")") + 2:].split()
+
+    def _sample_procfs(self):
+        snapshot_time = time.time()
+        now = time.monotonic()
+        clk, page = self._clk_tck, self._page
+        mem_scale = page * 100.0 / self._total_mem
+        prev = self._prev
+        cur, static = {}, {}
+        pid, ctime, cpu, mem, status, names, cmdlines = [], [], [], [], [], [], []
+        cpu_time, rss, ppid = [], [], []
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            n = int(entry)
+            try:
+                f = self._read_stat(n)
+                key = (n, self._boot + int(f[19]) / clk)
+                name, cmdline = self._static_for(key)
+            except (FileNotFoundError, ProcessLookupError, IndexError, ValueError, psutil.NoSuchProcess):
+                continue  # exited while we were reading it
+            total = (int(f[11]) + int(f[12])) / clk
+            last = prev.get(key)
+            cur[key] = (total, now)
+            static[key] = (name, cmdline)
+            pid.append(n)
+            ctime.append(key[1])
+            cpu.append(_cpu_percent(total, now, last))
+            pages = int(f[21])
+            mem.append(pages * mem_scale)
+            status.append(PROC_STATE_CODES.get(f[0].decode(), 0))
+            names.append(name)
+            cmdlines.append(cmdline)
+            cpu_time.append(total)
+            rss.append(pages * page)
+            ppid.append(int(f[1]))
+        self._prev, self.static = cur, static
+        return Snapshot(snapshot_time, pid, ctime, cpu, mem, status, names, cmdlines, cpu_time, rss, ppid)
+
+    def _read_one(self, n):
+        """(create_time, total cpu s, rss bytes, mem %, status code, ppid) of one pid."""
+        if self.fast:
+            f = self._read_stat(n)
+            pages = int(f[21])
+            return (self._boot + int(f[19]) / self._clk_tck, (int(f[11]) + int(f[12])) / self._clk_tck,
+                    pages * self._page, pages * self._page * 100.0 / self._total_mem,
+                    PROC_STATE_CODES.get(f[0].decode(), 0), int(f[1]))
+        p = psutil.Process(n)
+        with p.oneshot():
+            t, rss = p.cpu_times(), p.memory_info().rss
+            return (p.create_time(), t.user + t.system, rss, p.memory_percent(),
+                    status_code(p.status()), p.ppid())
+
+    def sample_pids(self, pids):
+        """Snapshot of just `pids` (those still alive and already known).
+
+        Processes the last full scan hasn't seen are left to the next one,
+        since they have no static attributes or CPU baseline yet.
+        """
+        snapshot_time = time.time()
+        prev, static = self._prev, self.static
+        rows = []
+        for n in pids:
+            try:
+                ct, total, rss_b, mem_p, st, pp = self._read_one(n)
+            except (FileNotFoundError, ProcessLookupError, IndexError, ValueError,
+                    psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            key = (n, ct)
+            if key not in static:
+                continue
+            now = time.monotonic()
+            rows.append((n, ct, _cpu_percent(total, now, prev.get(key)), mem_p, st,
+                         static[key][0], static[key][1], total, rss_b, pp))
+            prev[key] = (total, now)
+        cols = list(zip(*rows)) or [()] * 10
+        return Snapshot(snapshot_time, *cols[:5], list(cols[5]), list(cols[6]), *cols[7:])
+
+    # ---------------- batch CPU measurement ----------------
+    def _cpu_seconds(self, pids, procs):
+        """(pid, create_time) -> user+system CPU seconds for every pid still alive."""
+        out = {}
+        if self.fast:
+            clk = self._clk_tck
+            for pid in pids:
+                try:
+                    f = self._read_stat(pid)
+                    out[(pid, int(f[19]))] = (int(f[11]) + int(f[12])) / clk
+                except (FileNotFoundError, ProcessLookupError, IndexError, ValueError):
+                    continue
+            return out
+        for pid in pids:
+            try:
+                p = procs.get(pid)
+                if p is None:
+                    p = procs[pid] = psutil.Process(pid)
+                t = p.cpu_times()
+                out[(pid, p.create_time())] = t.user + t.system
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return out
+
+    def measure_cpu(self, pids=None, interval=0.1):
+        """CPU % of many processes over one shared `interval`.
+
+        Takes one cpu_times snapshot of every pid, sleeps once, takes a second
+        snapshot and computes all deltas together: O(interval) wall time
+        instead of O(N * interval) for per-process cpu_percent(interval=...).
+        Values match psutil's per-process cpu_percent (100 = one full core).
+        Pids that exited or were recycled in between are left out.
+        """
+        pids = psutil.pids() if pids is None else list(pids)
+        procs = {}
+        # both passes read the pids in the same order, so every pid's window
+        # is about the time between the passes' midpoints (not counting the
+        # time spent reading the other pids)
+        t0 = time.monotonic()
+        before = self._cpu_seconds(pids, procs)
+        t1 = time.monotonic()
+        time.sleep(interval)
+        t2 = time.monotonic()
+        after = self._cpu_seconds([pid for pid, _ in before], procs)
+        t3 = time.monotonic()
+        elapsed = (t2 + t3) / 2 - (t0 + t1) / 2
+        if elapsed <= 0:
+            return {}
+        return {pid: max(0.0, (total - before[(pid, ct)]) / elapsed * 100.0)
+                for (pid, ct), total in after.items() if (pid, ct) in before}
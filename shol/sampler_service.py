@@ -0,0 +1,55 @@
+import signal
+import sys
+import time
+import psutil
+from utils import log_event
+from sampler import Sampler
+from shared_snapshot import SnapshotWriter
+from tsdb import SnapshotRecorder
+from metrics import PROCESSES_SCANNED, SAMPLE_SECONDS, start_publisher
+from readiness import notify_ready
+
+# The single process-table scanner. Everything else attaches to its shared
+# snapshots (see shared_snapshot.SnapshotReader) instead of walking /proc.
+SAMPLE_INTERVAL = 1.0
+TSDB_FLUSH_INTERVAL = 60.0   # seconds between msync of the time-series files
+
+
+def run_forever(interval=SAMPLE_INTERVAL):
+    sampler = Sampler()
+    writer = SnapshotWriter(interval=interval)
+    log_event(" Sampler service started", f"shared memory: {writer.shm.name}")
+    start_publisher("sampler")
+    # long-term history (data/tsdb): system and per-process-name rollups
+    recorder = SnapshotRecorder()
+    psutil.cpu_percent(interval=None)  # prime system-wide CPU counter
+    next_flush = time.monotonic() + TSDB_FLUSH_INTERVAL
+    try:
+        while True:
+            started = time.monotonic()
+            snap = sampler.sample()
+            SAMPLE_SECONDS.observe(time.monotonic() - started, scope="full")
+            PROCESSES_SCANNED.set(len(snap))
+            sys_cpu, sys_mem = psutil.cpu_percent(interval=None), psutil.virtual_memory().percent
+            writer.publish(snap, sys_cpu, sys_mem)
+            notify_ready()  # readers can attach now (only the first call does anything)
+            try:
+                recorder.record(snap, sys_cpu, sys_mem)
+            except OSError as e:
+                log_event(" Time-series write failed", str(e))
+            if started >= next_flush:
+                recorder.store.flush()
+                next_flush = started + TSDB_FLUSH_INTERVAL
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        writer.close()
+        recorder.store.close()
+
+
+if __name__ == "__main__":
+    # terminate() from the supervisor (run_all.py) should still unlink the segment
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,169 @@
+import os
+import time
+import numpy as np
+import psutil
+from metrics import REGISTRY
+
+# One polling policy for every SHOL loop. Full process scans run at a slow
+# cadence; between them only "hot" processes (near a threshold or trending
+# up) are re-sampled, at a fast cadence. Both cadences stretch when SHOL
+# itself uses more CPU than its budget, or when the host is under pressure.
+#
+# Under run_all.py sampler_service already scans every process each second
+# and publishes the result in shared memory. Reading a frame is cheap, so
+# then every process is refreshed at the fast cadence (detection within
+# ~1-2 s) and only whole-table work (cleanup, heal decisions) waits for the
+# slow "scan" tick.
+
+FAST_INTERVAL = 1.0      # seconds between refreshes of hot processes
+SLOW_INTERVAL = 10.0     # seconds between full scans
+CPU_BUDGET_PERCENT = float(os.environ.get("SHOL_CPU_BUDGET", "2.0"))  # % of one core, per SHOL process
+HOST_PRESSURE_CPU = 90.0
+HOST_PRESSURE_MEM = 95.0
+PRESSURE_FACTOR = 2.0    # extra stretch while the host is under pressure
+MAX_BACKOFF = 8.0
+BUDGET_WINDOW = 1.0      # seconds of own CPU time measured per backoff adjustment
+MAX_HOT = 256            # processes refreshed per fast tick, hottest first
+NEAR = 0.8               # fraction of a threshold that makes a process hot
+TREND_SAMPLES = 5        # compare the newest sample with the one this many samples back
+TREND_CPU = 10.0         # cpu% points gained over TREND_SAMPLES that count as trending up
+TREND_RSS = 0.05         # relative RSS growth over TREND_SAMPLES that counts as trending up
+
+# same defaults as detector.HIGH_CPU_PERCENT / HIGH_MEM_PERCENT
+CPU_THRESHOLD = 90.0
+MEM_THRESHOLD = 60.0
+
+BACKOFF = REGISTRY.gauge("shol_poll_backoff", "Factor applied to polling intervals (budget and host pressure).")
+HOT = REGISTRY.gauge("shol_hot_processes", "Processes in the current fast-polling set.")
+
+
+class Budget:
+    """Backoff factor from SHOL's own CPU use and the host's load.
+
+    `update()` compares this process's CPU time over the last BUDGET_WINDOW
+    with `cpu_budget` (percent of one core): over budget the factor grows
+    1.5x per window up to MAX_BACKOFF, under half the budget it shrinks back
+    toward 1. While system CPU or memory is above the pressure limits the
+    factor is multiplied by PRESSURE_FACTOR on top.
+    """
+
+    def __init__(self, cpu_budget=CPU_BUDGET_PERCENT, pressure_cpu=HOST_PRESSURE_CPU,
+                 pressure_mem=HOST_PRESSURE_MEM, max_backoff=MAX_BACKOFF):
+        self.cpu_budget = cpu_budget
+        self.pressure_cpu = pressure_cpu
+        self.pressure_mem = pressure_mem
+        self.max_backoff = max_backoff
+        self.factor = 1.0
+        self.pressure = False
+        self.own_cpu = 0.0       # % of one core over the last completed window
+        self._proc = psutil.Process()
+        self._last = self._reading()
+        psutil.cpu_percent(interval=None)  # prime system-wide CPU counter
+
+    def _reading(self):
+        t = self._proc.cpu_times()
+        return t.user + t.system, time.monotonic()
+
+    def update(self):
+        cpu, now = self._reading()
+        if now - self._last[1] >= BUDGET_WINDOW:
+            self.own_cpu = (cpu - self._last[0]) / (now - self._last[1]) * 100.0
+            self._last = (cpu, now)
+            if self.own_cpu > self.cpu_budget:
+                self.factor = min(self.max_backoff, self.factor * 1.5)
+            elif self.own_cpu < self.cpu_budget / 2:
+                self.factor = max(1.0, self.factor / 1.25)
+        self.pressure = (psutil.cpu_percent(interval=None) > self.pressure_cpu
+                         or psutil.virtual_memory().percent > self.pressure_mem)
+        backoff = self.backoff()
+        BACKOFF.set(round(backoff, 3))
+        return backoff
+
+    def backoff(self):
+        return self.factor * (PRESSURE_FACTOR if self.pressure else 1.0)
+
+    def stretch(self, interval):
+        """`interval` scaled by the current backoff (updates the budget first)."""
+        return interval * self.update()
+
+
+class AdaptiveScheduler:
+    """Decides what to sample next for a ProcessHistory, and when.
+
+    Usage, once per loop iteration:
+
+        kind = sched.poll(ph)   # "scan", "hot" or None
+        if kind == "scan": ...  # full scan: the place for whole-table work
+        sched.wait()
+    """
+
+    def __init__(self, fast=FAST_INTERVAL, slow=SLOW_INTERVAL, budget=None, cpu_threshold=CPU_THRESHOLD,
+                 mem_threshold=MEM_THRESHOLD, max_hot=MAX_HOT):
+        self.fast = fast
+        self.slow = slow
+        self.budget = budget or Budget()
+        self.cpu_threshold = cpu_threshold
+        self.mem_threshold = mem_threshold
+        self.max_hot = max_hot
+        self.next_scan = 0.0       # monotonic time the next full scan is due
+        self.hot = []
+        self.shared = False        # source reads sampler_service's frames (see module comment)
+
+    def hot_pids(self, store):
+        """Pids worth sampling fast: near a threshold or trending up, hottest first."""
+        with store.lock:
+            slots = store.active_slots()
+            if slots.size == 0:
+                return []
+            L = store.history_len
+            last = store.last_cols(slots)
+            cpu, mem = store.cpu[slots, last], store.mem[slots, last]
+            score = np.maximum(cpu / self.cpu_threshold, mem / self.mem_threshold)
+            old = store.count[slots] > TREND_SAMPLES
+            back = (last - TREND_SAMPLES) % L
+            rising = old & ((cpu - store.cpu[slots, back] > TREND_CPU)
+                            | (store.rss[slots, last] > store.rss[slots, back] * (1 + TREND_RSS)))
+            hot = (score >= NEAR) | rising
+            idx = np.flatnonzero(hot)
+            idx = idx[np.argsort(-(score[idx] + rising[idx]), kind="stable")][:self.max_hot]
+            return store.pid[slots[idx]].tolist()
+
+    def poll(self, ph):
+        """Take whichever sample is due now.
+
+        "scan": a full sample (every `slow` seconds, stretched by the budget);
+        "hot": a refresh between scans (the hot processes, or the newest shared
+        frame); None: nothing new to look at.
+        """
+        now = time.monotonic()
+        self.shared = ph.source.shared_frames()
+        if now >= self.next_scan:
+            ph.sample()
+            self.shared = ph.source.shared_frames()  # attached (or lost) the shared reader
+            self.next_scan = now + self.slow * self.budget.backoff()
+            self.hot = self.hot_pids(ph.store)
+            HOT.set(len(self.hot))
+            return "scan"
+        if self.shared:
+            last = ph.last
+            if ph.sample() is last:
+                return None  # no frame published since the last poll
+        elif not self.hot:
+            return None
+        elif ph.sample_pids(self.hot) is None:
+            self.hot = []  # whole-snapshot source: wait for the next scan instead
+            return None
+        self.hot = self.hot_pids(ph.store)
+        HOT.set(len(self.hot))
+        return "hot"
+
+    def delay(self, busy=False):
+        """Seconds until the next poll; `busy` asks for the fast cadence regardless."""
+        backoff = self.budget.update()
+        until_scan = max(0.0, self.next_scan - time.monotonic())
+        if self.hot or busy or self.shared:
+            return min(self.fast * backoff, until_scan)
+        return until_scan
+
+    def wait(self, busy=False):
+        time.sleep(self.delay(busy))
@@ -0,0 +1,282 @@
+import sys
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from sampler import Snapshot
+
+# One sampler process publishes every tick here; monitor, healer, detector,
+# dashboard and API attach read-only instead of scanning /proc themselves.
+SHM_NAME = "shol_snapshots"
+MAGIC = 0x5348304C  # "SH0L"
+LAYOUT_VERSION = 2
+
+FRAMES = 4               # ring depth: a reader has FRAMES ticks to finish with a frame
+MAX_ROWS = 16384
+BLOB_BYTES = 4 << 20     # name + cmdline bytes per frame
+
+# shared header: magic, layout, frames, max_rows, blob_bytes, (pad), latest seq, interval
+HEADER = np.dtype([("magic", "<u4"), ("layout", "<u4"), ("frames", "<u4"),
+                   ("max_rows", "<u4"), ("blob_bytes", "<u4"), ("pad", "<u4"),
+                   ("latest", "<u8"), ("interval", "<f8")])
+# per-frame header; `seq` is the seqlock: odd while the writer is inside the frame
+FRAME_HEADER = np.dtype([("seq", "<u8"), ("ts", "<f8"), ("rows", "<u4"),
+                         ("blob_len", "<u4"), ("sys_cpu", "<f4"), ("sys_mem", "<f4")])
+COLUMNS = (("pid", np.int64), ("create_time", np.float64), ("cpu", np.float32),
+           ("mem", np.float32), ("status", np.uint8), ("str_off", np.uint32),
+           ("name_len", np.uint32), ("cmd_len", np.uint32), ("cpu_time", np.float64),
+           ("rss", np.int64), ("ppid", np.int64))
+
+
+def _align(n, to=8):
+    return (n + to - 1) // to * to
+
+
+def _layout(frames, max_rows, blob_bytes):
+    """Byte offsets of every array in the segment, plus the total size."""
+    pos = _align(HEADER.itemsize)
+    out = []
+    for _ in range(frames):
+        frame = {"header": pos}
+        pos = _align(pos + FRAME_HEADER.itemsize)
+        for name, dtype in COLUMNS:
+            frame[name] = pos
+            pos = _align(pos + np.dtype(dtype).itemsize * max_rows)
+        frame["blob"] = pos
+        pos = _align(pos + blob_bytes)
+        out.append(frame)
+    return out, pos
+
+
+def _views(buf, frames, max_rows, blob_bytes):
+    offsets, _ = _layout(frames, max_rows, blob_bytes)
+    views = []
+    for off in offsets:
+        v = {"header": np.ndarray((), FRAME_HEADER, buf, off["header"])}
+        for name, dtype in COLUMNS:
+            v[name] = np.ndarray(max_rows, dtype, buf, off[name])
+        v["blob"] = np.ndarray(blob_bytes, np.uint8, buf, off["blob"])
+        views.append(v)
+    return views
+
+
+class SnapshotWriter:
+    """Owns the shared segment and publishes one Snapshot per tick."""
+
+    def __init__(self, name=SHM_NAME, frames=FRAMES, max_rows=MAX_ROWS, blob_bytes=BLOB_BYTES, interval=1.0):
+        _, size = _layout(frames, max_rows, blob_bytes)
+        try:
+            # a segment left behind by a crashed sampler
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray((), HEADER, self.shm.buf, 0)
+        self.header["magic"] = MAGIC
+        self.header["layout"] = LAYOUT_VERSION
+        self.header["frames"] = frames
+        self.header["max_rows"] = max_rows
+        self.header["blob_bytes"] = blob_bytes
+        self.header["interval"] = interval
+        self.header["latest"] = 0
+        self.frames = _views(self.shm.buf, frames, max_rows, blob_bytes)
+        self.max_rows = max_rows
+        self.blob_bytes = blob_bytes
+        self._encoded = {}  # (pid, create_time) -> (name bytes, cmdline bytes)
+
+    def _encode(self, key, name, cmdline):
+        enc = self._encoded.get(key)
+        if enc is None:
+            enc = ((name or "").encode("utf-8", "replace"),
+                   "\0".join(cmdline).encode("utf-8", "replace"))
+            self._encoded[key] = enc
+        return enc
+
+    def publish(self, snap, sys_cpu=0.0, sys_mem=0.0):
+        seq = int(self.header["latest"]) + 1
+        f = self.frames[seq % len(self.frames)]
+        n = min(len(snap), self.max_rows)
+
+        # strings: cached encodings, joined into one blob
+        keys = list(zip(snap.pid[:n].tolist(), snap.create_time[:n].tolist()))
+        parts, name_len, cmd_len = [], [], []
+        used, limit = 0, self.blob_bytes
+        for key, name, cmdline in zip(keys, snap.names, snap.cmdlines):
+            nb, cb = self._encode(key, name, cmdline)
+            if used + len(nb) + len(cb) > limit:
+                nb = cb = b""  # blob full: rows keep their numbers, lose their strings
+            parts.append(nb)
+            parts.append(cb)
+            name_len.append(len(nb))
+            cmd_len.append(len(cb))
+            used += len(nb) + len(cb)
+        if len(self._encoded) > 2 * max(n, 1024):
+            live = set(keys)
+            self._encoded = {k: v for k, v in self._encoded.items() if k in live}
+        blob = b"".join(parts)
+        lens = np.asarray(name_len, np.uint32) + np.asarray(cmd_len, np.uint32)
+        offs = np.zeros(n, np.uint32)
+        if n > 1:
+            np.cumsum(lens[:-1], out=offs[1:])
+
+        hdr = f["header"]
+        hdr["seq"] += 1  # odd: frame is being written
+        hdr["ts"] = snap.ts
+        hdr["rows"] = n
+        hdr["blob_len"] = len(blob)
+        hdr["sys_cpu"] = sys_cpu
+        hdr["sys_mem"] = sys_mem
+        f["pid"][:n] = snap.pid[:n]
+        f["create_time"][:n] = snap.create_time[:n]
+        f["cpu"][:n] = snap.cpu[:n]
+        f["mem"][:n] = snap.mem[:n]
+        f["status"][:n] = snap.status[:n]
+        f["cpu_time"][:n] = snap.cpu_time[:n]
+        f["rss"][:n] = snap.rss[:n]
+        f["ppid"][:n] = snap.ppid[:n]
+        f["str_off"][:n] = offs
+        f["name_len"][:n] = name_len
+        f["cmd_len"][:n] = cmd_len
+        f["blob"][:len(blob)] = np.frombuffer(blob, np.uint8)
+        hdr["seq"] += 1  # even again: frame is consistent
+        self.header["latest"] = seq
+
+    def close(self):
+        self.header = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds views; the mapping goes away with them
+        self.shm.unlink()
+
+
+# columns SnapshotReader.read() copies out of a frame
+_SNAPSHOT_COLUMNS = ("pid", "create_time", "cpu", "mem", "status", "cpu_time", "rss", "ppid")
+
+
+class SharedFrame:
+    """Zero-copy view of one published frame.
+
+    Column arrays point straight into shared memory; they stay valid until
+    the writer wraps around the ring (FRAMES ticks). `stable()` tells whether
+    the frame was rewritten since it was opened.
+    """
+
+    def __init__(self, views, seq, frame_seq):
+        self._v = views
+        self.seq = seq
+        self._frame_seq = frame_seq
+        hdr = views["header"]
+        self.ts = float(hdr["ts"])
+        self.rows = int(hdr["rows"])
+        self.sys_cpu = float(hdr["sys_cpu"])
+        self.sys_mem = float(hdr["sys_mem"])
+
+    def column(self, name):
+        return self._v[name][:self.rows]
+
+    def strings(self, i):
+        off = int(self._v["str_off"][i])
+        nl, cl = int(self._v["name_len"][i]), int(self._v["cmd_len"][i])
+        raw = self._v["blob"][off:off + nl + cl].tobytes()
+        name = raw[:nl].decode("utf-8", "replace") or None
+        cmd = raw[nl:].decode("utf-8", "replace")
+        return name, tuple(cmd.split("\0")) if cmd else ()
+
+    def stable(self):
+        return int(self._v["header"]["seq"]) == self._frame_seq
+
+
+class SnapshotReader:
+    """Read-only attachment to the sampler's shared segment."""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), HEADER, shm.buf, 0)
+        if int(self.header["magic"]) != MAGIC or int(self.header["layout"]) != LAYOUT_VERSION:
+            raise ValueError("incompatible SHOL snapshot segment")
+        self.frames = _views(shm.buf, int(self.header["frames"]),
+                             int(self.header["max_rows"]), int(self.header["blob_bytes"]))
+        self.last_seq = 0
+        self._static = {}  # (pid, create_time) -> (name, cmdline), decoded once
+
+    @classmethod
+    def attach(cls, name=SHM_NAME):
+        """Attach to a running sampler, or return None if there is none."""
+        try:
+            if sys.version_info >= (3, 13):
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            else:
+                shm = shared_memory.SharedMemory(name=name)
+                # readers must not unlink the writer's segment when they exit
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+        except (FileNotFoundError, OSError):
+            return None
+        try:
+            return cls(shm)
+        except ValueError:
+            shm.close()
+            return None
+
+    def stale(self, now=None):
+        """True when the sampler stopped publishing (crashed or exited)."""
+        seq = int(self.header["latest"])
+        if seq == 0:
+            return True
+        ts = float(self.frames[seq % len(self.frames)]["header"]["ts"])
+        return (now or time.time()) - ts > max(5.0, 3 * float(self.header["interval"]))
+
+    def latest(self):
+        """The newest consistent frame, or None before the first publish."""
+        for _ in range(100):
+            seq = int(self.header["latest"])
+            if seq == 0:
+                return None
+            views = self.frames[seq % len(self.frames)]
+            frame_seq = int(views["header"]["seq"])
+            if frame_seq % 2 == 0:
+                frame = SharedFrame(views, seq, frame_seq)
+                if frame.stable():
+                    return frame
+            time.sleep(0)  # writer is mid-frame; let it finish
+        return None
+
+    def read(self, new_only=True):
+        """Latest frame as a Snapshot with its own copy of the columns.
+
+        Callers keep snapshots (ProcessHistory.last, the agent's outbox) for
+        longer than the ring holds a frame, so the columns are copied and
+        the frame is validated after the copy. With `new_only`, returns None
+        when nothing was published since the previous call.
+        """
+        while True:
+            frame = self.latest()
+            if frame is None or (new_only and frame.seq == self.last_seq):
+                return None
+            cols = {name: frame.column(name).copy() for name in _SNAPSHOT_COLUMNS}
+            pid = cols["pid"]
+            ctime = cols["create_time"]
+            names, cmdlines = [], []
+            static, cache = {}, self._static
+            for i, key in enumerate(zip(pid.tolist(), ctime.tolist())):
+                st = cache.get(key)
+                if st is None:
+                    st = frame.strings(i)
+                static[key] = st
+                names.append(st[0])
+                cmdlines.append(st[1])
+            snap = Snapshot(frame.ts, pid, ctime, cols["cpu"], cols["mem"], cols["status"], names, cmdlines,
+                            cols["cpu_time"], cols["rss"], cols["ppid"])
+            if frame.stable():
+                self._static = static
+                self.last_seq = frame.seq
+                return snap
+
+    def close(self):
+        self.header = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
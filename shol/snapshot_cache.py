@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+
+REFRESH_INTERVAL = 1.0   # seconds between background samples
+
+
+class CachedSnapshot:
+    """One published process list, serialized once for every request."""
+
+    __slots__ = ("seq", "ts", "procs", "body", "etag")
+
+    def __init__(self, seq, ts, procs, token):
+        self.seq = seq
+        self.ts = ts
+        self.procs = procs   # list of sample dicts (ProcessHistory.get_all_latest())
+        self.body = json.dumps(procs, separators=(",", ":")).encode("utf-8")
+        self.etag = f"{token}-{seq}"
+
+
+class SnapshotCache:
+    """Process list refreshed by one background thread at a fixed cadence.
+
+    Requests never sample: they read the current CachedSnapshot, whose JSON
+    body and ETag were built once when it was published, so request cost
+    does not depend on the number of processes and any number of concurrent
+    requests share one scan per interval. Callers that arrive before the
+    first snapshot wait on the same condition instead of sampling
+    themselves.
+    """
+
+    def __init__(self, ph, interval=REFRESH_INTERVAL):
+        self.ph = ph
+        self.interval = interval
+        self.current = None
+        self.errors = 0
+        self._token = f"{os.getpid():x}{int(time.time()):x}"  # keeps ETags unique across restarts
+        self._seq = 0
+        self._store_seq = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-cache", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception:
+                self.errors += 1  # keep serving the last good snapshot
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def refresh(self):
+        """Sample once and publish a new snapshot if the history changed."""
+        self.ph.sample()
+        # drop processes that exited: otherwise they'd be listed (and diffed) forever
+        self.ph.cleanup_dead()
+        store_seq = self.ph.store.seq
+        if store_seq == self._store_seq and self.current is not None:
+            return self.current  # shared sampler published nothing new
+        snap = CachedSnapshot(self._seq + 1, time.time(), self.ph.get_all_latest(), self._token)
+        with self._cond:
+            self._seq = snap.seq
+            self._store_seq = store_seq
+            self.current = snap
+            self._cond.notify_all()
+        return snap
+
+    def get(self, timeout=10.0):
+        """Current snapshot, waiting (shared) for the first one if needed."""
+        snap = self.current
+        if snap is not None:
+            return snap
+        self.start()
+        with self._cond:
+            self._cond.wait_for(lambda: self.current is not None, timeout)
+            return self.current
+
+    def wait_newer(self, seq, timeout=None):
+        """Block until a snapshot newer than `seq` is published; returns the current one."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.current is not None and self.current.seq > seq, timeout)
+            return self.current
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,345 @@
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from sampler import Sampler, Snapshot
+from shared_snapshot import SnapshotReader
+from history import status_code
+
+# Every consumer of process samples (ProcessHistory and through it the
+# detector, healer, monitor and API) reads from a ProcessSource, so the same
+# code runs against the live host, a recording, or a simulated load.
+
+REC_MAGIC = b"SHOLREC1\n"
+# numeric columns of a recorded frame, in file order
+REC_COLUMNS = (("pid", np.int64), ("create_time", np.float64), ("cpu", np.float32), ("mem", np.float32),
+               ("status", np.uint8), ("cpu_time", np.float64), ("rss", np.int64), ("ppid", np.int64))
+_LEN = struct.Struct("<I")
+# simulated seconds per real second for recorded/simulated sources opened
+# from the command line, so services don't spin through them flat out
+SIM_SPEEDUP = 10.0
+
+
+class ProcessSource:
+    """Produces one Snapshot per `sample()` call.
+
+    `live` is True only for sources whose pids are real processes on this
+    host; callers must not act on processes from any other source.
+    """
+
+    live = False
+    speedup = None   # pace simulated time at this many times real time (None: unpaced)
+
+    def __init__(self):
+        self.last = None
+        self._pace_origin = None   # (monotonic time, simulated ts) pacing counts from
+
+    def _pace(self, ts):
+        """Sleep until simulated time `ts` is due at `speedup` times real time."""
+        if not self.speedup:
+            return
+        now = time.monotonic()
+        if self._pace_origin is None:
+            self._pace_origin = (now, ts)
+            return
+        due = self._pace_origin[0] + (ts - self._pace_origin[1]) / self.speedup
+        if due > now:
+            time.sleep(due - now)
+
+    def sample(self):
+        raise NotImplementedError
+
+    def sample_pids(self, pids):
+        """Snapshot of just `pids` between full samples, or None when this
+        source only produces whole snapshots."""
+        return None
+
+    def shared_frames(self):
+        """True while `sample()` just reads frames another process already
+        scanned, so taking one is cheap at any cadence."""
+        return False
+
+    def measure_cpu(self, pids=None, interval=0.1):
+        """{pid: cpu%} for `pids`; recorded and simulated sources answer from
+        their latest snapshot (their clock only moves on `sample()`)."""
+        snap = self.last
+        if snap is None:
+            return {}
+        table = dict(zip(snap.pid.tolist(), snap.cpu.tolist()))
+        if pids is None:
+            return table
+        return {pid: table[pid] for pid in pids if pid in table}
+
+    def close(self):
+        pass
+
+
+class LiveSource(ProcessSource):
+    """This host: sampler_service's shared snapshots when it runs, else a local scan."""
+
+    live = True
+
+    def __init__(self, shared=True, sampler=None):
+        super().__init__()
+        self.sampler = sampler or Sampler()
+        self.shared = shared
+        self.reader = None
+
+    def _shared_snapshot(self):
+        if self.reader is not None and self.reader.stale():
+            self.reader.close()
+            self.reader = None
+        if self.reader is None:
+            self.reader = SnapshotReader.attach()
+        if self.reader is None or self.reader.stale():
+            return None
+        snap = self.reader.read()
+        # nothing new published since last call: keep the current sample
+        return snap if snap is not None else self.last
+
+    def sample(self):
+        snap = self._shared_snapshot() if self.shared else None
+        if snap is None:
+            # name/cmdline are read once per process; only the counters each tick
+            snap = self.sampler.sample()
+        self.last = snap
+        return snap
+
+    def shared_frames(self):
+        return self.shared and self.reader is not None and not self.reader.stale()
+
+    def sample_pids(self, pids):
+        if self.shared_frames():
+            return None  # sampler_service already scans everything every tick
+        return self.sampler.sample_pids(pids)
+
+    def measure_cpu(self, pids=None, interval=0.1):
+        return self.sampler.measure_cpu(pids, interval)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+class RecordingSource(ProcessSource):
+    """Passes another source through and appends every new snapshot to `path`.
+
+    Frames are zlib-compressed: a small JSON header (timestamp, row count and
+    name/cmdline only for processes not seen before in the file) followed by
+    the raw numeric columns.
+    """
+
+    def __init__(self, inner, path):
+        super().__init__()
+        self.inner = inner
+        self.live = inner.live
+        self.path = path
+        self._known = set()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "ab")
+        if new_file:
+            self._f.write(REC_MAGIC)
+        else:
+            # appending to an existing recording: strings already in it stay known
+            for snap in ReplaySource(path).frames():
+                self._known.update(zip(snap.pid.tolist(), snap.create_time.tolist()))
+        self.frames = 0
+
+    def sample(self):
+        snap = self.inner.sample()
+        if snap is not self.last:
+            self._write(snap)
+        self.last = snap
+        return snap
+
+    def measure_cpu(self, pids=None, interval=0.1):
+        return self.inner.measure_cpu(pids, interval)
+
+    def _write(self, snap):
+        new = []
+        for i, key in enumerate(zip(snap.pid.tolist(), snap.create_time.tolist())):
+            if key not in self._known:
+                self._known.add(key)
+                new.append([key[0], key[1], snap.names[i], list(snap.cmdlines[i])])
+        head = json.dumps({"ts": snap.ts, "n": len(snap), "new": new}, separators=(",", ":")).encode("utf-8")
+        cols = b"".join(np.ascontiguousarray(getattr(snap, name), dtype).tobytes() for name, dtype in REC_COLUMNS)
+        payload = zlib.compress(_LEN.pack(len(head)) + head + cols, 1)
+        self._f.write(_LEN.pack(len(payload)) + payload)
+        self._f.flush()
+        self.frames += 1
+        if len(self._known) > 4 * max(len(snap), 1024):
+            self._known = set(zip(snap.pid.tolist(), snap.create_time.tolist()))
+
+    def close(self):
+        self._f.close()
+        self.inner.close()
+
+
+class ReplaySource(ProcessSource):
+    """Plays a RecordingSource file back, one frame per `sample()`.
+
+    With `loop`, the recording restarts at the end with timestamps shifted
+    so time keeps moving forward; otherwise `sample()` raises EOFError.
+    With `speedup`, frames are handed out at that many times the recorded pace.
+    """
+
+    def __init__(self, path, loop=False, speedup=None):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.speedup = speedup
+        self._iter = None
+        self._offset = 0.0
+        self._first_ts = self._last_ts = None
+
+    def frames(self):
+        static = {}
+        with open(self.path, "rb") as f:
+            if f.read(len(REC_MAGIC)) != REC_MAGIC:
+                raise ValueError(f"not a SHOL recording: {self.path}")
+            while True:
+                raw = f.read(_LEN.size)
+                if len(raw) < _LEN.size:
+                    return
+                (size,) = _LEN.unpack(raw)
+                payload = f.read(size)
+                if len(payload) < size:
+                    return  # recorder was killed mid-frame
+                payload = zlib.decompress(payload)
+                (hlen,) = _LEN.unpack_from(payload)
+                head = json.loads(payload[_LEN.size:_LEN.size + hlen])
+                for pid, ct, name, cmdline in head["new"]:
+                    static[(pid, ct)] = (name, tuple(cmdline))
+                n, pos, cols = head["n"], _LEN.size + hlen, {}
+                for name, dtype in REC_COLUMNS:
+                    cols[name] = np.frombuffer(payload, dtype, n, pos)
+                    pos += np.dtype(dtype).itemsize * n
+                strings = [static.get(k, (None, ())) for k in zip(cols["pid"].tolist(), cols["create_time"].tolist())]
+                yield Snapshot(head["ts"], cols["pid"], cols["create_time"], cols["cpu"], cols["mem"],
+                               cols["status"], [s[0] for s in strings], [s[1] for s in strings],
+                               cols["cpu_time"], cols["rss"], cols["ppid"])
+
+    def sample(self):
+        while True:
+            if self._iter is None:
+                self._iter = self.frames()
+            snap = next(self._iter, None)
+            if snap is not None:
+                break
+            self._iter = None
+            if not self.loop or self._first_ts is None:
+                raise EOFError(f"end of recording {self.path}")
+            self._offset += self._last_ts - self._first_ts + 1.0
+            self._first_ts = None
+        if self._first_ts is None:
+            self._first_ts = snap.ts
+        self._last_ts = snap.ts
+        snap.ts += self._offset
+        self._pace(snap.ts)
+        self.last = snap
+        return snap
+
+
+class SyntheticSource(ProcessSource):
+    """Simulated process table for load tests, at accelerated time.
+
+    Each `sample()` advances the simulated clock by `tick` seconds. Most
+    processes idle at low CPU; a fraction leaks memory steadily, some burst
+    into multi-tick CPU spikes, some sit at exactly 0% CPU (unresponsive
+    candidates), and `churn` of the table exits and is replaced per tick.
+    Parents are earlier processes, so trees are realistic enough for
+    subtree rollups. Deterministic for a given `seed`. With `speedup`, the
+    simulated clock runs at most that many times faster than real time.
+    """
+
+    def __init__(self, n=10000, tick=1.0, seed=0, leak_fraction=0.01, spike_fraction=0.002,
+                 idle_fraction=0.05, churn=0.001, total_mem=16 << 30, start_ts=None, speedup=None):
+        super().__init__()
+        self.n = n
+        self.tick = tick
+        self.speedup = speedup
+        self.rng = np.random.default_rng(seed)
+        self.leak_fraction = leak_fraction
+        self.spike_fraction = spike_fraction
+        self.idle_fraction = idle_fraction
+        self.churn = churn
+        self.total_mem = total_mem
+        self.ts = time.time() if start_ts is None else start_ts
+        self._next_pid = 100
+        self.pid = np.zeros(n, np.int64)
+        self.create_time = np.zeros(n, np.float64)
+        self.ppid = np.zeros(n, np.int64)
+        self.base_cpu = np.zeros(n, np.float32)
+        self.leak = np.zeros(n, np.float64)       # bytes per simulated second
+        self.rss = np.zeros(n, np.float64)
+        self.cpu_time = np.zeros(n, np.float64)
+        self.spike_left = np.zeros(n, np.int32)
+        self.names = [None] * n
+        self.cmdlines = [None] * n
+        self._names = [f"svc{i:03d}" for i in range(200)]
+        self._spawn(np.arange(n))
+
+    def _spawn(self, idx):
+        rng, k = self.rng, len(idx)
+        if k == 0:
+            return
+        pids = np.arange(self._next_pid, self._next_pid + k, dtype=np.int64)
+        self._next_pid += k
+        self.pid[idx] = pids
+        self.create_time[idx] = self.ts
+        # parent: init or a random live process (trees a few levels deep)
+        parents = self.pid[rng.integers(0, self.n, k)]
+        self.ppid[idx] = np.where((rng.random(k) < 0.3) | (parents >= pids), 1, parents)
+        idle = rng.random(k) < self.idle_fraction
+        self.base_cpu[idx] = np.where(idle, 0.0, rng.lognormal(-1.0, 1.0, k).clip(0.0, 40.0))
+        self.leak[idx] = np.where(rng.random(k) < self.leak_fraction, rng.uniform(64 << 10, 4 << 20, k), 0.0)
+        self.rss[idx] = rng.lognormal(17.0, 1.0, k).clip(1 << 20, 2 << 30)
+        self.cpu_time[idx] = 0.0
+        self.spike_left[idx] = 0
+        for i, pid, is_leak in zip(idx.tolist(), pids.tolist(), (self.leak[idx] > 0).tolist()):
+            name = "leaky" if is_leak else self._names[pid % len(self._names)]
+            self.names[i] = name
+            self.cmdlines[i] = (f"/usr/bin/{name}", f"--id={pid}")
+
+    def sample(self):
+        rng, n, tick = self.rng, self.n, self.tick
+        self.ts += tick
+        self._pace(self.ts)
+        gone = np.flatnonzero(rng.random(n) < self.churn)
+        self._spawn(gone)
+        starting = (self.spike_left == 0) & (rng.random(n) < self.spike_fraction * tick) & (self.base_cpu > 0)
+        self.spike_left[starting] = rng.integers(3, 30, int(starting.sum()))
+        spiking = self.spike_left > 0
+        cpu = np.where(self.base_cpu > 0, self.base_cpu * rng.uniform(0.5, 1.5, n), 0.0).astype(np.float32)
+        cpu[spiking] = rng.uniform(92.0, 100.0, int(spiking.sum()))
+        self.spike_left[spiking] -= 1
+        self.cpu_time += cpu / 100.0 * tick
+        self.rss += self.leak * tick
+        mem = (self.rss * 100.0 / self.total_mem).astype(np.float32)
+        status = np.where(cpu > 5.0, status_code("running"), status_code("sleeping")).astype(np.uint8)
+        snap = Snapshot(self.ts, self.pid.copy(), self.create_time.copy(), cpu, mem, status,
+                        list(self.names), list(self.cmdlines), self.cpu_time.copy(),
+                        self.rss.astype(np.int64), self.ppid.copy())
+        self.last = snap
+        return snap
+
+
+def open_source(spec="live"):
+    """Build a source from a command-line spec.
+
+    live | synthetic[:N] | replay:PATH | replay-loop:PATH | record:PATH (live, recorded)
+    Synthetic and replayed time runs at SIM_SPEEDUP times real time.
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "live":
+        return LiveSource()
+    if kind == "synthetic":
+        return SyntheticSource(int(arg) if arg else 10000, speedup=SIM_SPEEDUP)
+    if kind in ("replay", "replay-loop"):
+        return ReplaySource(arg, loop=kind == "replay-loop", speedup=SIM_SPEEDUP)
+    if kind == "record":
+        return RecordingSource(LiveSource(), arg)
+    raise ValueError(f"unknown process source: {spec}")
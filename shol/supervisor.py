@@ -0,0 +1,196 @@
+import os
+import secrets
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+from metrics import REGISTRY, start_publisher
+from readiness import READY_ENV, TOKEN_ENV
+from utils import log_event
+
+# Starts SHOL's services as child processes and keeps them running. A
+# service starts as soon as every service in its `after` list has reported
+# ready (readiness.notify_ready() over a loopback socket), so independent
+# services start in parallel and nothing waits on fixed sleeps. Crashed
+# children are restarted with exponential backoff; shutdown terminates
+# dependents before their dependencies and kills whatever outlives the
+# grace period.
+
+READY_TIMEOUT = 30.0     # a service that never reports ready is treated as ready after this
+RESTART_BACKOFF = 1.0    # first restart delay; doubles per crash within STABLE_AFTER
+MAX_RESTART_BACKOFF = 60.0
+STABLE_AFTER = 30.0      # a child that ran this long resets its backoff
+SHUTDOWN_GRACE = 5.0     # seconds each shutdown stage waits before kill()
+TICK = 0.1               # child exit checks between readiness messages
+
+STARTUP_SECONDS = REGISTRY.gauge("shol_service_startup_seconds", "Time from spawn to ready of each supervised service.")
+RESTARTS = REGISTRY.counter("shol_service_restarts_total", "Restarts of crashed supervised services.")
+
+
+class Service:
+    """One supervised child: its command, dependencies and current state."""
+
+    def __init__(self, name, argv, after=(), ready_timeout=READY_TIMEOUT):
+        self.name = name
+        self.argv = list(argv)
+        self.after = tuple(after)
+        self.ready_timeout = ready_timeout
+        self.proc = None
+        self.token = None
+        self.started = None       # monotonic spawn time of the current child
+        self.ready = False
+        self.startup = None       # seconds from spawn to ready, last launch
+        self.crashes = 0          # consecutive crashes within STABLE_AFTER
+        self.restarts = 0
+        self.next_start = 0.0     # monotonic time a restart may happen
+
+
+class Supervisor:
+    def __init__(self, services):
+        self.services = {s.name: s for s in services}
+        for s in services:
+            missing = [d for d in s.after if d not in self.services]
+            if missing:
+                raise ValueError(f"service {s.name} depends on unknown {missing}")
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.listener.setblocking(False)
+        self.address = "127.0.0.1:%d" % self.listener.getsockname()[1]
+        self.sel = selectors.DefaultSelector()
+        self.sel.register(self.listener, selectors.EVENT_READ)
+        self._stopping = False
+
+    # ---------------- children ----------------
+    def _spawn(self, s):
+        s.token = secrets.token_hex(8)
+        env = dict(os.environ, **{READY_ENV: self.address, TOKEN_ENV: s.token})
+        s.started = time.monotonic()
+        s.ready = False
+        s.proc = subprocess.Popen(s.argv, env=env)
+        print(f"[supervisor] started {s.name} (pid {s.proc.pid})", flush=True)
+
+    def _mark_ready(self, s, timed_out=False):
+        s.ready = True
+        s.startup = time.monotonic() - s.started
+        if timed_out:
+            print(f"[supervisor] {s.name} did not report ready within {s.ready_timeout:.0f}s; "
+                  "starting its dependents anyway", flush=True)
+            return
+        STARTUP_SECONDS.set(round(s.startup, 3), child=s.name)
+        print(f"[supervisor] {s.name} ready in {s.startup:.2f}s", flush=True)
+
+    def _startable(self, s, now):
+        return (s.proc is None and now >= s.next_start
+                and all(self.services[d].ready for d in s.after))
+
+    def _check(self, now):
+        for s in self.services.values():
+            if s.proc is None:
+                if self._startable(s, now):
+                    self._spawn(s)
+                continue
+            rc = s.proc.poll()
+            if rc is None:
+                if not s.ready and now - s.started > s.ready_timeout:
+                    self._mark_ready(s, timed_out=True)
+                continue
+            ran = now - s.started
+            s.crashes = s.crashes + 1 if ran < STABLE_AFTER else 0
+            delay = min(MAX_RESTART_BACKOFF, RESTART_BACKOFF * 2 ** max(s.crashes - 1, 0))
+            s.proc, s.ready, s.next_start = None, False, now + delay
+            s.restarts += 1
+            RESTARTS.inc(child=s.name)
+            log_event(f" Service {s.name} exited", f"code {rc} after {ran:.1f}s; restarting in {delay:.1f}s")
+            print(f"[supervisor] {s.name} exited with code {rc}; restarting in {delay:.1f}s", flush=True)
+
+    # ---------------- readiness ----------------
+    def _on_readable(self, key):
+        if key.fileobj is self.listener:
+            try:
+                conn, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            conn.setblocking(False)
+            self.sel.register(conn, selectors.EVENT_READ, b"")
+            return
+        conn, buf = key.fileobj, key.data
+        try:
+            chunk = conn.recv(256)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        buf += chunk
+        if chunk and b"\n" not in buf and len(buf) < 256:
+            self.sel.modify(conn, selectors.EVENT_READ, buf)
+            return
+        self.sel.unregister(conn)
+        conn.close()
+        parts = buf.decode("ascii", "replace").split()
+        if len(parts) == 2 and parts[0] == "READY":
+            for s in self.services.values():
+                if s.proc is not None and not s.ready and s.token == parts[1]:
+                    self._mark_ready(s)
+
+    # ---------------- main loop ----------------
+    def run(self):
+        """Supervise until SIGTERM or Ctrl+C, then shut everything down."""
+        start_publisher("supervisor")  # startup times and restarts on /metrics
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        t0 = time.monotonic()
+        reported = False
+        try:
+            while True:
+                now = time.monotonic()
+                self._check(now)
+                if not reported and all(s.ready for s in self.services.values()):
+                    reported = True
+                    self.report(time.monotonic() - t0)
+                for key, _ in self.sel.select(TICK):
+                    self._on_readable(key)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.shutdown()
+
+    def report(self, total):
+        print(f"\n[OK] All services ready in {total:.2f}s. Press Ctrl+C to stop everything.", flush=True)
+        for s in self.services.values():
+            print(f"     {s.name:<12} {s.startup:6.2f}s", flush=True)
+
+    def _stages(self):
+        """Service names grouped so that every service comes after all of its dependents."""
+        depth = {}
+
+        def level(name):
+            if name not in depth:
+                depth[name] = 0  # cycle guard
+                depth[name] = 1 + max((level(d) for d in self.services[name].after), default=-1)
+            return depth[name]
+
+        for name in self.services:
+            level(name)
+        return [[n for n in self.services if depth[n] == d] for d in range(max(depth.values()), -1, -1)]
+
+    def shutdown(self, grace=SHUTDOWN_GRACE):
+        """Terminate dependents first; each stage gets `grace` seconds before kill()."""
+        if self._stopping:
+            return
+        self._stopping = True
+        print("\n[supervisor] shutting down...", flush=True)
+        for stage in self._stages():
+            procs = [self.services[n].proc for n in stage if self.services[n].proc is not None]
+            for p in procs:
+                if p.poll() is None:
+                    p.terminate()
+            deadline = time.monotonic() + grace
+            for p in procs:
+                try:
+                    p.wait(max(0.0, deadline - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    p.kill()
+                    p.wait()
+        self.sel.close()
+        self.listener.close()
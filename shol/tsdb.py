@@ -0,0 +1,250 @@
+import os
+import time
+from pathlib import Path
+from urllib.parse import quote, unquote
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TSDB_DIR = BASE_DIR / "data" / "tsdb"
+
+MAGIC = 0x53484454  # "SHDT"
+FILE_VERSION = 1
+
+# (seconds per point, points kept): 1 s for 2 h, 1 min for 14 days, 1 h for ~13 months
+ARCHIVES = ((1, 7200), (60, 20160), (3600, 9600))
+MAX_SERIES = 256       # least recently updated series are deleted beyond this
+MAX_POINTS = 1000      # default resolution choice: finest archive returning <= this many points
+MAX_OPEN = 64          # memory-mapped files kept open
+
+HEADER = np.dtype([("magic", "<u4"), ("version", "<u4"), ("archives", "<u4"), ("pad", "<u4"),
+                   ("last_update", "<f8")])
+ARCHIVE_ENTRY = np.dtype([("resolution", "<u4"), ("rows", "<u4")])
+# one consolidated point; avg = sum / count
+POINT = np.dtype([("ts", "<f8"), ("count", "<u4"), ("pad", "<u4"), ("min", "<f8"),
+                  ("sum", "<f8"), ("max", "<f8"), ("last", "<f8")])
+
+
+def _file_size(archives):
+    return HEADER.itemsize + ARCHIVE_ENTRY.itemsize * len(archives) + POINT.itemsize * sum(r for _, r in archives)
+
+
+class Series:
+    """One fixed-size round-robin file with an archive per resolution.
+
+    Every sample updates one point in each archive (min/avg/max/last of the
+    interval it falls in), so the coarse archives are exact rollups and no
+    separate consolidation pass is needed. The file never grows.
+    """
+
+    def __init__(self, path, archives=ARCHIVES, create=False, writable=False):
+        self.path = path
+        if create and not path.exists():
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                f.truncate(_file_size(archives))
+            mm = np.memmap(tmp, np.uint8, "r+")
+            hdr = np.ndarray((), HEADER, mm, 0)
+            hdr["magic"], hdr["version"], hdr["archives"] = MAGIC, FILE_VERSION, len(archives)
+            table = np.ndarray(len(archives), ARCHIVE_ENTRY, mm, HEADER.itemsize)
+            table[:] = [tuple(a) for a in archives]
+            mm.flush()
+            del hdr, table, mm
+            os.replace(tmp, path)
+        self._mm = np.memmap(path, np.uint8, "r+" if create or writable else "r")
+        self.header = np.ndarray((), HEADER, self._mm, 0)
+        if int(self.header["magic"]) != MAGIC or int(self.header["version"]) != FILE_VERSION:
+            raise ValueError(f"not a SHOL time-series file: {path}")
+        n = int(self.header["archives"])
+        table = np.ndarray(n, ARCHIVE_ENTRY, self._mm, HEADER.itemsize)
+        self.archives = []
+        off = HEADER.itemsize + ARCHIVE_ENTRY.itemsize * n
+        for res, rows in table.tolist():
+            self.archives.append((res, rows, np.ndarray(rows, POINT, self._mm, off)))
+            off += POINT.itemsize * rows
+
+    @property
+    def last_update(self):
+        return float(self.header["last_update"])
+
+    def update(self, ts, value):
+        for res, rows, points in self.archives:
+            bucket = ts - ts % res
+            p = points[int(bucket // res) % rows]
+            if p["ts"] != bucket or p["count"] == 0:
+                p["ts"], p["count"] = bucket, 1
+                p["min"] = p["sum"] = p["max"] = value
+            else:
+                p["count"] += 1
+                p["sum"] += value
+                if value < p["min"]:
+                    p["min"] = value
+                if value > p["max"]:
+                    p["max"] = value
+            p["last"] = value
+        self.header["last_update"] = ts
+
+    def pick(self, start, end, max_points=MAX_POINTS, now=None):
+        """(resolution, rows, points) to answer [start, end]: the finest
+        archive that still covers `start` and yields <= max_points points."""
+        now = now or time.time()
+        covering = [a for a in self.archives if now - a[0] * a[1] <= start] or [self.archives[-1]]
+        for a in covering:
+            if (end - start) / a[0] <= max_points:
+                return a
+        return covering[-1]
+
+    def query(self, start, end, max_points=MAX_POINTS, now=None):
+        res, rows, points = self.pick(start, end, max_points, now)
+        sel = points[(points["count"] > 0) & (points["ts"] >= start - start % res) & (points["ts"] <= end)]
+        sel = np.sort(sel, order="ts")
+        return res, [
+            {"ts": t, "min": lo, "avg": s / c, "max": hi, "last": last}
+            for t, c, lo, s, hi, last in zip(sel["ts"].tolist(), sel["count"].tolist(), sel["min"].tolist(),
+                                             sel["sum"].tolist(), sel["max"].tolist(), sel["last"].tolist())
+        ]
+
+    def flush(self):
+        if self._mm.mode == "r+":
+            self._mm.flush()
+
+    def close(self):
+        self.flush()
+        self.header = self.archives = self._mm = None  # unmapped once the views are gone
+
+
+class MetricStore:
+    """RRD-style on-disk store: one Series file per metric name.
+
+    Disk use is bounded by MAX_SERIES fixed-size files (about 1.8 MB each
+    with the default archives); adding a series beyond that deletes the one
+    updated longest ago. Writers (sampler_service) open files read-write,
+    readers (api_server) read-only.
+    """
+
+    def __init__(self, path=TSDB_DIR, archives=ARCHIVES, max_series=MAX_SERIES, readonly=False):
+        self.path = Path(path)
+        self.archives = archives
+        self.max_series = max_series
+        self.readonly = readonly
+        self._open = {}  # name -> Series (insertion order = LRU)
+        self._updated = {}
+        if not readonly:
+            self.path.mkdir(parents=True, exist_ok=True)
+            for name in self.names():
+                try:
+                    self._updated[name] = self._get(name).last_update
+                except (OSError, ValueError):
+                    self._file(name).unlink(missing_ok=True)  # torn or foreign file
+
+    def _file(self, name):
+        return self.path / (quote(name, safe="") + ".rrd")
+
+    def names(self):
+        if not self.path.is_dir():
+            return []
+        return sorted(unquote(p.stem) for p in self.path.glob("*.rrd"))
+
+    def _get(self, name, create=False):
+        s = self._open.pop(name, None)
+        if s is None:
+            path = self._file(name)
+            if not create and not path.exists():
+                return None
+            s = Series(path, self.archives, create=create and not self.readonly, writable=not self.readonly)
+            if self.readonly:
+                return s  # the writer may evict and recreate files: never cache a mapping
+            while len(self._open) >= MAX_OPEN:
+                self._open.pop(next(iter(self._open))).close()
+        self._open[name] = s
+        return s
+
+    def _evict(self):
+        while len(self._updated) >= self.max_series:
+            oldest = min(self._updated, key=self._updated.get)
+            del self._updated[oldest]
+            s = self._open.pop(oldest, None)
+            if s is not None:
+                s.close()
+            self._file(oldest).unlink(missing_ok=True)
+
+    def update(self, ts, values):
+        """Record one sample per metric: `values` is {name: value}."""
+        for name, value in values.items():
+            if name not in self._updated:
+                self._evict()
+            self._get(name, create=True).update(ts, float(value))
+            self._updated[name] = ts
+
+    def query(self, name, start=None, end=None, max_points=MAX_POINTS):
+        """{"series", "resolution", "points": [{ts, min, avg, max, last}]}, or None.
+
+        The resolution is chosen automatically: the finest archive that still
+        reaches back to `start` and returns at most `max_points` points.
+        """
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        try:
+            s = self._get(name)
+        except (OSError, ValueError):
+            return None
+        if s is None:
+            return None
+        res, points = s.query(start, end, max_points)
+        return {"series": name, "resolution": res, "points": points}
+
+    def flush(self):
+        for s in self._open.values():
+            s.flush()
+
+    def close(self):
+        for s in self._open.values():
+            s.close()
+        self._open.clear()
+
+
+PROC_THRESHOLD = 1.0   # % cpu or mem at which a process name gets its own series
+PROC_IDLE_AFTER = 600.0  # seconds below the threshold after which a name stops being recorded
+
+
+class SnapshotRecorder:
+    """Feeds MetricStore from sampler snapshots.
+
+    Writes system.cpu / system.mem, and per process name (all instances
+    summed) proc.<name>.cpu / proc.<name>.mem once any instance reaches
+    `threshold` percent. The name is then recorded every tick, so short
+    dips leave no gaps, until it has stayed below the threshold for
+    `idle_after` seconds; its file is kept and queryable. Idle names never
+    get a file.
+    """
+
+    def __init__(self, store=None, threshold=PROC_THRESHOLD, idle_after=PROC_IDLE_AFTER):
+        self.store = store or MetricStore()
+        self.threshold = threshold
+        self.idle_after = idle_after
+        # name -> last time any instance was at or above the threshold
+        now = time.time()
+        self.tracked = {n.split(".", 1)[1].rsplit(".", 1)[0]: now
+                        for n in self.store.names() if n.startswith("proc.")}
+
+    def record(self, snap, sys_cpu, sys_mem):
+        values = {"system.cpu": sys_cpu, "system.mem": sys_mem}
+        hot = (snap.cpu >= self.threshold) | (snap.mem >= self.threshold)
+        tracked = self.tracked
+        for i in np.flatnonzero(hot).tolist():
+            if snap.names[i]:
+                tracked[snap.names[i]] = snap.ts
+        for name in [n for n, last in tracked.items() if snap.ts - last > self.idle_after]:
+            del tracked[name]  # quiet for a while: stop recording it
+        cpu, mem = {}, {}
+        for name, c, m in zip(snap.names, snap.cpu.tolist(), snap.mem.tolist()):
+            if name in tracked:
+                cpu[name] = cpu.get(name, 0.0) + c
+                mem[name] = mem.get(name, 0.0) + m
+        for name in tracked:
+            values[f"proc.{name}.cpu"] = cpu.get(name, 0.0)
+            values[f"proc.{name}.mem"] = mem.get(name, 0.0)
+        self.store.update(snap.ts, values)
+        # evicted series stop being tracked
+        if len(tracked) * 2 + 2 > self.store.max_series:
+            live = set(self.store._updated)
+            self.tracked = {n: last for n, last in tracked.items() if f"proc.{n}.cpu" in live}
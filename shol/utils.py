@@ -1,5 +1,6 @@
 import os, yaml, time, json, datetime
 from pathlib import Path
+from metrics import LOG_BYTES
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG_PATH = BASE_DIR / "config" / "services.yaml"
@@ -18,11 +19,22 @@ def now_str():
     import datetime
     return datetime.datetime.fromtimestamp(ts()).strftime("%Y-%m-%d %H:%M:%S")
 
-LOG_FILE = Path(__file__).resolve().parent.parent / "logs" / "events.log"
+LOG_FILE = Path(os.environ.get("SHOL_LOG_PATH") or Path(__file__).resolve().parent.parent / "logs" / "events.log")
+DRY_RUN_LOG_FILE = BASE_DIR / "logs" / "dry_run.log"
+
+
+def use_dry_run_log():
+    """Send this process's log_event() lines to logs/dry_run.log (unless
+    SHOL_LOG_PATH chose a file), keeping dry runs out of events.log."""
+    global LOG_FILE
+    if not os.environ.get("SHOL_LOG_PATH"):
+        LOG_FILE = DRY_RUN_LOG_FILE
 
 
 def log_event(event_type, details=""):
     """Logs an event with a timestamp and details into events.log"""
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    line = f"[{timestamp}] {event_type}: {details}\n"
     with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {event_type}: {details}\n")
+        f.write(line)
+    LOG_BYTES.inc(len(line.encode("utf-8")))
@@ -0,0 +1,230 @@
+import heapq
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+import psutil
+from metrics import REGISTRY
+from whitelist import ProcessMatcher
+
+# Crash detection for watched processes without periodic process-table
+# scans. Every watched pid gets an exit notification: on Linux a pidfd
+# (readable the moment the process exits, child or not) in one selector;
+# elsewhere a thread blocked in waitpid() for children SHOL started, and a
+# cheap pid_exists() poll for everything else. The process table is only
+# scanned at startup and when the last known instance of a watch exits
+# (to adopt instances started outside SHOL before restarting).
+
+HAS_PIDFD = hasattr(os, "pidfd_open")
+POLL_INTERVAL = 1.0      # liveness checks for pids without a pidfd or waiter
+STABLE_AFTER = 10.0      # a restart that lives this long resets the backoff
+RESTART_BACKOFF = 0.5    # first delay after a restart that crashed quickly
+MAX_RESTART_BACKOFF = 60.0
+
+RESTART_SECONDS = REGISTRY.histogram("shol_watch_restart_seconds",
+                                     "Time from noticing a watched process exit to its restart.")
+WATCHED = REGISTRY.gauge("shol_watched_pids", "Processes with an exit notification registered.")
+
+
+class ExitWatcher:
+    """Calls `callback(pid, returncode)` on the watcher thread when a pid exits.
+
+    `returncode` is only known for children passed in as a Popen; it is None
+    for other processes. `call_later()` schedules work on the same thread,
+    so callbacks never race each other.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.sel = selectors.DefaultSelector()
+        # a socketpair, not a pipe: select() on Windows only takes sockets
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.sel.register(self._wake_r, selectors.EVENT_READ)
+        self._waiting = 0              # children with a waiter thread
+        self._posted = deque()         # callables handed over from other threads
+        self._timers = []              # heap of (due, seq, fn)
+        self._seq = 0
+        self._polled = {}              # pid -> callback (fallback path)
+        self._next_poll = 0.0
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self.sel.get_map()) - 1 + len(self._polled) + self._waiting
+
+    def watch(self, pid, callback, popen=None):
+        """Start watching `pid` (`popen` if SHOL started it). Call from the watcher thread."""
+        if HAS_PIDFD:
+            try:
+                fd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                self.call_later(0, lambda: callback(pid, popen.wait() if popen else None))
+                return
+            except OSError:
+                fd = None              # kernel without pidfd support
+            if fd is not None:
+                self.sel.register(fd, selectors.EVENT_READ, (pid, callback, popen))
+                return
+        if popen is not None:
+            self._waiting += 1
+            threading.Thread(target=self._wait_child, args=(popen, callback), name=f"wait-{pid}",
+                             daemon=True).start()
+        else:
+            self._polled[pid] = callback
+
+    def _wait_child(self, popen, callback):
+        rc = popen.wait()              # waitpid(): returns the moment the child exits
+
+        def done():
+            self._waiting -= 1
+            callback(popen.pid, rc)
+        self.post(done)
+
+    def post(self, fn):
+        """Run `fn` on the watcher thread as soon as possible (thread-safe)."""
+        self._posted.append(fn)
+        try:
+            self._wake_w.send(b"\0")
+        except BlockingIOError:
+            pass                       # a wake-up is already pending
+
+    def call_later(self, delay, fn):
+        self._seq += 1
+        heapq.heappush(self._timers, (time.monotonic() + delay, self._seq, fn))
+
+    def _timeout(self):
+        due = []
+        if self._timers:
+            due.append(self._timers[0][0])
+        if self._polled:
+            due.append(self._next_poll)
+        return max(0.0, min(due) - time.monotonic()) if due else None
+
+    def _poll_fallback(self):
+        now = time.monotonic()
+        if not self._polled or now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+        for pid in [p for p in self._polled if not psutil.pid_exists(p)]:
+            self._polled.pop(pid)(pid, None)
+
+    def run_once(self, timeout=None):
+        t = self._timeout()
+        t = timeout if t is None else (t if timeout is None else min(t, timeout))
+        for key, _ in self.sel.select(t):
+            if key.fileobj is self._wake_r:
+                try:
+                    while self._wake_r.recv(4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            pid, callback, popen = key.data
+            self.sel.unregister(key.fd)
+            os.close(key.fd)
+            callback(pid, popen.wait() if popen is not None else None)
+        while self._posted:
+            self._posted.popleft()()
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            heapq.heappop(self._timers)[2]()
+        self._poll_fallback()
+        WATCHED.set(len(self))
+
+    def run(self):
+        while not self._stop.is_set():
+            self.run_once()
+
+    def stop(self):
+        self._stop.set()
+        self.post(lambda: None)
+
+
+class CrashWatcher:
+    """Keeps the processes in `watched` running, restarting them on exit.
+
+    `watched` maps an entry in whitelist syntax ("notepad.exe", "python*",
+    "cmdline:<regex>") to the command that starts it. `restart(command, key,
+    cause)` must return the new Popen (or None if it failed to start).
+    Restarts of an instance that keeps crashing back off exponentially.
+    """
+
+    def __init__(self, watched, restart, exits=None):
+        self.watched = dict(watched)
+        self.restart = restart
+        self.exits = exits or ExitWatcher()
+        self.matchers = {key: ProcessMatcher(defaults=[key]) for key in self.watched}
+        self.index = {key: set() for key in self.watched}   # watch key -> live pids
+        self.restarts = {}             # watch key -> (consecutive quick crashes, last restart time)
+        self._pending = set()          # keys with a restart scheduled
+
+    # ---------------- index ----------------
+    def _scan(self, keys):
+        """Pids currently matching each of `keys` (one process_iter pass)."""
+        found = {key: set() for key in keys}
+        attrs = ["name", "status"] + (["cmdline"] if any(k.lower().startswith("cmdline:") for k in keys) else [])
+        for p in psutil.process_iter(attrs):
+            if p.info["status"] == psutil.STATUS_ZOMBIE:
+                continue               # exited, just not reaped by its parent yet
+            name, cmdline = p.info["name"], p.info.get("cmdline") or ()
+            for key in keys:
+                if self.matchers[key].matches(name, cmdline):
+                    found[key].add(p.pid)
+        return found
+
+    def _adopt(self, key, pids, popen=None):
+        for pid in pids - self.index[key]:
+            self.index[key].add(pid)
+            self.exits.watch(pid, lambda pid, rc, key=key: self._on_exit(key, pid, rc),
+                             popen if popen is not None and popen.pid == pid else None)
+
+    # ---------------- events ----------------
+    def start(self):
+        """Index running instances and start whatever isn't running."""
+        for key, pids in self._scan(list(self.watched)).items():
+            self._adopt(key, pids)
+            if not pids:
+                self._restart(key, "Process not found / crashed", time.monotonic())
+
+    def _on_exit(self, key, pid, returncode):
+        noticed = time.monotonic()
+        self.index[key].discard(pid)
+        if self.index[key] or key in self._pending:
+            return
+        self._adopt(key, self._scan([key])[key])  # started outside SHOL meanwhile?
+        if self.index[key]:
+            return
+        cause = "Process exited" if returncode is None else f"Process exited with code {returncode}"
+        quick, last = self.restarts.get(key, (0, None))
+        if last is not None and noticed - last < STABLE_AFTER:
+            self._retry(key, cause, noticed)  # crashed again soon after our restart
+        else:
+            self.restarts[key] = (0, last)
+            self._restart(key, cause, noticed)
+
+    def _retry(self, key, cause, noticed):
+        quick, last = self.restarts.get(key, (0, None))
+        self.restarts[key] = (quick + 1, last)
+        self._pending.add(key)
+        self.exits.call_later(min(MAX_RESTART_BACKOFF, RESTART_BACKOFF * 2 ** quick),
+                              lambda: self._restart(key, cause, noticed))
+
+    def _restart(self, key, cause, noticed):
+        self._pending.discard(key)
+        if self.index[key]:
+            return
+        popen = self.restart(self.watched[key], key, cause)
+        now = time.monotonic()
+        self.restarts[key] = (self.restarts.get(key, (0, None))[0], now)
+        if popen is None:
+            self._retry(key, cause, noticed)  # failed to start
+            return
+        RESTART_SECONDS.observe(now - noticed)
+        self._adopt(key, {popen.pid}, popen)
+
+    def run(self):
+        self.start()
+        self.exits.run()
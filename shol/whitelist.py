@@ -0,0 +1,231 @@
+import fnmatch
+import json
+import os
+import re
+import time
+from pathlib import Path
+from utils import log_event
+
+# inotify is optional; without it reloads are driven by a throttled stat()
+try:
+    from inotify_simple import INotify, flags as _inotify_flags
+    _INOTIFY_AVAILABLE = True
+except Exception:
+    _INOTIFY_AVAILABLE = False
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+WHITELIST_FILE = BASE_DIR / "data" / "whitelist.json"
+IGNORE_FILE = BASE_DIR / "data" / "ignore.json"
+
+# 🔒 System processes never touched (used when data/ignore.json does not exist)
+DEFAULT_IGNORE = [
+    "System", "Registry", "svchost.exe", "smss.exe",
+    "wininit.exe", "lsass.exe", "csrss.exe", "services.exe"
+]
+
+CHECK_INTERVAL = 1.0   # seconds between stat() checks when inotify is unavailable
+_CACHE_MAX = 50000
+_GLOB_CHARS = set("*?[")
+
+
+def invalid_entries(entries):
+    """`cmdline:` entries whose pattern is not a valid regex."""
+    bad = []
+    for e in entries:
+        e = str(e).strip()
+        if e.lower().startswith("cmdline:"):
+            try:
+                re.compile(f"(?:{e[8:]})", re.IGNORECASE)
+            except re.error:
+                bad.append(e)
+    return bad
+
+
+def _alternation(patterns):
+    """One case-insensitive regex searching for any of `patterns` (each valid on its own)."""
+    if not patterns:
+        return None
+    try:
+        return re.compile("|".join(patterns), re.IGNORECASE)
+    except re.error:
+        # valid alone but not joined (e.g. the same group name in two entries)
+        compiled = [re.compile(p, re.IGNORECASE) for p in patterns]
+        return _AnyOf(compiled)
+
+
+class _AnyOf:
+    """`search()` over several regexes, for lists that can't be joined into one."""
+
+    def __init__(self, regexes):
+        self.regexes = regexes
+
+    def search(self, text):
+        return any(r.search(text) for r in self.regexes)
+
+
+class ProcessMatcher:
+    """Compiled whitelist/ignore list with change-driven reload.
+
+    Entries in the JSON list can be:
+      "chrome.exe"          exact process name (case-insensitive)
+      "python*"             glob on the process name
+      "cmdline:<regex>"     regex searched in the joined command line
+    All exact names go into one set and all globs / regexes into one
+    alternation each, so a check is a set lookup plus at most two regex
+    runs; name results are memoized, making repeat checks O(1).
+    """
+
+    def __init__(self, path=None, defaults=()):
+        self.path = Path(path) if path else None
+        self.defaults = list(defaults)
+        self.entries = []
+        self._stamp = None
+        self._next_check = 0.0
+        self._inotify = None
+        if self.path and _INOTIFY_AVAILABLE:
+            try:
+                self._inotify = INotify()
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # watch the directory: editors and save() replace the file
+                self._inotify.add_watch(str(self.path.parent), _inotify_flags.CLOSE_WRITE | _inotify_flags.MOVED_TO
+                                        | _inotify_flags.CREATE | _inotify_flags.DELETE)
+            except Exception:
+                self._inotify = None
+        self._compile(self.defaults)
+        self.refresh(force=True)
+
+    # ---------------- compile ----------------
+    def _compile(self, entries):
+        exact, globs, cmd = set(), [], []
+        for e in entries:
+            e = str(e).strip()
+            if not e:
+                continue
+            if e.lower().startswith("cmdline:"):
+                pattern = f"(?:{e[8:]})"
+                try:
+                    re.compile(pattern, re.IGNORECASE)
+                except re.error as err:
+                    # one bad pattern must not take down every service reloading this list
+                    log_event(" Ignoring invalid whitelist entry", f"{e!r} in {self.path}: {err}")
+                    continue
+                cmd.append(pattern)
+            elif _GLOB_CHARS & set(e):
+                globs.append(fnmatch.translate(e.lower()))
+            else:
+                exact.add(e.lower())
+        self.entries = list(entries)
+        self._exact = frozenset(exact)
+        self._glob = re.compile("|".join(globs), re.IGNORECASE) if globs else None
+        self._cmd = _alternation(cmd)
+        self._name_cache = {}
+
+    # ---------------- reload ----------------
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            return None
+
+    def _changed_hint(self):
+        """False when we can cheaply tell the file did not change."""
+        if self._inotify is not None:
+            try:
+                name = self.path.name
+                return any(ev.name == name for ev in self._inotify.read(timeout=0))
+            except Exception:
+                self._inotify = None
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + CHECK_INTERVAL
+        return True
+
+    def refresh(self, force=False):
+        """Reload if the file changed since the last load; returns True if it did."""
+        if self.path is None or (not force and not self._changed_hint()):
+            return False
+        stamp = self._file_stamp()
+        if stamp == self._stamp and not force:
+            return False
+        self._stamp = stamp
+        if stamp is None:
+            self._compile(self.defaults)
+            return True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._compile(data if isinstance(data, list) else self.defaults)
+        except (OSError, ValueError):
+            return False  # keep the last good list while the file is mid-write
+        return True
+
+    # ---------------- match ----------------
+    def matches(self, name, cmdline=()):
+        """True if the process name (or its command line) is listed."""
+        if name:
+            hit = self._name_cache.get(name)
+            if hit is None:
+                key = name.strip().lower()
+                hit = key in self._exact or bool(self._glob and self._glob.match(key))
+                if len(self._name_cache) > _CACHE_MAX:
+                    self._name_cache.clear()
+                self._name_cache[name] = hit
+            if hit:
+                return True
+        if self._cmd is not None and cmdline:
+            if not isinstance(cmdline, str):
+                cmdline = " ".join(cmdline)
+            return bool(self._cmd.search(cmdline))
+        return False
+
+    __contains__ = matches
+
+    # ---------------- edit ----------------
+    def save(self, entries):
+        """Replace the list on disk atomically and recompile.
+
+        Raises ValueError (and writes nothing) if a `cmdline:` entry is not
+        a valid regex.
+        """
+        bad = invalid_entries(entries)
+        if bad:
+            raise ValueError(f"invalid cmdline regex: {', '.join(bad)}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(entries), f, indent=2)
+        os.replace(tmp, self.path)
+        self._compile(list(entries))
+        self._stamp = self._file_stamp()
+
+    def add(self, entry):
+        if entry not in self.entries:
+            self.save(self.entries + [entry])
+
+    def remove(self, entry):
+        if entry in self.entries:
+            self.save([e for e in self.entries if e != entry])
+
+
+_whitelist = None
+_ignore = None
+
+def whitelist():
+    """The shared user whitelist (data/whitelist.json), refreshed if it changed."""
+    global _whitelist
+    if _whitelist is None:
+        _whitelist = ProcessMatcher(WHITELIST_FILE)
+    else:
+        _whitelist.refresh()
+    return _whitelist
+
+def ignore_list():
+    """System processes SHOL never acts on (data/ignore.json or DEFAULT_IGNORE)."""
+    global _ignore
+    if _ignore is None:
+        _ignore = ProcessMatcher(IGNORE_FILE, defaults=DEFAULT_IGNORE)
+    else:
+        _ignore.refresh()
+    return _ignore
@@ -0,0 +1,152 @@
+import json
+import socket
+import struct
+import zlib
+import numpy as np
+
+# Agent -> collector stream (see agent.py / collector.py). Every frame is a
+# 5-byte header (body length, frame type) followed by a zlib-compressed
+# body. Process snapshots are delta-encoded against the previous snapshot
+# sent on the same connection: only rows that appeared, disappeared or
+# changed after quantization are on the wire, and name/cmdline travel once
+# per process. The first snapshot after (re)connecting is a keyframe.
+
+HELLO, SNAPSHOT, EVENTS = 1, 2, 3
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 7070
+MAX_FRAME = 64 << 20
+_FRAME = struct.Struct("<IB")
+HEADER_SIZE = _FRAME.size
+_LEN = struct.Struct("<I")
+
+# quantized per-row values, one int64 column each in the encoder/decoder state
+Q_CPU, Q_MEM, Q_STATUS, Q_CPU_TIME, Q_RSS, Q_PPID = range(6)
+# wire dtype of each quantized column, in order
+Q_WIRE = (np.uint16, np.uint16, np.uint8, np.int64, np.int64, np.int64)
+CPU_SCALE = 10      # cpu% in tenths
+MEM_SCALE = 100     # mem% in hundredths
+CPU_TIME_SCALE = 100  # CPU seconds in centiseconds
+RSS_SHIFT = 12      # rss in 4 KiB pages
+
+
+class WireError(Exception):
+    """Malformed frame, or a delta that doesn't apply to the receiver's state."""
+
+
+def parse_address(spec):
+    """'tcp://host:port', 'host:port' or 'unix:///path' -> (family, address)."""
+    if spec.startswith("unix://"):
+        return socket.AF_UNIX, spec[len("unix://"):]
+    host, _, port = spec.removeprefix("tcp://").rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port or DEFAULT_PORT))
+
+
+def frame(kind, body, level=1):
+    payload = zlib.compress(body, level)
+    return _FRAME.pack(len(payload), kind) + payload
+
+
+def json_frame(kind, obj):
+    return frame(kind, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+
+
+def parse_header(raw):
+    """(payload length, frame type) from the 5 header bytes."""
+    size, kind = _FRAME.unpack(raw)
+    if size > MAX_FRAME:
+        raise WireError(f"frame of {size} bytes exceeds MAX_FRAME")
+    return size, kind
+
+
+def body(payload):
+    try:
+        return zlib.decompress(payload)
+    except zlib.error as e:
+        raise WireError(f"bad frame payload: {e}") from None
+
+
+def quantize(snap):
+    """(n, 6) int64 matrix of the values shipped per row."""
+    q = np.empty((len(snap), 6), np.int64)
+    q[:, Q_CPU] = np.rint(snap.cpu * CPU_SCALE).clip(0, 65535)
+    q[:, Q_MEM] = np.rint(snap.mem * MEM_SCALE).clip(0, 65535)
+    q[:, Q_STATUS] = snap.status
+    q[:, Q_CPU_TIME] = np.rint(snap.cpu_time * CPU_TIME_SCALE)
+    q[:, Q_RSS] = snap.rss >> RSS_SHIFT
+    q[:, Q_PPID] = snap.ppid
+    return q
+
+
+class SnapshotEncoder:
+    """Delta-encodes successive Snapshots for one connection.
+
+    State is what the receiver has after applying everything encoded so
+    far, sorted by pid; `reset()` (on every new connection) makes the next
+    snapshot a keyframe.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pid = np.empty(0, np.int64)
+        self.create_time = np.empty(0, np.float64)
+        self.q = np.empty((0, 6), np.int64)
+        self.keyframe = True
+
+    def encode(self, snap, sys_stats=None):
+        """Uncompressed SNAPSHOT body; `sys_stats` is (cpu%, mem%) or None."""
+        order = np.argsort(snap.pid, kind="stable")
+        pid, ct, q = snap.pid[order], snap.create_time[order], quantize(snap)[order]
+        prev_pid = self.pid
+        pos = np.searchsorted(prev_pid, pid).clip(0, max(len(prev_pid) - 1, 0))
+        same = np.zeros(len(pid), np.bool_)
+        if len(prev_pid):
+            same = (prev_pid[pos] == pid) & (self.create_time[pos] == ct)
+        changed = ~same
+        changed[same] = (self.q[pos[same]] != q[same]).any(axis=1)
+        kept = np.zeros(len(prev_pid), np.bool_)
+        kept[pos[same]] = True
+        removed = prev_pid[~kept]
+
+        idx = np.flatnonzero(changed)
+        new = ~same[idx]
+        strings = [[snap.names[order[i]], list(snap.cmdlines[order[i]])] for i in idx[new].tolist()]
+        head = {"ts": snap.ts, "key": self.keyframe, "sys": sys_stats, "n": len(pid),
+                "removed": len(removed), "changed": len(idx), "new": strings}
+        parts = [removed.astype(np.int64).tobytes(), pid[idx].tobytes(), ct[idx].tobytes(),
+                 new.astype(np.uint8).tobytes()]
+        parts += [q[idx, c].astype(dtype).tobytes() for c, dtype in enumerate(Q_WIRE)]
+        head = json.dumps(head, separators=(",", ":")).encode("utf-8")
+
+        self.pid, self.create_time, self.q = pid, ct, q
+        self.keyframe = False
+        return _LEN.pack(len(head)) + head + b"".join(parts)
+
+
+def decode_snapshot(raw):
+    """(head, removed pids, changed columns) of one SNAPSHOT body."""
+    try:
+        (hlen,) = _LEN.unpack_from(raw)
+        head = json.loads(raw[_LEN.size:_LEN.size + hlen])
+        pos = _LEN.size + hlen
+
+        def take(dtype, n):
+            nonlocal pos
+            arr = np.frombuffer(raw, dtype, n, pos)
+            pos += arr.nbytes
+            return arr
+
+        removed = take(np.int64, head["removed"])
+        m = head["changed"]
+        cols = {"pid": take(np.int64, m), "create_time": take(np.float64, m),
+                "new": take(np.uint8, m).astype(np.bool_)}
+        q = np.empty((m, 6), np.int64)
+        for c, dtype in enumerate(Q_WIRE):
+            q[:, c] = take(dtype, m)
+        cols["q"] = q
+    except (ValueError, KeyError, struct.error) as e:
+        raise WireError(f"bad snapshot frame: {e}") from None
+    if int(cols["new"].sum()) != len(head["new"]):
+        raise WireError("snapshot frame: new-row strings don't match the new-row flags")
+    return head, removed, cols
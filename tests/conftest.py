@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+import tempfile
+import pytest
+
+# shol/ modules import each other as top-level modules (as when run as scripts)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "shol"))
+
+# events written by the code under test stay out of the real log and database
+_TMP = tempfile.mkdtemp(prefix="shol-tests-")
+os.environ.setdefault("SHOL_DB_PATH", os.path.join(_TMP, "events.db"))
+os.environ.setdefault("SHOL_LOG_PATH", os.path.join(_TMP, "events.log"))
+
+
+@pytest.fixture
+def child():
+    """A sleeping child process; tests may kill it, teardown reaps it either way."""
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    yield proc
+    proc.kill()
+    proc.wait()
@@ -0,0 +1,34 @@
+import numpy as np
+from history import ColumnarHistory
+
+
+def test_recycled_pid_gets_a_fresh_slot():
+    h = ColumnarHistory(history_len=4, capacity=2)
+    old = h.append(10, 1.0, "old", ["old"], 50.0, 1.0, "running", ts=1.0)
+    h.append(10, 1.0, "old", ["old"], 60.0, 1.0, "running", ts=2.0)
+    # same pid, new create_time: the old incarnation is released first
+    new = h.append(10, 2.0, "new", ["new"], 5.0, 2.0, "sleeping", ts=3.0)
+    assert new == old  # its slot was freed and reused
+    assert h.index == {(10, 2.0): new} and h.pid_slot == {10: new}
+    assert h.series(new).tolist() == [5.0]  # no samples inherited
+    assert h.latest(new)["name"] == "new"
+
+
+def test_released_slots_are_reused_before_growing():
+    h = ColumnarHistory(history_len=4, capacity=2)
+    a = h.append(1, 1.0, "a", (), 1.0, 1.0, "running", ts=1.0)
+    h.append(2, 1.0, "b", (), 1.0, 1.0, "running", ts=1.0)
+    h.release(a)
+    assert h.latest(a) is None
+    c = h.append(3, 1.0, "c", (), 1.0, 1.0, "running", ts=2.0)
+    assert c == a and h.capacity == 2
+    h.append(4, 1.0, "d", (), 1.0, 1.0, "running", ts=2.0)  # full: grows, keeping data
+    assert h.capacity > 2 and h.latest(c)["name"] == "c"
+
+
+def test_ring_wraps_in_chronological_order():
+    h = ColumnarHistory(history_len=3)
+    for i in range(5):
+        slot = h.append(7, 1.0, "p", (), float(i), 0.0, "running", ts=float(i))
+    assert h.count[slot] == 3
+    assert np.array_equal(h.series(slot), [2.0, 3.0, 4.0])
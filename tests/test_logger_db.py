@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine
+from shol.logger_db import compact_events, events, events_hourly, metadata, query_events
+
+
+def _engine(rows):
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(events.insert(), rows)
+    return engine
+
+
+def test_keyset_pages_cover_every_row_once():
+    # many rows share a timestamp, so the id tiebreak matters
+    rows = [dict(ts=float(i // 3), pid=i, proc_name="a" if i % 2 else "b", issue="high_cpu") for i in range(50)]
+    engine = _engine(rows)
+    with engine.connect() as conn:
+        seen, before = [], {}
+        while True:
+            page = query_events(limit=7, conn=conn, **before)
+            if not page:
+                break
+            seen.extend(page)
+            before = dict(before_ts=page[-1]["ts"], before_id=page[-1]["id"])
+        assert [r["pid"] for r in seen] == list(range(49, -1, -1))
+
+        only_a = query_events(limit=100, proc_name="a", conn=conn)
+        assert [r["pid"] for r in only_a] == list(range(49, 0, -2))
+
+
+def test_compaction_rolls_old_rows_into_hours():
+    day = 86400.0
+    rows = [dict(ts=3600.0 * 5 + i, proc_name="a", issue="high_cpu") for i in range(4)]
+    rows.append(dict(ts=30 * day, proc_name="a", issue="high_cpu"))
+    engine = _engine(rows)
+    with engine.begin() as conn:
+        assert compact_events(retention_days=14, now=31 * day, conn=conn) == 4
+    with engine.connect() as conn:
+        assert [r["ts"] for r in query_events(conn=conn)] == [30 * day]
+        hourly = [dict(r) for r in conn.execute(events_hourly.select()).mappings()]
+    assert hourly == [dict(hour=3600.0 * 5, proc_name="a", issue="high_cpu", count=4,
+                           first_ts=3600.0 * 5, last_ts=3600.0 * 5 + 3)]
@@ -0,0 +1,46 @@
+import pytest
+from shol import main_service
+from shol.logger_db import query_events, writer
+from sources import RecordingSource, ReplaySource, SyntheticSource
+
+FRAMES = 8
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """A short synthetic recording; main_service runs over it until EOF."""
+    path = str(tmp_path / "synthetic.rec")
+    rec = RecordingSource(SyntheticSource(500, seed=1), path)
+    for _ in range(FRAMES):
+        rec.sample()
+    rec.close()
+    monkeypatch.setattr(main_service, "start_publisher", lambda service: None)
+    monkeypatch.setattr(main_service, "restart_proc", lambda info: pytest.fail("restart in a dry run"))
+    return path
+
+
+def test_dry_run_over_a_recording(recording):
+    main_service.run_forever(ReplaySource(recording), dry_run=True)  # returns at the end of the recording
+
+    writer.flush()
+    actions = query_events(limit=1000, issue="action")
+    assert actions and all(r["detail"] == "dry-run: would restart" for r in actions)
+
+
+def test_hot_polls_log_only_new_issues(recording, monkeypatch):
+    # the first poll scans, every later frame is a hot refresh
+    polls = iter(["scan"] + ["hot"] * (FRAMES - 1))
+
+    def poll(self, ph):
+        ph.sample()
+        return next(polls)
+
+    logged = []
+    monkeypatch.setattr(main_service.AdaptiveScheduler, "poll", poll)
+    monkeypatch.setattr(main_service.AdaptiveScheduler, "wait", lambda self, busy=False: None)
+    monkeypatch.setattr(main_service, "log_event", lambda pid, name, issue, **kw: logged.append((pid, issue)))
+
+    main_service.run_forever(ReplaySource(recording), dry_run=True)
+
+    issues = [key for key in logged if key[1] != "action"]
+    assert issues and len(issues) == len(set(issues))
@@ -0,0 +1,11 @@
+import json
+from optimization_store import OptimizationStore
+
+
+def test_legacy_files_imported_once(tmp_path):
+    legacy = tmp_path / "optimization_data.json"
+    legacy.write_text(json.dumps([{"timestamp": t, "process": "p"} for t in (3, 1, 2)]))
+    # services starting together each open the store and try the migration
+    stores = [OptimizationStore(tmp_path / "store") for _ in range(3)]
+    assert [s.import_legacy([legacy]) for s in stores] == [3, 0, 0]
+    assert [r["timestamp"] for r in stores[0].last(10)] == [1, 2, 3]
@@ -0,0 +1,13 @@
+from monitor import ProcessHistory
+from proc_diff import ProcessDiff
+from snapshot_cache import SnapshotCache
+
+
+def test_exited_process_removed_once(child):
+    cache = SnapshotCache(ProcessHistory(shared=False))
+    diff = ProcessDiff()
+    assert child.pid in {r["pid"] for r in diff.full(cache.refresh().procs)}
+    child.kill()
+    child.wait()
+    assert diff.diff(cache.refresh().procs)["removed"].count(child.pid) == 1
+    assert child.pid not in diff.diff(cache.refresh().procs)["removed"]
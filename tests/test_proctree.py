@@ -0,0 +1,65 @@
+import pytest
+from history import ColumnarHistory
+from monitor import ProcessHistory
+from proctree import ProcessTree
+from sources import SyntheticSource
+
+
+def brute_force(snap):
+    """pid -> (size, cpu, mem) of its subtree, from one snapshot's ppid links."""
+    ct = dict(zip(snap.pid.tolist(), snap.create_time.tolist()))
+    children = {pid: [] for pid in ct}
+    for pid, ppid in zip(snap.pid.tolist(), snap.ppid.tolist()):
+        if ppid != pid and ppid in ct and ct[ppid] <= ct[pid]:
+            children[ppid].append(pid)
+    row = {pid: (1, c, m) for pid, c, m in zip(snap.pid.tolist(), snap.cpu.tolist(), snap.mem.tolist())}
+
+    def total(pid):
+        size, cpu, mem = row[pid]
+        for child in children[pid]:
+            s, c, m = total(child)
+            size, cpu, mem = size + s, cpu + c, mem + m
+        return size, cpu, mem
+
+    return {pid: total(pid) for pid in ct}
+
+
+def test_rollups_match_a_recount_under_churn():
+    ph = ProcessHistory(source=SyntheticSource(1000, seed=2, churn=0.02))
+    for _ in range(15):
+        snap = ph.sample()
+        ph.cleanup_dead()
+        expected = brute_force(snap)
+        for pid, slot in ph.store.pid_slot.items():
+            got = ph.tree.rollup(slot)
+            size, cpu, mem = expected[pid]
+            assert got["size"] == size
+            assert got["cpu"] == pytest.approx(cpu, rel=1e-4, abs=1e-3)
+            assert got["mem"] == pytest.approx(mem, rel=1e-4, abs=1e-3)
+
+
+def _append(store, rows, ts):
+    """rows: (pid, create_time, ppid, name, cpu)"""
+    slots = [store.slot_for(pid, ct, name) for pid, ct, _, name, _ in rows]
+    store.append_many(slots, ts, [r[4] for r in rows], [1.0] * len(rows), [1] * len(rows),
+                      ppid=[r[2] for r in rows])
+    return slots
+
+
+def test_parent_exit_and_pid_reuse():
+    store = ColumnarHistory(history_len=4)
+    tree = ProcessTree(store)
+    # child sampled before its parent: linked once the parent shows up
+    _append(store, [(11, 2.0, 10, "chrome", 30.0), (12, 2.0, 10, "chrome", 40.0)], 1.0)
+    root, _, _ = _append(store, [(10, 1.0, 1, "chrome", 50.0), (11, 2.0, 10, "chrome", 30.0),
+                                 (12, 2.0, 10, "chrome", 40.0)], 2.0)
+    assert tree.subtree_pids(10)[0] == 10 and sorted(tree.subtree_pids(10)) == [10, 11, 12]
+    assert tree.heavy_families(cpu=100.0) == [(root, {"size": 3, "cpu": 120.0, "mem": 3.0})]
+    assert tree.heavy_families(cpu=200.0) == []
+    # the parent exits and its pid is reused by a younger process: no adoption
+    store.release(root)
+    _append(store, [(10, 9.0, 1, "chrome", 5.0), (11, 2.0, 10, "chrome", 30.0),
+                    (12, 2.0, 10, "chrome", 40.0)], 3.0)
+    assert tree.subtree_pids(10) == [10]
+    assert tree.rollup(store.pid_slot[11]) == {"size": 1, "cpu": 30.0, "mem": 1.0}
+    assert tree.family_roots() == []
@@ -0,0 +1,47 @@
+import numpy as np
+from history import ColumnarHistory, STATUS_NAMES
+from rules import Rule, RuleEngine
+
+RULES = (
+    Rule("idle", "cpu", "==", 0, min_count=3, window=None),
+    Rule("busy", "cpu", ">", 80, min_count=2, window=4),
+    Rule("big", "mem", ">=", 50),
+    Rule("zombie", "status", "==", "zombie", min_count=2, window=3),
+)
+
+
+def brute_force(store, rules):
+    out = []
+    for rule in rules:
+        w = store.history_len if rule.window is None else min(rule.window, store.history_len)
+        for slot in store.active_slots().tolist():
+            recent = store.series(slot, rule.metric)[-w:]
+            if np.count_nonzero(rule.test(recent)) >= rule.min_count:
+                out.append((slot, rule.issue))
+    return sorted(out)
+
+
+def test_counters_match_brute_force():
+    rng = np.random.default_rng(7)
+    store = ColumnarHistory(history_len=6, capacity=4)
+    engine = RuleEngine(store, RULES[:3])
+    create = {pid: 1.0 for pid in range(20)}
+    fired = set()
+    for tick in range(200):
+        if tick == 50:
+            engine.add_rule(RULES[3])  # seeded from the history already stored
+        for pid in rng.choice(20, 3, replace=False).tolist():
+            if rng.random() < 0.2:
+                create[pid] += 1.0  # pid recycled by a new process
+            elif rng.random() < 0.1 and pid in store.pid_slot:
+                store.release(store.pid_slot[pid])
+        pids = sorted(rng.choice(20, 12, replace=False).tolist())
+        slots = [store.slot_for(pid, create[pid], f"p{pid}") for pid in pids]
+        store.append_many(slots, float(tick),
+                          np.where(rng.random(12) < 0.4, 0.0, rng.uniform(0, 100, 12)),
+                          rng.uniform(0, 100, 12),
+                          rng.choice([STATUS_NAMES.index("running"), STATUS_NAMES.index("zombie")], 12))
+        expected = brute_force(store, engine.rules)
+        assert sorted(engine.evaluate()) == expected
+        fired.update(issue for _, issue in expected)
+    assert fired == {rule.issue for rule in RULES}
@@ -0,0 +1,64 @@
+import os
+import pytest
+from sampler import Snapshot
+from shared_snapshot import FRAMES, SharedFrame, SnapshotReader, SnapshotWriter
+
+
+def _snap(tick, n=3):
+    pids = [tick * 100 + i for i in range(n)]
+    return Snapshot(float(tick), pids, [1.0] * n, [float(tick)] * n, [0.5] * n, [1] * n,
+                    [f"p{p}" for p in pids], [("/bin/p", str(p)) for p in pids])
+
+
+@pytest.fixture
+def segment():
+    writer = SnapshotWriter(name=f"shol_test_{os.getpid()}", frames=FRAMES, max_rows=64, blob_bytes=4096)
+    # same mapping as the writer, so no second attach (and resource tracker entry) is needed
+    reader = SnapshotReader(writer.shm)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_read_copies_a_consistent_frame(segment):
+    writer, reader = segment
+    assert reader.read() is None
+    writer.publish(_snap(1))
+    snap = reader.read()
+    assert snap.pid.tolist() == [100, 101, 102] and snap.names[1] == "p101"
+    assert snap.cmdlines[2] == ("/bin/p", "102")
+    assert reader.read() is None  # nothing new since
+    for tick in range(2, 2 + FRAMES):
+        writer.publish(_snap(tick))  # wraps the ring over frame 1
+    assert snap.pid.tolist() == [100, 101, 102]  # the copy is unaffected
+
+
+def test_read_retries_when_the_frame_is_rewritten(segment, monkeypatch):
+    writer, reader = segment
+    writer.publish(_snap(1))
+    stable = SharedFrame.stable
+    calls = []
+
+    def racing_stable(frame):
+        if len(calls) == 1:
+            # latest() validated frame 1; the writer laps the ring while read() copies it
+            for tick in range(2, 2 + FRAMES):
+                writer.publish(_snap(tick))
+        calls.append(frame.seq)
+        return stable(frame)
+
+    monkeypatch.setattr(SharedFrame, "stable", racing_stable)
+    snap = reader.read()
+    # latest() and read() check frame 1; read() retries with the newest frame
+    assert calls == [1, 1, 1 + FRAMES, 1 + FRAMES]
+    assert snap.ts == float(1 + FRAMES) and snap.pid.tolist() == [500, 501, 502]
+
+
+def test_latest_skips_a_frame_being_written(segment):
+    writer, reader = segment
+    writer.publish(_snap(1))
+    hdr = writer.frames[1 % FRAMES]["header"]
+    hdr["seq"] += 1  # odd: as if the writer were mid-frame
+    assert reader.latest() is None
+    hdr["seq"] += 1
+    assert reader.latest().seq == 1
@@ -0,0 +1,14 @@
+from monitor import ProcessHistory
+from snapshot_cache import SnapshotCache
+
+
+def _pids(snap):
+    return {p["pid"] for p in snap.procs}
+
+
+def test_exited_process_leaves_snapshot(child):
+    cache = SnapshotCache(ProcessHistory(shared=False))
+    assert child.pid in _pids(cache.refresh())
+    child.kill()
+    child.wait()
+    assert child.pid not in _pids(cache.refresh())
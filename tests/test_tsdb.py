@@ -0,0 +1,56 @@
+import time
+import pytest
+from sampler import Snapshot
+from tsdb import MetricStore, SnapshotRecorder
+
+ARCHIVES = ((1, 7200), (60, 1440), (3600, 48))
+# start of the previous hour: recent enough for every archive to cover it
+T0 = time.time() // 3600 * 3600 - 3600
+
+
+def test_coarse_archives_are_exact_rollups(tmp_path):
+    store = MetricStore(tmp_path, archives=ARCHIVES)
+    t0 = T0
+    for i in range(120):
+        store.update(t0 + i, {"system.cpu": float(i)})
+    store.flush()
+    fine = store.query("system.cpu", t0, t0 + 119, max_points=200)
+    assert fine["resolution"] == 1 and len(fine["points"]) == 120
+    coarse = store.query("system.cpu", t0, t0 + 119, max_points=10)
+    assert coarse["resolution"] == 60
+    assert [(p["ts"], p["min"], p["avg"], p["max"], p["last"]) for p in coarse["points"]] == [
+        (t0, 0.0, 29.5, 59.0, 59.0), (t0 + 60, 60.0, 89.5, 119.0, 119.0)]
+    hourly = store.query("system.cpu", t0, t0 + 119, max_points=1)
+    assert hourly["resolution"] == 3600 and hourly["points"][0]["avg"] == pytest.approx(59.5)
+
+
+def test_ring_overwrites_the_oldest_points(tmp_path):
+    store = MetricStore(tmp_path, archives=((1, 10),))
+    for i in range(25):
+        store.update(T0 + i, {"x": float(i)})
+    points = store.query("x", T0, T0 + 30)["points"]
+    assert [p["last"] for p in points] == [float(i) for i in range(15, 25)]
+
+
+def test_readonly_store_sees_writes(tmp_path):
+    MetricStore(tmp_path, archives=ARCHIVES).update(T0, {"a b/c": 1.5})
+    reader = MetricStore(tmp_path, archives=ARCHIVES, readonly=True)
+    assert reader.names() == ["a b/c"]
+    assert reader.query("a b/c", T0, T0 + 1)["points"][0]["last"] == 1.5
+    assert reader.query("missing") is None
+
+
+def _snap(ts, cpu):
+    return Snapshot(ts, [1, 2], [0.0, 0.0], cpu, [0.1, 0.1], [1, 1], ["web", "web"], [(), ()])
+
+
+def test_recorder_tracks_hot_names_until_idle(tmp_path):
+    rec = SnapshotRecorder(MetricStore(tmp_path, archives=ARCHIVES), threshold=1.0, idle_after=10.0)
+    rec.record(_snap(T0, [0.2, 0.3]), 5.0, 20.0)
+    assert rec.store.names() == ["system.cpu", "system.mem"]
+    rec.record(_snap(T0 + 1, [2.0, 0.5]), 5.0, 20.0)  # both instances summed
+    rec.record(_snap(T0 + 5, [0.2, 0.3]), 5.0, 20.0)  # a dip stays recorded
+    points = rec.store.query("proc.web.cpu", T0, T0 + 10)["points"]
+    assert [(p["ts"], p["last"]) for p in points] == [(T0 + 1, 2.5), (T0 + 5, pytest.approx(0.5))]
+    rec.record(_snap(T0 + 12, [0.2, 0.3]), 5.0, 20.0)
+    assert "web" not in rec.tracked
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from collector import HostTable
+from sources import SyntheticSource
+from wire import (HEADER_SIZE, SNAPSHOT, SnapshotEncoder, WireError, body, frame, parse_header,
+                  quantize)
+
+
+def _expected(snap):
+    order = np.argsort(snap.pid, kind="stable")
+    return snap.pid[order], quantize(snap)[order]
+
+
+def test_deltas_rebuild_every_snapshot():
+    src = SyntheticSource(2000, seed=3, churn=0.01)
+    enc, table = SnapshotEncoder(), HostTable("h")
+    sizes = []
+    for _ in range(20):
+        snap = src.sample()
+        raw = frame(SNAPSHOT, enc.encode(snap, (12.5, 40.0)))
+        size, kind = parse_header(raw[:HEADER_SIZE])
+        assert kind == SNAPSHOT and size == len(raw) - HEADER_SIZE
+        table.apply(body(raw[HEADER_SIZE:]))
+        sizes.append(len(raw))
+        pid, q = _expected(snap)
+        assert np.array_equal(table.pid, pid) and np.array_equal(table.q, q)
+        i = int(np.flatnonzero(snap.pid == table.pid[0])[0])
+        assert table.static[(int(table.pid[0]), float(table.create_time[0]))] == \
+            (snap.names[i], tuple(snap.cmdlines[i]))
+    assert table.sys == [12.5, 40.0]
+    assert max(sizes[1:]) < sizes[0]  # deltas are smaller than the keyframe
+
+
+def test_reset_sends_a_keyframe_that_replaces_the_table():
+    src = SyntheticSource(200, seed=4)
+    enc, table = SnapshotEncoder(), HostTable("h")
+    table.apply(enc.encode(src.sample()))
+    enc.reset()  # agent reconnected
+    snap = src.sample()
+    table.apply(enc.encode(snap))
+    assert np.array_equal(table.q, _expected(snap)[1])
+
+
+def test_delta_against_the_wrong_state_is_rejected():
+    src = SyntheticSource(200, seed=5, churn=0.0)
+    enc = SnapshotEncoder()
+    enc.encode(src.sample())
+    delta = enc.encode(src.sample())
+    with pytest.raises(WireError):
+        HostTable("h").apply(delta)  # receiver missed the keyframe
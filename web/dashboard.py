@@ -1,11 +1,11 @@
 # dashboard.py
 import os
+import sys
 import threading
 import time
-import re
 import json
 import tkinter as tk
-from collections import Counter, deque
+from collections import deque
 from datetime import datetime
 
 import customtkinter as ctk
@@ -17,6 +17,15 @@ import numpy as np
 import psutil
 import GPUtil
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shol"))
+from shared_snapshot import SnapshotReader
+from logtail import LogFollower
+from log_analytics import LogAggregator, parse_lines
+from optimization_store import default_store
+from whitelist import whitelist as shared_whitelist
+from scheduler import Budget
+from readiness import notify_ready
+
 # GPUtil optional
 try:
     import GPUtil
@@ -35,22 +44,20 @@ ACCENT = "#00C8B4"
 ACCENT2 = "#38BDF8"
 TEXT_COLOR = "#E6EEF3"
 
-LOG_FILE = os.path.join(os.path.dirname(__file__), "..", "logs", "events.log")
+LOG_FILE = os.environ.get("SHOL_LOG_PATH") or os.path.join(os.path.dirname(__file__), "..", "logs", "events.log")
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
 # new data files for whitelist and optimization log
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 WHITELIST_FILE = os.path.join(DATA_DIR, "whitelist.json")
-OPT_LOG_FILE = os.path.join(DATA_DIR, "optimization_log.json")
+# optimization records: append-only store shared with healer and API
+opt_store = default_store()
 
 # ensure files exist
 if not os.path.exists(WHITELIST_FILE):
     with open(WHITELIST_FILE, "w") as _f:
         json.dump([], _f)
-if not os.path.exists(OPT_LOG_FILE):
-    with open(OPT_LOG_FILE, "w") as _f:
-        json.dump([], _f)
 
 # Sampling history length (seconds)
 HISTORY_LEN = 120
@@ -145,16 +152,18 @@ def open_whitelist_manager():
     win.geometry("420x360")
     win.configure(fg_color=APP_BG)
 
-    # load whitelist
-    try:
-        with open(WHITELIST_FILE, "r") as f:
-            wl = json.load(f)
-    except Exception:
-        wl = []
+    # load whitelist (same compiled matcher the healer uses)
+    matcher = shared_whitelist()
+    wl = list(matcher.entries)
 
     def save_and_refresh():
-        with open(WHITELIST_FILE, "w") as f:
-            json.dump(wl, f, indent=2)
+        try:
+            matcher.save(wl)
+        except ValueError as e:
+            # never write a list that would break every service reloading it
+            wl[:] = matcher.entries
+            entry.delete(0, tk.END)
+            entry.configure(placeholder_text=str(e))
         refresh_list()
 
     def refresh_list():
@@ -187,7 +196,7 @@ def open_whitelist_manager():
     listbox.pack(fill="both", expand=False, padx=18, pady=(6,6), ipady=4)
     refresh_list()
 
-    entry = ctk.CTkEntry(win, placeholder_text="e.g. chrome.exe (case-insensitive)")
+    entry = ctk.CTkEntry(win, placeholder_text="e.g. chrome.exe, python*, cmdline:--headless")
     entry.pack(fill="x", padx=18, pady=(6,6))
 
     btn_frame = ctk.CTkFrame(win, fg_color=APP_BG)
@@ -207,34 +216,36 @@ cpu_hist = deque(maxlen=HISTORY_LEN)
 mem_hist = deque(maxlen=HISTORY_LEN)
 gpu_hist = deque(maxlen=HISTORY_LEN)
 time_hist = deque(maxlen=HISTORY_LEN)
+sample_seq = 0   # bumped after every appended sample; charts redraw only when it moved
 
 start_time = time.time()
 
 # ---------------- Helpers: log parsing ----------------
 def parse_log_for_metrics(text):
-    lines = text.splitlines()
-    healings = []
-    offenders = []
-    times = []
-    for ln in lines:
-        # consider attempt/terminate/healed lines
-        if any(k in ln for k in ("Healing", "Terminated", "Attempting to heal", "✅", "Attempting")):
-            healings.append(ln)
-            m = re.search(r'Process:\s*([\w\.\-]+)', ln)
-            if not m:
-                m = re.search(r'process:\s*([\w\.\-]+)', ln, re.IGNORECASE)
-            if m:
-                offenders.append(m.group(1))
-            t = re.match(r'\[(.*?)\]', ln)
-            if t:
-                times.append(t.group(1))
-    return healings, offenders, times
+    return parse_lines(text.splitlines())
+
+# running totals over events.log, resumed from a checkpoint across restarts
+analytics = LogAggregator(LOG_FILE, checkpoint_path=os.path.join(DATA_DIR, "log_analytics_checkpoint.json"))
 
 # ---------------- Background: poll system stats ----------------
 def sample_stats_loop():
+    global sample_seq
+    reader = None
+    budget = Budget()  # the 1 s chart cadence stretches when SHOL or the host is busy
     while True:
-        cpu = psutil.cpu_percent(interval=1)
-        mem = psutil.virtual_memory().percent
+        # system CPU/MEM come with sampler_service's snapshots when it runs
+        if reader is not None and reader.stale():
+            reader.close()
+            reader = None
+        if reader is None:
+            reader = SnapshotReader.attach()
+        frame = reader.latest() if reader is not None and not reader.stale() else None
+        if frame is not None:
+            time.sleep(budget.stretch(1))
+            cpu, mem = frame.sys_cpu, frame.sys_mem
+        else:
+            cpu = psutil.cpu_percent(interval=budget.stretch(1))
+            mem = psutil.virtual_memory().percent
         gpu = None
         if _GPUMON_AVAILABLE:
             try:
@@ -251,6 +262,7 @@ def sample_stats_loop():
         mem_hist.append(mem)
         gpu_hist.append(gpu if gpu is not None else 0.0)
         time_hist.append(tnow)
+        sample_seq += 1
 
         # update main UI labels (schedule on main thread)
         def apply():
@@ -266,25 +278,34 @@ def sample_stats_loop():
                 gpu_bar.set(0.0)
         root.after(0, apply)
 
-        # loop continues (psutil already waited 1s via cpu_percent interval)
+        # loop continues (waited 1s via sleep or psutil's cpu_percent interval)
 
 # ---------------- Background: update log box ----------------
+LOG_VIEW_MAX_LINES = 500      # the Text widget never holds more than this
+LOG_VIEW_BACKLOG = 64 * 1024  # bytes of existing log shown on startup
+
 def update_log_box_loop():
+    # follow the log: only appended lines are read and inserted
+    follower = LogFollower(LOG_FILE, backlog_bytes=LOG_VIEW_BACKLOG)
     while True:
         try:
-            if os.path.exists(LOG_FILE):
-                with open(LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                    data = f.read()
+            if follower.file_id is None and not os.path.exists(LOG_FILE):
+                lines, reset = ["No events logged yet.\n"], True
             else:
-                data = "No events logged yet.\n"
-            def apply():
-                log_box.delete("1.0", "end")
-                log_box.insert("end", data)
-                log_box.see("end")
-            root.after(0, apply)
+                lines, reset = follower.poll()
+            if lines or reset:
+                def apply(lines=lines, reset=reset):
+                    if reset:
+                        log_box.delete("1.0", "end")
+                    log_box.insert("end", "".join(lines))
+                    # drop the oldest lines beyond the cap
+                    count = int(log_box.index("end-1c").split(".")[0])
+                    if count > LOG_VIEW_MAX_LINES:
+                        log_box.delete("1.0", f"{count - LOG_VIEW_MAX_LINES + 1}.0")
+                    log_box.see("end")
+                root.after(0, apply)
         except Exception as e:
-            def err_apply():
-                log_box.delete("1.0", "end")
+            def err_apply(e=e):
                 log_box.insert("end", f"Error reading log: {e}\n")
             root.after(0, err_apply)
         time.sleep(2)
@@ -292,15 +313,10 @@ def update_log_box_loop():
 # ---------------- Update analytics summary on right card ----------------
 def update_analytics_summary():
     try:
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                raw = f.read()
-        else:
-            raw = ""
-        healings, offenders, times = parse_log_for_metrics(raw)
-        total = len(healings)
-        c = Counter(offenders)
-        top5 = c.most_common(5)
+        # only the bytes appended since the last pass are parsed
+        analytics.update()
+        total = analytics.total
+        top5 = analytics.top(5)
         uptime = int(time.time() - start_time)
         uh = f"{uptime//3600:02}:{(uptime//60)%60:02}:{uptime%60:02}"
         summary_box.delete("1.0", "end")
@@ -316,6 +332,70 @@ def update_analytics_summary():
         summary_box.insert("end", f"\nAnalytics error: {e}\n")
     root.after(3000, update_analytics_summary)
 
+# ---------------- Live line chart (blitted) ----------------
+CHART_WINDOW = 60   # samples shown per chart
+
+class LiveChart:
+    """One usage chart whose line and markers are updated in place.
+
+    Axes, ticks and titles are drawn once into a cached background; each
+    update restores that background and redraws only the two animated
+    artists (blitting). A full redraw happens only when Tk resizes the
+    canvas, which re-captures the background.
+    """
+
+    def __init__(self, master, column, title, series, color, edge, enabled=True, empty_text="No data"):
+        self.series = series
+        self.enabled = enabled
+        self.fig = Figure(figsize=(4,3), facecolor="#071018", dpi=100)
+        self.ax = ax = self.fig.add_subplot(111)
+        ax.set_facecolor("#071018")
+        ax.tick_params(colors="#9fb6b0")
+        for spine in ax.spines.values():
+            spine.set_color("#12333a")
+        ax.set_title(title, color=ACCENT, fontsize=11)
+        ax.set_xlim(0, CHART_WINDOW)
+        ax.set_ylim(0, 100)
+        self.line, = ax.plot([], [], color=color, lw=2, animated=True)
+        self.dots = ax.scatter([], [], s=20, c=color, edgecolors=edge, linewidths=0.4, zorder=3, animated=True)
+        self.placeholder = ax.text(0.5, 0.5, empty_text, ha="center", va="center", color="#7f8a86",
+                                   transform=ax.transAxes)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.get_tk_widget().grid(row=0, column=column, sticky="nsew", padx=8, pady=8)
+        self.background = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.draw()
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.dots)
+
+    def update(self):
+        if not self.enabled:
+            return
+        values = tuple(self.series)[-CHART_WINDOW:]  # one atomic copy; the sampler thread appends
+        n = len(values)
+        if n == 0:
+            return
+        if self.placeholder.get_visible():
+            self.placeholder.set_visible(False)
+            self.canvas.draw()  # static part changed: re-capture the background
+        y = np.asarray(values, dtype=float)
+        x = np.arange(n)
+        self.line.set_data(x, y)
+        self.dots.set_offsets(np.column_stack((x, y)))
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_artists()
+        self.canvas.blit(self.fig.bbox)
+
+
 # ---------------- Floating analytics window (opens on demand) ----------------
 analytics_window = None
 
@@ -338,23 +418,12 @@ def open_analytics_window():
     frame.grid_columnconfigure((0,1,2), weight=1)
     frame.grid_rowconfigure(0, weight=1)
 
-    # create matplotlib figs for CPU, GPU, MEM
-    figs = []
-    canvases = []
-    axes = []
-
-    for i, label in enumerate(("CPU Usage", "GPU Usage", "Memory Usage")):
-        fig = Figure(figsize=(4,3), facecolor="#071018", dpi=100)
-        ax = fig.add_subplot(111)
-        ax.set_facecolor("#071018")
-        ax.tick_params(colors="#9fb6b0")
-        for spine in ax.spines.values():
-            spine.set_color("#12333a")
-        ax.set_title(label, color=ACCENT, fontsize=11)
-        canvas = FigureCanvasTkAgg(fig, master=frame)
-        widget = canvas.get_tk_widget()
-        widget.grid(row=0, column=i, sticky="nsew", padx=8, pady=8)
-        figs.append(fig); canvases.append(canvas); axes.append(ax)
+    # create matplotlib figs for CPU, GPU, MEM (artists are created once, then updated)
+    charts = [
+        LiveChart(frame, 0, "CPU Usage", cpu_hist, ACCENT, "#08312f"),
+        LiveChart(frame, 1, "GPU Usage", gpu_hist, ACCENT2, "#062a3a", enabled=_GPUMON_AVAILABLE, empty_text="GPU N/A"),
+        LiveChart(frame, 2, "Memory Usage", mem_hist, "#00e6cf", "#05332f"),
+    ]
 
     # ---------------- Process optimization (bar chart) ----------------
     # create separate area under the three charts
@@ -375,79 +444,21 @@ def open_analytics_window():
     proc_widget = proc_canvas.get_tk_widget()
     proc_widget.pack(fill="both", expand=True, padx=8, pady=(0,12))
 
-    def refresh_charts():
-        # prepare arrays
-        xlen = len(time_hist)
-        xs = np.arange(xlen)
-
-        # CPU
-        axes[0].clear()
-        axes[0].set_facecolor("#071018")
-        axes[0].tick_params(colors="#9fb6b0")
-        axes[0].set_title("CPU Usage", color=ACCENT, fontsize=11)
-        if xlen > 0:
-            y = np.array(list(cpu_hist))
-            # simple robust plot
-            axes[0].plot(xs, y, color=ACCENT, lw=2)
-            axes[0].scatter(xs, y, s=20, c=ACCENT, edgecolors="#08312f", linewidths=0.4, zorder=3)
-            axes[0].set_ylim(0, 100)
-            axes[0].set_xlim(max(0, xlen-60), max(60, xlen))  # show last up to 60 samples
-        else:
-            axes[0].text(0.5,0.5,"No data",ha="center",va="center", color="#7f8a86")
-
-        # GPU
-        axes[1].clear()
-        axes[1].set_facecolor("#071018")
-        axes[1].tick_params(colors="#9fb6b0")
-        axes[1].set_title("GPU Usage", color=ACCENT, fontsize=11)
-        if _GPUMON_AVAILABLE and xlen > 0:
-            y = np.array(list(gpu_hist))
-            axes[1].plot(xs, y, color=ACCENT2, lw=2)
-            axes[1].scatter(xs, y, s=20, c=ACCENT2, edgecolors="#062a3a", linewidths=0.4, zorder=3)
-            axes[1].set_ylim(0, 100)
-            axes[1].set_xlim(max(0, xlen-60), max(60, xlen))
-        else:
-            axes[1].text(0.5,0.5,"GPU N/A",ha="center",va="center", color="#7f8a86")
-
-        # Memory
-        axes[2].clear()
-        axes[2].set_facecolor("#071018")
-        axes[2].tick_params(colors="#9fb6b0")
-        axes[2].set_title("Memory Usage", color=ACCENT, fontsize=11)
-        if xlen > 0:
-            y = np.array(list(mem_hist))
-            axes[2].plot(xs, y, color="#00e6cf", lw=2)
-            axes[2].scatter(xs, y, s=20, c="#00e6cf", edgecolors="#05332f", linewidths=0.4, zorder=3)
-            axes[2].set_ylim(0, 100)
-            axes[2].set_xlim(max(0, xlen-60), max(60, xlen))
-        else:
-            axes[2].text(0.5,0.5,"No data",ha="center",va="center", color="#7f8a86")
+    state = {"seq": -1, "opt_version": object()}
 
-        for canvas in canvases:
-            canvas.draw()
-
-        # --- update process optimization bar chart ---
+    def draw_optimizations():
         try:
-            with open(OPT_LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                opt_data = json.load(f)
+            # last 10 entries only; the store never parses the full history
+            last_n = opt_store.last(10)
         except Exception:
-            opt_data = []
+            last_n = []
 
-                # --- update process optimization bar chart (live dynamic) ---
-        try:
-            with open(OPT_LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                opt_data = json.load(f)
-        except Exception:
-            opt_data = []
-
-        if opt_data:
-            # take last 10 entries for smooth animation
-            last_n = opt_data[-10:]
+        proc_ax.clear()
+        proc_ax.set_facecolor("#071018")
+        if last_n:
             procs = [d.get("process", d.get("proc", "unknown")) for d in last_n]
-            gains = [float(d.get("optimization", 0.0)) for d in last_n]
+            gains = [float(d.get("optimization_score", d.get("optimization", 0.0))) for d in last_n]
 
-            proc_ax.clear()
-            proc_ax.set_facecolor("#071018")
             proc_ax.tick_params(colors="#9fb6b0")
             for spine in proc_ax.spines.values():
                 spine.set_color("#12333a")
@@ -460,6 +471,7 @@ def open_analytics_window():
             proc_ax.set_ylabel("Optimization (%)", color="#9fb6b0")
             proc_ax.set_xlabel("Process Name", color="#9fb6b0")
             proc_ax.set_title("Optimization Impact by Process (last 10)", color=ACCENT, fontsize=11)
+            proc_ax.set_xticks(range(len(procs)))
             proc_ax.set_xticklabels(procs, rotation=30, ha="right", fontsize=9)
 
             # label bars
@@ -473,16 +485,39 @@ def open_analytics_window():
                     color="#e6fff9", fontsize=8
                 )
         else:
-            proc_ax.clear()
-            proc_ax.set_facecolor("#071018")
             proc_ax.text(0.5, 0.5, "No optimization data yet", ha="center", va="center", color="#7f8a86")
 
-        proc_canvas.draw()
+        proc_canvas.draw_idle()
+
+    def window_visible():
+        try:
+            return analytics_window.state() != "iconic" and bool(analytics_window.winfo_viewable())
+        except tk.TclError:
+            return False
+
+    def refresh_charts():
+        if not (analytics_window and analytics_window.winfo_exists()):
+            return
+
+        # hidden/minimized: nothing to draw, check again later
+        if window_visible():
+            # lines: only when the sampler appended something since the last frame
+            if sample_seq != state["seq"]:
+                state["seq"] = sample_seq
+                for chart in charts:
+                    chart.update()
 
+            # bar chart: only when a record was appended to the store
+            try:
+                version = opt_store.version()
+            except Exception:
+                version = None
+            if version != state["opt_version"]:
+                state["opt_version"] = version
+                draw_optimizations()
 
         # schedule next update
-        if analytics_window and analytics_window.winfo_exists():
-            analytics_window.after(1000, refresh_charts)
+        analytics_window.after(1000, refresh_charts)
 
     # start refresh
     analytics_window.after(500, refresh_charts)
@@ -491,6 +526,7 @@ def open_analytics_window():
 threading.Thread(target=sample_stats_loop, daemon=True).start()
 threading.Thread(target=update_log_box_loop, daemon=True).start()
 root.after(1000, update_analytics_summary)
+root.after(0, notify_ready)  # window is up once the event loop runs
 
 # ---------------- Run ----------------
 root.mainloop()